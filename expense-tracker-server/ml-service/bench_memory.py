@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark for multi-process CPU inference
+Starts N torch inference workers three ways and measures their combined PSS
+(proportional set size: shared pages are split between the processes mapping them):
+
+- copy: independent processes, each loading its own weights (from_pretrained)
+- mmap: independent processes mapping model.safetensors (Predictor(shared_weights=True))
+- fork: workers forked from a parent that preloaded and warmed the model, as
+  serve.py --workers N does
+
+plus a runtime control: processes with torch, transformers and the tokenizer loaded
+but no model, i.e. what any extra Python worker costs before it holds a weight.
+
+Each mode runs with 1 and with N workers; the per-extra-worker cost is what scaling
+out actually costs. Linux only (reads /proc/<pid>/smaps_rollup).
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+
+from predict import MODEL_DIR, Predictor
+from shared_weights import SAFETENSORS_FILE
+from startup_profile import WARMUP_DESCRIPTIONS
+
+MODES = ("runtime", "copy", "mmap", "fork")
+WORKERS = 4
+# Rows in each worker's warm-up batch, so activation buffers are counted too
+WARMUP_ROWS = 64
+
+# Set in the parent before forking, for the fork mode
+_preloaded = None
+
+
+def memory_kb(pid):
+    """Rss, Pss and Uss (private pages) of one process from smaps_rollup"""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss": fields["Rss"],
+        "pss": fields["Pss"],
+        "uss": fields["Private_Clean"] + fields["Private_Dirty"],
+    }
+
+
+def warm_batch():
+    return (WARMUP_DESCRIPTIONS * WARMUP_ROWS)[:WARMUP_ROWS]
+
+
+def worker(mode, model_dir, ready, release):
+    import torch
+
+    torch.set_num_threads(1)
+    if mode == "runtime":
+        from transformers import AutoTokenizer
+
+        AutoTokenizer.from_pretrained(model_dir)(warm_batch(), padding=True, return_tensors="pt")
+    else:
+        predictor = _preloaded
+        if predictor is None:
+            predictor = Predictor(model_dir, shared_weights=mode == "mmap")
+        predictor.predict_batch(warm_batch())
+    ready.put(os.getpid())
+    release.wait()
+
+
+def measure(mode, model_dir, workers):
+    """Combined memory of `workers` warm workers (plus the preloading parent for fork)"""
+    global _preloaded
+
+    ctx = mp.get_context("fork" if mode == "fork" else "spawn")
+    processes = [os.getpid()] if mode == "fork" else []
+    if mode == "fork":
+        import gc
+
+        import torch
+
+        # Same preparation as serve.serve_preforked
+        os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+        _preloaded = Predictor(model_dir)
+        torch.set_num_threads(1)
+        _preloaded.predict_batch(WARMUP_DESCRIPTIONS, top_k=1)
+        gc.freeze()
+    ready, release = ctx.Queue(), ctx.Event()
+    children = [ctx.Process(target=worker, args=(mode, model_dir, ready, release))
+                for _ in range(workers)]
+    try:
+        for child in children:
+            child.start()
+        processes += [ready.get(timeout=600) for _ in children]
+        per_process = [memory_kb(pid) for pid in processes]
+    finally:
+        release.set()
+        for child in children:
+            child.join()
+        _preloaded = None
+        if mode == "fork":
+            import gc
+
+            gc.unfreeze()
+    return {key: sum(p[key] for p in per_process) / 1024 for key in ("rss", "pss", "uss")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory cost of N inference workers")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--output", default="bench_memory.json")
+    args = parser.parse_args()
+
+    weights_path = os.path.join(args.model_dir, SAFETENSORS_FILE)
+    model_mb = os.path.getsize(weights_path) / 2**20 if os.path.exists(weights_path) else None
+
+    print("=" * 60)
+    print(f"🧠 MEMORY BENCHMARK: {args.workers} WORKERS")
+    print("=" * 60)
+    if model_mb:
+        print(f"   Weights: {model_mb:.0f} MB ({weights_path})")
+
+    # fork last: its preloaded model and torch import stay in this process afterwards
+    results = {}
+    for mode in sorted(args.modes, key=MODES.index):
+        one = measure(mode, args.model_dir, 1)
+        many = measure(mode, args.model_dir, args.workers)
+        extra = (many["pss"] - one["pss"]) / max(1, args.workers - 1)
+        results[mode] = {"workers_1": one, f"workers_{args.workers}": many,
+                         "pss_per_extra_worker_mb": extra}
+        print(f"   {mode:7s} total PSS {one['pss']:7.0f} MB (1) -> {many['pss']:7.0f} MB "
+              f"({args.workers}), +{extra:.0f} MB per extra worker")
+
+    if model_mb:
+        print()
+        runtime = results.get("runtime", {}).get("pss_per_extra_worker_mb", 0.0)
+        for mode, result in results.items():
+            if mode == "runtime":
+                continue
+            beyond = result["pss_per_extra_worker_mb"] - runtime
+            print(f"   {mode:7s} extra worker costs {result['pss_per_extra_worker_mb'] / model_mb:.2f}x "
+                  f"the weights ({beyond:+.0f} MB beyond the runtime control)")
+
+    with open(args.output, "w") as f:
+        json.dump({"workers": args.workers, "model_mb": model_mb, "modes": results}, f, indent=2)
+    print(f"\n💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Before/after timing report for padding modes
+Compares max_length padding against dynamic padding with length grouping
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from transformers import AutoTokenizer, AutoModelForSequenceClassification, TrainingArguments
+
+from train import (
+    BATCH_SIZE,
+    DATASET_DIR,
+    DEDUPE,
+    DEDUPE_MODES,
+    GROUP_BY_LENGTH,
+    LEARNING_RATE,
+    MODEL_NAME,
+    PADDING_MODES,
+    RESAMPLE_CAP,
+    apply_counts,
+    create_dataset,
+    load_and_preprocess_data,
+    make_collator,
+    make_trainer,
+    tokenize_dataset,
+)
+
+DATASETS = [
+    (os.path.join(DATASET_DIR, "expense_training_dataset_15000.csv"), "category"),
+    (os.path.join(DATASET_DIR, "expense_dataset_50000.csv"), "master_category"),
+]
+BENCH_STEPS = 200
+
+
+def time_training(dataset_path, label_column, padding, steps, dedupe=DEDUPE, resample_cap=RESAMPLE_CAP):
+    """Tokenize and train for a fixed number of steps, returning timings
+
+    The train split gets the same dedupe treatment as train.py, so the projected
+    epoch covers the rows a real run trains on.
+    """
+    dataset, label_encoder = load_and_preprocess_data(dataset_path, label_column, dedupe=dedupe != "off")
+    train_dataset, test_dataset = create_dataset(dataset)
+    train_dataset = apply_counts(train_dataset, dedupe, resample_cap)
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+
+    start = time.perf_counter()
+    train_dataset, _ = tokenize_dataset(train_dataset, test_dataset, tokenizer, padding)
+    tokenize_seconds = time.perf_counter() - start
+
+    model = AutoModelForSequenceClassification.from_pretrained(
+        MODEL_NAME, num_labels=len(label_encoder.classes_)
+    )
+    with tempfile.TemporaryDirectory() as output_dir:
+        args = TrainingArguments(
+            output_dir=output_dir,
+            max_steps=steps,
+            learning_rate=LEARNING_RATE,
+            per_device_train_batch_size=BATCH_SIZE,
+            save_strategy="no",
+            report_to=[],
+            group_by_length=GROUP_BY_LENGTH and padding == "dynamic",
+        )
+        trainer = make_trainer(
+            model=model,
+            args=args,
+            train_dataset=train_dataset,
+            data_collator=make_collator(tokenizer, padding),
+        )
+        metrics = trainer.train().metrics
+
+    samples_per_sec = metrics["train_samples_per_second"]
+    return {
+        "dataset": os.path.basename(dataset_path),
+        "padding": padding,
+        "dedupe": dedupe,
+        "train_rows": len(train_dataset),
+        "tokenize_seconds": round(tokenize_seconds, 2),
+        "steps": steps,
+        "samples_per_sec": round(samples_per_sec, 1),
+        "projected_epoch_seconds": round(len(train_dataset) / samples_per_sec, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time training under each padding mode")
+    parser.add_argument("--steps", type=int, default=BENCH_STEPS)
+    parser.add_argument("--dedupe", choices=DEDUPE_MODES, default=DEDUPE)
+    parser.add_argument("--output", default="padding_report.json")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("⏱️  PADDING MODE TIMING REPORT")
+    print("=" * 60)
+
+    report = []
+    for dataset_path, label_column in DATASETS:
+        for padding in PADDING_MODES:
+            report.append(time_training(dataset_path, label_column, padding, args.steps, args.dedupe))
+
+    print(f"\n{'dataset':<40} {'padding':<11} {'samples/s':>10} {'epoch s':>9}")
+    for row in report:
+        print(
+            f"{row['dataset']:<40} {row['padding']:<11} "
+            f"{row['samples_per_sec']:>10.1f} {row['projected_epoch_seconds']:>9.1f}"
+        )
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📁 Report saved to: {args.output}")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main()
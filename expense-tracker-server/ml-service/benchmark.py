@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Reproducible benchmark suite for the categorization pipeline
+Measures tokenization, training and inference speed, peak RSS and per-master accuracy
+on fixed-seed generated data, and fails on regressions against a baseline JSON
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from dataset import generate_expense_dataset_50000 as generator
+from predict import BACKENDS, MODEL_DIR, load_predictor
+from telemetry import peak_rss_bytes
+
+BENCH_SEED = 1234
+NUM_ROWS = 5000
+SINGLE_ROW_SAMPLES = 300
+BATCH_SIZE = 32
+TOKENIZE_CHUNK = 1000
+TRAIN_STEPS = 50
+PERCENTILES = (50, 95, 99)
+
+# Regression limits against --baseline
+MAX_LATENCY_REGRESSION = 0.20  # relative increase in p95
+MAX_ACCURACY_DROP = 0.01  # absolute drop, overall and per master category
+
+
+def peak_rss_mb():
+    return peak_rss_bytes() / 1e6
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentiles_ms(seconds):
+    values = np.asarray(seconds) * 1000
+    return {f"p{p}_ms": float(np.percentile(values, p)) for p in PERCENTILES}
+
+
+def bench_tokenization(tokenizer, descriptions, max_length):
+    """Rows/sec for batched fast-tokenizer calls"""
+    start = time.perf_counter()
+    for i in range(0, len(descriptions), TOKENIZE_CHUNK):
+        tokenizer(descriptions[i:i + TOKENIZE_CHUNK], truncation=True, max_length=max_length)
+    elapsed = time.perf_counter() - start
+    return {"rows": len(descriptions), "rows_per_sec": len(descriptions) / elapsed}
+
+
+def bench_inference(predictor, descriptions):
+    """Single-row and batched latency percentiles"""
+    predictor.predict_batch(descriptions[:BATCH_SIZE], top_k=1)  # warm up
+
+    single = []
+    for description in descriptions[:SINGLE_ROW_SAMPLES]:
+        start = time.perf_counter()
+        predictor.predict_batch([description], top_k=1)
+        single.append(time.perf_counter() - start)
+
+    batched = []
+    for i in range(0, len(descriptions), BATCH_SIZE):
+        start = time.perf_counter()
+        predictor.predict_batch(descriptions[i:i + BATCH_SIZE], top_k=1)
+        batched.append(time.perf_counter() - start)
+
+    return {
+        "single_row": percentiles_ms(single),
+        "batched": {
+            "batch_size": BATCH_SIZE,
+            **percentiles_ms(batched),
+            "rows_per_sec": len(descriptions) / sum(batched),
+        },
+    }
+
+
+def bench_accuracy(predictor, rows, label_column):
+    """Accuracy overall and per master category against the generator's labels"""
+    column = generator.HEADER.index(label_column)
+    predictions = predictor.predict_batch([row[0] for row in rows], top_k=1)
+    correct = defaultdict(int)
+    total = defaultdict(int)
+    for row, prediction in zip(rows, predictions):
+        master = row[1]
+        total[master] += 1
+        correct[master] += prediction["category"] == row[column]
+    return {
+        "label_column": label_column,
+        "overall": sum(correct.values()) / len(rows),
+        "per_master": {master: correct[master] / total[master] for master in sorted(total)},
+    }
+
+
+def bench_training(size, seed, steps):
+    """Samples/sec for a short training run on the same generated rows"""
+    from bench_padding import time_training
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "bench.csv")
+        generator.generate(path, size=size, seed=seed)
+        result = time_training(path, "master_category", "dynamic", steps)
+    return {
+        "steps": steps,
+        "samples_per_sec": result["samples_per_sec"],
+        "tokenize_seconds": result["tokenize_seconds"],
+    }
+
+
+def check_regressions(baseline, report, max_latency_regression, max_accuracy_drop):
+    """Human-readable list of every metric that regressed past its limit"""
+    failures = []
+    for section in ("single_row", "batched"):
+        old = baseline.get("inference", {}).get(section, {}).get("p95_ms")
+        new = report.get("inference", {}).get(section, {}).get("p95_ms")
+        if old and new and new > old * (1 + max_latency_regression):
+            failures.append(f"{section} p95 {old:.2f} ms -> {new:.2f} ms "
+                            f"(+{new / old - 1:.0%}, limit +{max_latency_regression:.0%})")
+
+    old_accuracy = baseline.get("accuracy") or {}
+    new_accuracy = report.get("accuracy") or {}
+    if "overall" in old_accuracy and "overall" in new_accuracy:
+        pairs = [("overall", old_accuracy["overall"], new_accuracy["overall"])]
+        pairs += [
+            (master, old_accuracy["per_master"][master], value)
+            for master, value in new_accuracy["per_master"].items()
+            if master in old_accuracy.get("per_master", {})
+        ]
+        for name, old, new in pairs:
+            # Tolerance so a drop of exactly the limit (0.90 -> 0.89) is not a failure
+            if old - new > max_accuracy_drop + 1e-9:
+                failures.append(f"accuracy[{name}] {old:.4f} -> {new:.4f} "
+                                f"(limit -{max_accuracy_drop:.2%})")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the categorization pipeline")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--backend", choices=BACKENDS, default="torch")
+    parser.add_argument("--rows", type=int, default=NUM_ROWS)
+    parser.add_argument("--seed", type=int, default=BENCH_SEED)
+    parser.add_argument("--train-steps", type=int, default=TRAIN_STEPS,
+                        help="Steps for the training throughput run (0 skips it)")
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--baseline", help="Earlier benchmark JSON to compare against")
+    parser.add_argument("--max-latency-regression", type=float, default=MAX_LATENCY_REGRESSION)
+    parser.add_argument("--max-accuracy-drop", type=float, default=MAX_ACCURACY_DROP)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("📏 CATEGORIZATION PIPELINE BENCHMARK")
+    print("=" * 60)
+
+    rows = list(generator.generate_rows(args.rows, args.seed))
+    descriptions = [row[0] for row in rows]
+    print(f"\n📊 {len(rows)} generated rows (seed {args.seed})")
+
+    print(f"\n📥 Loading {args.backend} model from {args.model_dir}...")
+    predictor = load_predictor(args.backend, args.model_dir)
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "model_version": predictor.model_version,
+            "backend": args.backend,
+            "rows": len(rows),
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        },
+    }
+
+    print("\n🔤 Tokenization throughput...")
+    report["tokenization"] = bench_tokenization(predictor.tokenizer, descriptions, predictor.max_length)
+
+    print("⏱️  Inference latency...")
+    report["inference"] = bench_inference(predictor, descriptions)
+
+    label_column = predictor.manifest.get("label_column")
+    if label_column in generator.HEADER[1:]:
+        print("🎯 Accuracy per master category...")
+        report["accuracy"] = bench_accuracy(predictor, rows, label_column)
+    else:
+        # e.g. the 15k model, whose labels are not the generator's categories
+        print(f"⚠️  Skipping accuracy: model labels ({label_column}) are not a generator column")
+        report["accuracy"] = None
+
+    if args.train_steps > 0:
+        print(f"\n🚀 Training throughput ({args.train_steps} steps)...")
+        report["training"] = bench_training(len(rows), args.seed, args.train_steps)
+
+    report["peak_rss_mb"] = peak_rss_mb()
+
+    inference = report["inference"]
+    print(f"\n{'metric':<32} {'value':>12}")
+    print(f"{'tokenize rows/s':<32} {report['tokenization']['rows_per_sec']:>12.0f}")
+    for section in ("single_row", "batched"):
+        for p in PERCENTILES:
+            print(f"{f'{section} p{p} ms':<32} {inference[section][f'p{p}_ms']:>12.2f}")
+    print(f"{'batched rows/s':<32} {inference['batched']['rows_per_sec']:>12.0f}")
+    if report.get("training"):
+        print(f"{'train samples/s':<32} {report['training']['samples_per_sec']:>12.1f}")
+    if report["accuracy"]:
+        print(f"{'accuracy':<32} {report['accuracy']['overall']:>12.4f}")
+        for master, value in report["accuracy"]["per_master"].items():
+            print(f"{'  ' + master:<32} {value:>12.4f}")
+    print(f"{'peak RSS MB':<32} {report['peak_rss_mb']:>12.1f}")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📁 Results saved to: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        failures = check_regressions(
+            baseline, report, args.max_latency_regression, args.max_accuracy_drop
+        )
+        if failures:
+            print(f"\n❌ REGRESSIONS vs {args.baseline} ({baseline['meta'].get('commit')}):")
+            for failure in failures:
+                print(f"   {failure}")
+            raise SystemExit(1)
+        print(f"\n✅ No regressions vs {args.baseline}")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main()
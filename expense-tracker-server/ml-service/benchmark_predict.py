@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for batched prediction
+Reports rows/sec at batch sizes 1..256 so regressions are visible
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+
+from predict import Predictor, MODEL_DIR, LABELS_FILE
+
+DATASET_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "dataset",
+    "expense_training_dataset_15000.csv",
+)
+BATCH_SIZES = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+NUM_ROWS = 1024
+WARMUP_ROWS = 32
+
+
+def load_descriptions(path, limit):
+    """Read up to `limit` descriptions from a dataset CSV"""
+    descriptions = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            descriptions.append(row["description"])
+            if len(descriptions) >= limit:
+                break
+    return descriptions
+
+
+def benchmark(predictor, descriptions, batch_sizes):
+    """Measure rows/sec for each batch size"""
+    results = []
+    for batch_size in batch_sizes:
+        predictor.batch_size = batch_size
+        predictor.predict_batch(descriptions[:WARMUP_ROWS])
+
+        start = time.perf_counter()
+        predictor.predict_batch(descriptions)
+        elapsed = time.perf_counter() - start
+
+        results.append({
+            "batch_size": batch_size,
+            "rows": len(descriptions),
+            "seconds": round(elapsed, 4),
+            "rows_per_sec": round(len(descriptions) / elapsed, 1),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched prediction throughput")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--labels-file", default=LABELS_FILE)
+    parser.add_argument("--dataset", default=DATASET_PATH)
+    parser.add_argument("--rows", type=int, default=NUM_ROWS)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=BATCH_SIZES)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("⏱️  PREDICTION THROUGHPUT BENCHMARK")
+    print("=" * 60)
+
+    predictor = Predictor(args.model_dir, args.labels_file)
+    descriptions = load_descriptions(args.dataset, args.rows)
+    print(f"\n📊 Scoring {len(descriptions)} rows per batch size")
+
+    results = benchmark(predictor, descriptions, args.batch_sizes)
+
+    print(f"\n{'batch':>8} {'seconds':>10} {'rows/sec':>12}")
+    for result in results:
+        print(f"{result['batch_size']:>8} {result['seconds']:>10.4f} {result['rows_per_sec']:>12.1f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n📁 Results saved to: {args.output}")
+
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main()
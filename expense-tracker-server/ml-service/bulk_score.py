@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Streaming bulk re-categorization of exported expense tables
+Reads a CSV or Parquet export in fixed-size chunks, scores each chunk's distinct
+descriptions on a process pool and appends (id, category, confidence, model_version)
+rows to a CSV, checkpointing after every chunk so a crashed run resumes where it stopped
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+
+from predict import BACKENDS, MODEL_DIR, load_predictor
+
+CHUNK_ROWS = 50000
+ID_COLUMN = "id"
+DESCRIPTION_COLUMN = "description"
+# Chunks scored ahead of the writer per worker; bounds memory with the chunk size
+PREFETCH_PER_WORKER = 2
+
+
+def checkpoint_path(output_path):
+    return output_path + ".checkpoint.json"
+
+
+def read_checkpoint(output_path):
+    path = checkpoint_path(output_path)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_checkpoint(output_path, state):
+    tmp_path = checkpoint_path(output_path) + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, checkpoint_path(output_path))
+
+
+def iter_batches(input_path, columns, chunk_rows):
+    """Record batches of the requested columns without reading the whole file"""
+    if os.path.isdir(input_path) or input_path.endswith(".parquet"):
+        import pyarrow.dataset as ds
+
+        yield from ds.dataset(input_path, format="parquet").to_batches(
+            columns=columns, batch_size=chunk_rows
+        )
+        return
+    reader = pa_csv.open_csv(
+        input_path,
+        read_options=pa_csv.ReadOptions(block_size=16 << 20),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=columns, column_types={name: pa.string() for name in columns}
+        ),
+    )
+    yield from reader
+
+
+def input_columns(input_path):
+    """Column names of the export, read from the Parquet schema or the CSV header"""
+    if os.path.isdir(input_path) or input_path.endswith(".parquet"):
+        import pyarrow.dataset as ds
+
+        return ds.dataset(input_path, format="parquet").schema.names
+    return pa_csv.open_csv(input_path).schema.names
+
+
+def iter_chunks(input_path, columns, chunk_rows, skip_rows=0):
+    """Fixed-size tables of `chunk_rows` rows, after skipping the first `skip_rows`
+
+    Chunk boundaries depend only on row counts, not on how the reader happened to
+    block the file, so a resumed run sees exactly the chunks the first run did.
+    """
+    pending = []
+    pending_rows = 0
+    for batch in iter_batches(input_path, columns, chunk_rows):
+        if skip_rows >= batch.num_rows:
+            skip_rows -= batch.num_rows
+            continue
+        batch = batch.slice(skip_rows)
+        skip_rows = 0
+        pending.append(batch)
+        pending_rows += batch.num_rows
+        while pending_rows >= chunk_rows:
+            table = pa.Table.from_batches(pending)
+            yield table.slice(0, chunk_rows)
+            pending = table.slice(chunk_rows).to_batches()
+            pending_rows -= chunk_rows
+    if pending_rows:
+        yield pa.Table.from_batches(pending)
+
+
+_worker_predictor = None
+
+
+def init_worker(backend, model_dir, num_threads):
+    """Load one predictor per worker process"""
+    global _worker_predictor
+    if backend == "torch":
+        import torch
+
+        torch.set_num_threads(num_threads)
+    _worker_predictor = load_predictor(backend, model_dir)
+
+
+def score_unique(descriptions, predictor=None):
+    """Top-1 class index and probability for each description"""
+    probabilities = (predictor or _worker_predictor).predict_proba(descriptions)
+    best = probabilities.argmax(axis=1)
+    return best.astype(np.int32), probabilities[np.arange(len(best)), best].astype(np.float32)
+
+
+def dedupe_chunk(chunk):
+    """(distinct descriptions, index of each row's description among them)"""
+    encoded = pc.fill_null(chunk.column(DESCRIPTION_COLUMN), "").combine_chunks().dictionary_encode()
+    return encoded.dictionary.to_pylist(), encoded.indices.to_numpy(zero_copy_only=False)
+
+
+def chunk_ids(chunk, id_column, first_row):
+    if id_column in chunk.column_names:
+        return chunk.column(id_column)
+    return pa.array(np.arange(first_row, first_row + chunk.num_rows))
+
+
+class BulkScorer:
+    """Scores chunks in order, in-process (workers=0) or on a bounded process pool"""
+
+    def __init__(self, backend=BACKENDS[0], model_dir=MODEL_DIR, workers=0):
+        self.workers = workers
+        # Labels and version without loading weights in the parent when using a pool
+        self.predictor = load_predictor(backend, model_dir) if workers == 0 else None
+        if self.predictor is not None:
+            self.labels = self.predictor.labels
+            self.model_version = self.predictor.model_version
+            self.pool = None
+        else:
+            num_threads = max(1, (os.cpu_count() or 1) // workers)
+            self.pool = multiprocessing.Pool(
+                workers, initializer=init_worker, initargs=(backend, model_dir, num_threads)
+            )
+            self.labels, self.model_version = self.pool.apply(worker_info)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+
+    def score(self, chunks):
+        """Yield (chunk, inverse, class indices, confidences) in input order"""
+        if self.pool is None:
+            for chunk in chunks:
+                unique, inverse = dedupe_chunk(chunk)
+                yield (chunk, inverse, *score_unique(unique, self.predictor))
+            return
+
+        in_flight = deque()
+        for chunk in chunks:
+            unique, inverse = dedupe_chunk(chunk)
+            in_flight.append((chunk, inverse, self.pool.apply_async(score_unique, (unique,))))
+            if len(in_flight) >= self.workers * PREFETCH_PER_WORKER:
+                chunk, inverse, result = in_flight.popleft()
+                yield (chunk, inverse, *result.get())
+        while in_flight:
+            chunk, inverse, result = in_flight.popleft()
+            yield (chunk, inverse, *result.get())
+
+
+def worker_info():
+    return _worker_predictor.labels, _worker_predictor.model_version
+
+
+def run(input_path, output_path, backend=BACKENDS[0], model_dir=MODEL_DIR, workers=0,
+        chunk_rows=CHUNK_ROWS, id_column=ID_COLUMN, resume=True):
+    """Score every row of `input_path` into `output_path`; returns the final checkpoint"""
+    state = read_checkpoint(output_path) if resume else None
+    if state and state["input"] != os.path.abspath(input_path):
+        raise ValueError(f"{checkpoint_path(output_path)} belongs to a different run; "
+                         "use --restart to start over")
+    if state and state.get("finished"):
+        print(f"✅ {output_path} is already complete ({state['rows_done']} rows)")
+        return state
+
+    scorer = BulkScorer(backend, model_dir, workers)
+    try:
+        if state and state["model_version"] != scorer.model_version:
+            raise ValueError(f"Checkpoint was written by model {state['model_version']}, "
+                             f"current model is {scorer.model_version}; use --restart")
+        if state is None:
+            state = {
+                "input": os.path.abspath(input_path),
+                "model_version": scorer.model_version,
+                "rows_done": 0,
+                "unique_scored": 0,
+                "output_bytes": 0,
+                "finished": False,
+            }
+        else:
+            print(f"↩️  Resuming after {state['rows_done']} rows")
+
+        names = input_columns(input_path)
+        columns = [DESCRIPTION_COLUMN] + ([id_column] if id_column in names else [])
+        if id_column not in names:
+            print(f"⚠️  No '{id_column}' column; using input row numbers as ids")
+
+        version = pa.scalar(scorer.model_version)
+        # Drop anything written after the last checkpoint (a chunk cut short by a crash)
+        with open(output_path, "ab") as f:
+            f.truncate(state["output_bytes"])
+        start = time.perf_counter()
+        rows_at_start = state["rows_done"]
+        with open(output_path, "ab") as f:
+            chunks = iter_chunks(input_path, columns, chunk_rows, state["rows_done"])
+            for chunk, inverse, best, confidence in scorer.score(chunks):
+                table = pa.table({
+                    "id": chunk_ids(chunk, id_column, state["rows_done"]),
+                    "category": pa.array(scorer.labels[best[inverse]].tolist(), pa.string()),
+                    "confidence": pa.array(np.round(confidence[inverse], 4)),
+                    "model_version": pa.repeat(version, chunk.num_rows),
+                })
+                pa_csv.write_csv(table, f, pa_csv.WriteOptions(include_header=state["output_bytes"] == 0))
+                f.flush()
+                os.fsync(f.fileno())
+                state["rows_done"] += chunk.num_rows
+                state["unique_scored"] += len(best)
+                state["output_bytes"] = f.tell()
+                write_checkpoint(output_path, state)
+                elapsed = time.perf_counter() - start
+                print(f"   {state['rows_done']:>10} rows  "
+                      f"{(state['rows_done'] - rows_at_start) / elapsed:>8.0f} rows/s  "
+                      f"{state['unique_scored'] / state['rows_done']:>6.1%} scored")
+        state["finished"] = True
+        write_checkpoint(output_path, state)
+        return state
+    finally:
+        scorer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score a large expense export with the current model")
+    parser.add_argument("input", help="CSV or Parquet file (or Parquet directory)")
+    parser.add_argument("output", help="CSV of id,category,confidence,model_version")
+    parser.add_argument("--backend", choices=BACKENDS, default="torch")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Scoring processes (0 scores in this process)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--id-column", default=ID_COLUMN)
+    parser.add_argument("--restart", action="store_true", help="Ignore any checkpoint and start over")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("📦 BULK RE-CATEGORIZATION")
+    print("=" * 60)
+    if args.restart:
+        for path in (args.output, checkpoint_path(args.output)):
+            if os.path.exists(path):
+                os.remove(path)
+    state = run(args.input, args.output, args.backend, args.model_dir, args.workers,
+                args.chunk_rows, args.id_column)
+    print(f"\n📁 {state['rows_done']} rows scored with model {state['model_version']} -> {args.output}")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Confidence-calibrated cascade router: keyword -> student -> DistilBERT -> LLM
+Each tier answers only when its calibrated confidence clears a per-class threshold
+fitted on the held-out split; everything else escalates to the next tier
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+
+from predict import MODEL_DIR, softmax
+
+CALIBRATION_FILE = "./cascade.json"
+TIERS = ("keyword", "student", "distilbert", "llm")
+# Estimated USD per row; override with --cost tier=value to match your bill
+COST_PER_ROW = {"keyword": 0.0, "student": 1e-7, "distilbert": 2e-6, "llm": 2e-4}
+# A tier keeps a class only if it is at least this precise on held-out rows
+TARGET_PRECISION = 0.95
+# Fewer accepted held-out rows than this is too little evidence to trust a class.
+# The deduplicated split is small, so --fit lowers it to half an even per-class
+# share of the calibration rows, but never below MIN_SUPPORT_FLOOR
+MIN_SUPPORT = 20
+MIN_SUPPORT_FLOOR = 3
+# Half of each label's held-out rows fit temperatures/thresholds, the rest report
+CALIBRATION_FRACTION = 0.5
+TEMPERATURE_GRID = np.exp(np.linspace(np.log(0.05), np.log(20.0), 200))
+
+
+def fit_temperature(logits, labels):
+    """Temperature that minimizes held-out negative log-likelihood"""
+    rows = np.arange(len(labels))
+    best_t, best_nll = 1.0, np.inf
+    for t in TEMPERATURE_GRID:
+        nll = -np.log(softmax(logits / t)[rows, labels] + 1e-12).mean()
+        if nll < best_nll:
+            best_t, best_nll = float(t), nll
+    return best_t
+
+
+def scaled_min_support(min_support, rows, num_labels):
+    """`min_support`, lowered so a class with an even share of `rows` can still reach it"""
+    return max(MIN_SUPPORT_FLOOR, min(min_support, rows // max(1, num_labels) // 2))
+
+
+def calibration_split(labels, fraction, seed):
+    """Shuffled (calibration, report) row indices with `fraction` of each label's rows in the first
+
+    The held-out split comes sorted by description, so cutting it in place would
+    fit on one end of the alphabet and report on the other.
+    """
+    labels = np.asarray(labels)
+    rng = np.random.default_rng(seed)
+    calibration, report = [], []
+    for label in np.unique(labels):
+        rows = rng.permutation(np.flatnonzero(labels == label))
+        cut = int(round(len(rows) * fraction))
+        calibration.append(rows[:cut])
+        report.append(rows[cut:])
+    return (rng.permutation(np.concatenate(calibration)).astype(np.int64),
+            rng.permutation(np.concatenate(report)).astype(np.int64))
+
+
+def fit_class_thresholds(confidence, predicted, correct, labels,
+                         target=TARGET_PRECISION, min_support=MIN_SUPPORT):
+    """Lowest confidence per predicted class at which precision still meets `target`
+
+    Classes that never reach the target on enough rows get no threshold and
+    always escalate.
+    """
+    thresholds = {}
+    for index, label in enumerate(labels):
+        rows = np.flatnonzero(predicted == index)
+        if len(rows) < min_support:
+            continue
+        order = rows[np.argsort(-confidence[rows], kind="stable")]
+        precision = np.cumsum(correct[order]) / np.arange(1, len(order) + 1)
+        ok = np.flatnonzero((precision >= target) & (np.arange(1, len(order) + 1) >= min_support))
+        if len(ok):
+            thresholds[label] = float(confidence[order[ok[-1]]])
+    return thresholds
+
+
+class MockLLM:
+    """Stand-in for the LLM tier: looks answers up, else returns a fixed category"""
+
+    def __init__(self, answers=None, default="other"):
+        self.answers = answers or {}
+        self.default = default
+
+    def categorize(self, descriptions, labels):
+        return [self.answers.get(d, self.default) for d in descriptions]
+
+
+class OpenAILLM:
+    """LLM tier backed by the OpenAI chat API (needs `pip install openai` and OPENAI_API_KEY)"""
+
+    def __init__(self, model=None):
+        from openai import OpenAI
+
+        self.client = OpenAI()
+        self.model = model or os.environ.get("OPENAI_MODEL", "gpt-4o-mini")
+
+    def categorize(self, descriptions, labels):
+        results = []
+        for description in descriptions:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                temperature=0,
+                messages=[
+                    {"role": "system", "content": "Classify the expense. Reply with exactly one of: "
+                                                  + ", ".join(labels)},
+                    {"role": "user", "content": description},
+                ],
+            )
+            answer = response.choices[0].message.content.strip()
+            results.append(answer if answer in labels else "other")
+        return results
+
+
+class CascadeRouter:
+    """Routes each description to the cheapest tier that is confident enough"""
+
+    def __init__(self, model, calibration, keyword_tier=None, student=None, llm=None,
+                 costs=COST_PER_ROW):
+        self.model = model
+        self.labels = model.labels
+        self.keyword_tier = keyword_tier
+        self.student = student
+        self.llm = llm or MockLLM()
+        self.calibration = calibration
+        self.costs = costs
+        self.counts = dict.fromkeys(TIERS, 0)
+        if student is not None and student.labels.tolist() != self.labels.tolist():
+            raise ValueError("Student and DistilBERT label lists differ; re-run distill.py")
+
+    def _model_tier(self, name, predictor, descriptions, pending, results):
+        settings = self.calibration.get(name)
+        if predictor is None or not settings or not pending:
+            return pending
+        probabilities = softmax(predictor.logits([descriptions[i] for i in pending]) / settings["temperature"])
+        predicted = probabilities.argmax(axis=1)
+        thresholds = settings["thresholds"]
+        remaining = []
+        for i, index, probs in zip(pending, predicted, probabilities):
+            label = self.labels[index]
+            if label in thresholds and probs[index] >= thresholds[label]:
+                results[i] = {"category": label, "confidence": float(probs[index]), "tier": name}
+            else:
+                remaining.append(i)
+        return remaining
+
+    def predict_batch(self, descriptions):
+        descriptions = list(descriptions)
+        results = [None] * len(descriptions)
+        pending = list(range(len(descriptions)))
+
+        trusted = set(self.calibration.get("keyword", {}).get("classes", []))
+        if self.keyword_tier is not None and trusted:
+            remaining = []
+            for i, match in zip(pending, self.keyword_tier.match_batch(descriptions)):
+                if match and match["category"] in trusted:
+                    results[i] = {"category": match["category"], "confidence": 1.0, "tier": "keyword"}
+                else:
+                    remaining.append(i)
+            pending = remaining
+
+        pending = self._model_tier("student", self.student, descriptions, pending, results)
+        pending = self._model_tier("distilbert", self.model, descriptions, pending, results)
+
+        if pending:
+            answers = self.llm.categorize([descriptions[i] for i in pending], self.labels.tolist())
+            for i, answer in zip(pending, answers):
+                results[i] = {"category": answer, "confidence": None, "tier": "llm"}
+
+        for description, result in zip(descriptions, results):
+            result["description"] = description
+            self.counts[result["tier"]] += 1
+        return results
+
+    def stats(self):
+        """Fraction of rows each tier answered and the resulting average cost per row"""
+        total = sum(self.counts.values())
+        fractions = {tier: count / total if total else 0.0 for tier, count in self.counts.items()}
+        # A row pays for every tier it passed through, not only the one that answered
+        enabled = {
+            "keyword": self.keyword_tier is not None,
+            "student": self.student is not None,
+            "distilbert": True,
+            "llm": True,
+        }
+        reached, cost = 1.0, 0.0
+        for tier in TIERS:
+            if enabled[tier]:
+                cost += reached * self.costs[tier]
+            reached -= fractions[tier]
+        return {"rows": total, "fractions": fractions, "avg_cost_per_row": cost}
+
+
+def fit_model_tier(predictor, descriptions, expected, labels, target, min_support):
+    logits = predictor.logits(descriptions)
+    temperature = fit_temperature(logits, expected)
+    probabilities = softmax(logits / temperature)
+    predicted = probabilities.argmax(axis=1)
+    confidence = probabilities.max(axis=1)
+    thresholds = fit_class_thresholds(
+        confidence, predicted, predicted == expected, labels, target, min_support
+    )
+    return {"temperature": temperature, "thresholds": thresholds}
+
+
+def fit_keyword_tier(keyword_tier, descriptions, expected, labels, target, min_support):
+    """Keyword categories that are precise enough on held-out rows"""
+    hits, correct = {}, {}
+    for match, label_index in zip(keyword_tier.match_batch(descriptions), expected):
+        if match:
+            name = match["category"]
+            hits[name] = hits.get(name, 0) + 1
+            correct[name] = correct.get(name, 0) + (name == labels[label_index])
+    classes = [
+        name for name, count in hits.items()
+        if name in labels and count >= min_support and correct[name] / count >= target
+    ]
+    return {"classes": sorted(classes)}
+
+
+def fit_cascade(model, keyword_tier, student, descriptions, expected, target, min_support):
+    """Temperatures and per-class thresholds for each tier"""
+    labels = model.labels.tolist()
+    calibration = {"target_precision": target, "min_support": min_support}
+    if keyword_tier is not None:
+        calibration["keyword"] = fit_keyword_tier(keyword_tier, descriptions, expected, labels, target, min_support)
+    if student is not None:
+        calibration["student"] = fit_model_tier(student, descriptions, expected, labels, target, min_support)
+    calibration["distilbert"] = fit_model_tier(model, descriptions, expected, labels, target, min_support)
+    return calibration
+
+
+def load_calibration(path=CALIBRATION_FILE):
+    with open(path) as f:
+        return json.load(f)
+
+
+def parse_costs(overrides):
+    costs = dict(COST_PER_ROW)
+    for override in overrides or []:
+        tier, value = override.split("=")
+        if tier not in costs:
+            raise ValueError(f"Unknown tier {tier!r}, expected one of {TIERS}")
+        costs[tier] = float(value)
+    return costs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrated keyword -> student -> DistilBERT -> LLM cascade")
+    parser.add_argument("descriptions", nargs="*", help="Descriptions to route")
+    parser.add_argument("--fit", action="store_true", help="Fit calibration on the held-out split")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--student-dir", help="Distilled student (default: ./student if present)")
+    parser.add_argument("--no-keywords", action="store_true")
+    parser.add_argument("--calibration", default=CALIBRATION_FILE)
+    parser.add_argument("--target-precision", type=float, default=TARGET_PRECISION)
+    parser.add_argument("--min-support", type=int, default=MIN_SUPPORT)
+    parser.add_argument("--cost", action="append", metavar="TIER=USD", help="Override a tier's cost per row")
+    parser.add_argument("--openai", action="store_true", help="Use OpenAI for the LLM tier instead of the mock")
+    args = parser.parse_args()
+
+    from keyword_tier import KeywordTier, label_map_for
+    from predict import Predictor
+    from student import STUDENT_DIR, StudentPredictor
+
+    model = Predictor(args.model_dir)
+    student_dir = args.student_dir or (STUDENT_DIR if os.path.isdir(STUDENT_DIR) else None)
+    student = StudentPredictor(student_dir) if student_dir else None
+    keyword_tier = None
+    if not args.no_keywords:
+        # Keywords name the generator's master categories; map them onto this model's labels
+        keyword_tier = KeywordTier(label_map=label_map_for(model.labels.tolist()))
+        if not keyword_tier.keywords:
+            print("⚠️  No keyword category maps onto this model's labels; the keyword tier never answers")
+    costs = parse_costs(args.cost)
+
+    if args.fit:
+        from train import SPLIT_SEED, load_heldout_split
+
+        print("=" * 60)
+        print("🎚️  CASCADE CALIBRATION")
+        print("=" * 60)
+        # Same data, split and dedupe mode the model was trained with, from its manifest
+        test_dataset, label_encoder = load_heldout_split(model.manifest)
+        descriptions = np.asarray(test_dataset["description"], dtype=object)
+        # Map the split's label names onto the model's own label order
+        index = {name: i for i, name in enumerate(model.labels.tolist())}
+        expected = np.asarray([index[name] for name in label_encoder.inverse_transform(test_dataset["label"])])
+
+        fit_rows, report_rows = calibration_split(expected, CALIBRATION_FRACTION, SPLIT_SEED)
+        min_support = scaled_min_support(args.min_support, len(fit_rows), len(model.labels))
+        if min_support < args.min_support:
+            print(f"⚠️  Only {len(fit_rows)} calibration rows: per-class support lowered to {min_support}")
+        calibration = fit_cascade(
+            model, keyword_tier, student, descriptions[fit_rows].tolist(), expected[fit_rows],
+            args.target_precision, min_support,
+        )
+        with open(args.calibration, "w") as f:
+            json.dump(calibration, f, indent=2)
+        print(f"\n📁 Calibration saved to: {args.calibration}")
+
+        # Report on rows the calibration never saw; the mock LLM answers correctly
+        holdout = descriptions[report_rows].tolist()
+        truth = [model.labels[i] for i in expected[report_rows]]
+        router = CascadeRouter(model, calibration, keyword_tier, student,
+                               MockLLM(dict(zip(holdout, truth))), costs)
+        results = router.predict_batch(holdout)
+        accuracy = np.mean([r["category"] == t for r, t in zip(results, truth)])
+        stats = router.stats()
+        if "keyword" in calibration:
+            print(f"🔑 keyword {len(calibration['keyword']['classes'])}/{len(model.labels)} classes trusted")
+            if not calibration["keyword"]["classes"]:
+                print(f"⚠️  No keyword class reached {args.target_precision:.0%} precision on "
+                      f"{min_support}+ rows; all of its rows escalate")
+        for tier in ("student", "distilbert"):
+            if tier in calibration:
+                print(f"🌡️  {tier} temperature {calibration[tier]['temperature']:.3f}, "
+                      f"{len(calibration[tier]['thresholds'])}/{len(model.labels)} classes trusted")
+                if not calibration[tier]["thresholds"]:
+                    print(f"⚠️  No {tier} class reached {args.target_precision:.0%} precision; "
+                          f"all of its rows escalate")
+        print(f"\n{'tier':<12} {'share':>8}")
+        for tier, fraction in stats["fractions"].items():
+            print(f"{tier:<12} {fraction:>8.1%}")
+        print(f"\n🎯 Accuracy with a perfect LLM tier: {accuracy:.4f}")
+        print(f"💰 Average cost per row: ${stats['avg_cost_per_row']:.8f} "
+              f"(all-LLM: ${costs['llm']:.8f})")
+        print("=" * 60)
+        return
+
+    calibration = load_calibration(args.calibration)
+    llm = OpenAILLM() if args.openai else MockLLM()
+    router = CascadeRouter(model, calibration, keyword_tier, student, llm, costs)
+    for result in router.predict_batch(args.descriptions):
+        confidence = "" if result["confidence"] is None else f" ({result['confidence']:.2%})"
+        print(f"📝 {result['description']} -> {result['category']}{confidence} via {result['tier']}")
+    print(json.dumps(router.stats(), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,21 @@
-import random
-import csv
+"""
+Synthetic expense dataset generator (English + Hinglish)
+Seedable, streams rows to disk in chunks and shards work across processes
+"""
 
-try:
-    import pandas as pd
-except ImportError:  # Optional dependency; fallback to csv writer if unavailable
-    pd = None
+import argparse
+import csv
+import functools
+import io
+import itertools
+import os
+import random
+import re
+import shutil
+import string
+import tempfile
+import time
+from multiprocessing import Pool
 
 # ============================================================
 # MASTER CATEGORIES → SUBCATEGORIES
@@ -316,37 +327,262 @@ cinemas = ["PVR","INOX","Cinepolis"]
 
 artists = ["Arijit Singh","Badshah","Diljit Dosanjh"]
 
+# Placeholder name -> pool, as used by the templates above
+POOLS = {
+    "item": items,
+    "restaurant": restaurants,
+    "place": places,
+    "operator": operators,
+    "medicine": medicine_items,
+    "cinema": cinemas,
+    "artist": artists,
+}
+
 # ============================================================
-# GENERATE 50,000 ROWS
+# PRECOMPUTED SAMPLING TABLE
 # ============================================================
 
+HEADER = ["description", "master_category", "subcategory"]
 DATASET_SIZE = 50000
-rows = []
-
-for _ in range(DATASET_SIZE):
-    master = random.choice(list(CATEGORIES.keys()))
-    sub = random.choice(CATEGORIES[master])
-    template = random.choice(TEMPLATES[sub])
-
-    description = template.format(
-        item=random.choice(items),
-        restaurant=random.choice(restaurants),
-        place=random.choice(places),
-        operator=random.choice(operators),
-        medicine=random.choice(medicine_items),
-        cinema=random.choice(cinemas),
-        artist=random.choice(artists)
-    )
+DEFAULT_SEED = 42
+CHUNK_SIZE = 100000
+# Fixed shard size keeps output identical for any worker count
+SHARD_SIZE = 1000000
+FORMATS = ("csv", "parquet")
+# Files generate_parquet() writes; a directory holding anything else is never replaced
+PARQUET_PART = re.compile(r"part-\d{5}\.parquet")
+
+
+def template_fields(template):
+    """Placeholder names used by a template, in order"""
+    return [field for _, field, _, _ in string.Formatter().parse(template) if field]
+
+
+def render_template(template):
+    """Every description a template can produce"""
+    fields = template_fields(template)
+    pools = [POOLS[field] for field in fields]
+    return [
+        template.format(**dict(zip(fields, values)))
+        for values in itertools.product(*pools)
+    ]
+
+
+def build_row_table():
+    """Every possible row with its sampling weight, built once
+
+    Sampling master uniformly, then subcategory, template and each placeholder
+    value uniformly is the same as drawing a single pre-rendered row with
+    weight 1 / (masters * subcategories * templates * expansions).
+    """
+    rows = []
+    weights = []
+    master_weight = 1 / len(CATEGORIES)
+    for master, subcategories in CATEGORIES.items():
+        sub_weight = master_weight / len(subcategories)
+        for sub in subcategories:
+            templates = TEMPLATES[sub]
+            for template in templates:
+                descriptions = render_template(template)
+                weight = sub_weight / len(templates) / len(descriptions)
+                for description in descriptions:
+                    rows.append((description, master, sub))
+                    weights.append(weight)
+    return rows, list(itertools.accumulate(weights))
+
+
+def encode_rows(rows):
+    """Pre-encode each row as a CSV line so writing a chunk is one join"""
+    lines = []
+    for row in rows:
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerow(row)
+        lines.append(buffer.getvalue())
+    return lines
+
+
+@functools.lru_cache(maxsize=None)
+def row_table():
+    """(rows, cumulative weights, CSV lines), built on first use
+
+    Rendering every template takes most of this module's import time, and importers
+    such as keyword_tier only need the category and template tables.
+    """
+    rows, cum_weights = build_row_table()
+    return rows, cum_weights, encode_rows(rows)
+
+
+MASTER_NAMES = list(CATEGORIES.keys())
+SUB_NAMES = sorted({sub for subs in CATEGORIES.values() for sub in subs})
+
+
+def shard_rng(seed, shard):
+    """Independent, reproducible random stream per shard"""
+    return random.Random(f"{seed}-{shard}")
+
+
+def shard_sizes(size):
+    """Row counts per shard"""
+    return [min(SHARD_SIZE, size - start) for start in range(0, size, SHARD_SIZE)]
+
+
+def generate_rows(size=DATASET_SIZE, seed=DEFAULT_SEED):
+    """Yield (description, master_category, subcategory) tuples"""
+    rows, cum_weights, _ = row_table()
+    for shard, shard_size in enumerate(shard_sizes(size)):
+        rng = shard_rng(seed, shard)
+        for start in range(0, shard_size, CHUNK_SIZE):
+            k = min(CHUNK_SIZE, shard_size - start)
+            yield from rng.choices(rows, cum_weights=cum_weights, k=k)
+
+
+def _write_shard(task):
+    """Stream one shard's rows to its own part file in chunks"""
+    seed, shard, shard_size, path, chunk_size = task
+    _, cum_weights, row_lines = row_table()
+    rng = shard_rng(seed, shard)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for start in range(0, shard_size, chunk_size):
+            k = min(chunk_size, shard_size - start)
+            f.write("".join(rng.choices(row_lines, cum_weights=cum_weights, k=k)))
+    return path
+
+
+def parquet_schema():
+    """description as plain strings, category columns dictionary-encoded"""
+    import pyarrow as pa
+
+    category_type = pa.dictionary(pa.int16(), pa.string())
+    return pa.schema([
+        ("description", pa.string()),
+        ("master_category", category_type),
+        ("subcategory", category_type),
+    ])
+
 
-    rows.append([description, master, sub])
+def _parquet_tables():
+    """Arrow lookup tables shared by every chunk: descriptions and category codes"""
+    import pyarrow as pa
+
+    rows, _, _ = row_table()
+    master_code = {name: i for i, name in enumerate(MASTER_NAMES)}
+    sub_code = {name: i for i, name in enumerate(SUB_NAMES)}
+    return (
+        pa.array([row[0] for row in rows], pa.string()),
+        pa.array([master_code[row[1]] for row in rows], pa.int16()),
+        pa.array([sub_code[row[2]] for row in rows], pa.int16()),
+        pa.array(MASTER_NAMES, pa.string()),
+        pa.array(SUB_NAMES, pa.string()),
+    )
 
-if pd:
-    df = pd.DataFrame(rows, columns=["description", "master_category", "subcategory"])
-    df.to_csv("expense_dataset_50000.csv", index=False)
-else:
-    with open("expense_dataset_50000.csv", "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(["description", "master_category", "subcategory"])
-        writer.writerows(rows)
 
-print("Dataset generated: expense_dataset_50000.csv")
+def _write_parquet_shard(task):
+    """Stream one shard to a Parquet file, one row group per chunk"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    seed, shard, shard_size, path, chunk_size = task
+    descriptions, master_codes, sub_codes, masters, subs = _parquet_tables()
+    _, cum_weights, _ = row_table()
+    row_index = range(len(descriptions))
+    rng = shard_rng(seed, shard)
+    with pq.ParquetWriter(path, parquet_schema()) as writer:
+        for start in range(0, shard_size, chunk_size):
+            k = min(chunk_size, shard_size - start)
+            # Same draws as the CSV path, so both formats hold identical rows
+            picks = pa.array(rng.choices(row_index, cum_weights=cum_weights, k=k), pa.int32())
+            writer.write_table(pa.table({
+                "description": descriptions.take(picks),
+                "master_category": pa.DictionaryArray.from_arrays(master_codes.take(picks), masters),
+                "subcategory": pa.DictionaryArray.from_arrays(sub_codes.take(picks), subs),
+            }, schema=parquet_schema()))
+    return path
+
+
+def _run_shards(write_shard, tasks, workers):
+    if workers > 1 and len(tasks) > 1:
+        with Pool(min(workers, len(tasks))) as pool:
+            return pool.map(write_shard, tasks)
+    return [write_shard(task) for task in tasks]
+
+
+def is_parquet_output(path):
+    """True if `path` is a directory holding nothing but an earlier run's part files"""
+    return os.path.isdir(path) and all(PARQUET_PART.fullmatch(name) for name in os.listdir(path))
+
+
+def generate_parquet(output, size=DATASET_SIZE, seed=DEFAULT_SEED, workers=None):
+    """Generate `size` rows as a partitioned Parquet directory, one file per shard
+
+    Shards are written to a temporary sibling directory that replaces `output` once
+    complete. An existing `output` is only replaced if it holds earlier output.
+    """
+    try:
+        import pyarrow  # noqa: F401  (optional dependency; only needed for --format parquet)
+    except ImportError:
+        raise RuntimeError("pyarrow is not installed: pip install pyarrow") from None
+    if os.path.lexists(output) and not is_parquet_output(output):
+        raise FileExistsError(
+            f"{output} exists and is not a Parquet dataset from this script; refusing to replace it"
+        )
+    workers = workers or os.cpu_count() or 1
+    out_dir = os.path.dirname(os.path.abspath(output))
+    tmp_dir = tempfile.mkdtemp(dir=out_dir, prefix=".parquet-")
+    try:
+        tasks = [
+            (seed, shard, shard_size, os.path.join(tmp_dir, f"part-{shard:05d}.parquet"), CHUNK_SIZE)
+            for shard, shard_size in enumerate(shard_sizes(size))
+        ]
+        _run_shards(_write_parquet_shard, tasks, workers)
+        if os.path.exists(output):
+            shutil.rmtree(output)
+        os.rename(tmp_dir, output)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return output
+
+
+def generate(output, size=DATASET_SIZE, seed=DEFAULT_SEED, workers=None):
+    """Generate `size` rows to a CSV file, sharded across `workers` processes"""
+    workers = workers or os.cpu_count() or 1
+    sizes = shard_sizes(size)
+    out_dir = os.path.dirname(os.path.abspath(output))
+
+    with tempfile.TemporaryDirectory(dir=out_dir) as tmp_dir:
+        tasks = [
+            (seed, shard, shard_size, os.path.join(tmp_dir, f"part-{shard:05d}.csv"), CHUNK_SIZE)
+            for shard, shard_size in enumerate(sizes)
+        ]
+        parts = _run_shards(_write_shard, tasks, workers)
+
+        with open(output, "w", encoding="utf-8", newline="") as f:
+            csv.writer(f, lineterminator="\n").writerow(HEADER)
+            for part in parts:
+                with open(part, encoding="utf-8", newline="") as src:
+                    shutil.copyfileobj(src, f)
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic expense dataset")
+    parser.add_argument("--size", type=int, default=DATASET_SIZE, help="Number of rows")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Random seed")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--format", choices=FORMATS, default="csv",
+                        help="csv file or partitioned parquet directory")
+    parser.add_argument("--output", help="Output path (default: expense_dataset_<size>.csv or .parquet)")
+    args = parser.parse_args()
+
+    output = args.output or f"expense_dataset_{args.size}.{args.format}"
+    start = time.perf_counter()
+    if args.format == "parquet":
+        generate_parquet(output, args.size, args.seed, args.workers)
+    else:
+        generate(output, args.size, args.seed, args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"Dataset generated: {output} ({args.size} rows in {elapsed:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Knowledge distillation from the trained DistilBERT model into the tiny student
+Trains on the teacher's soft labels over the 50k generated set and benchmarks both
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+
+import numpy as np
+import pyarrow.compute as pc
+
+from predict import LABELS_FILE, MODEL_DIR, Predictor, softmax
+from student import STUDENT_DIR, StudentPredictor, featurize, pack, save_student, student_model_class
+from train import DATASET_DIR, load_heldout_split, read_table
+
+DATASET_PATH = os.path.join(DATASET_DIR, "expense_dataset_50000.csv")
+TEMPERATURE = 2.0
+EPOCHS = 10
+BATCH_SIZE = 256
+LEARNING_RATE = 0.02
+HOLDOUT_FRACTION = 0.1
+SEED = 42
+LATENCY_SAMPLES = 200
+
+
+def load_unique_descriptions(path):
+    """Distinct descriptions from a CSV or Parquet dataset, in first-seen order"""
+    return pc.unique(read_table(path).column("description")).to_pylist()
+
+
+def train_student(descriptions, soft_targets, num_labels, epochs, temperature, seed):
+    """Fit the student to the teacher's temperature-softened distribution"""
+    import torch
+    import torch.nn.functional as F
+
+    torch.manual_seed(seed)
+    rng = random.Random(seed)
+    features = [featurize(d) for d in descriptions]
+    targets = torch.from_numpy(soft_targets)
+
+    model = student_model_class()(num_labels)
+    optimizer = torch.optim.Adam(model.parameters(), lr=LEARNING_RATE)
+    order = list(range(len(descriptions)))
+
+    for epoch in range(epochs):
+        rng.shuffle(order)
+        total = 0.0
+        for start in range(0, len(order), BATCH_SIZE):
+            index = order[start:start + BATCH_SIZE]
+            ids, offsets = pack([features[i] for i in index])
+            log_probs = F.log_softmax(model(ids, offsets) / temperature, dim=-1)
+            loss = F.kl_div(log_probs, targets[index], reduction="batchmean") * temperature ** 2
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            total += loss.item() * len(index)
+        print(f"   Epoch {epoch + 1}/{epochs}: distillation loss {total / len(order):.4f}")
+
+    model.eval()
+    return model
+
+
+def param_megabytes(module):
+    return sum(p.numel() * p.element_size() for p in module.parameters()) / 1e6
+
+
+def latency_ms(predictor, descriptions):
+    """Single-row p50 latency and amortised per-row latency in one batch"""
+    single = []
+    for description in descriptions[:LATENCY_SAMPLES]:
+        start = time.perf_counter()
+        predictor.predict_batch([description], top_k=1)
+        single.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    predictor.predict_batch(descriptions, top_k=1)
+    batched = (time.perf_counter() - start) * 1000 / len(descriptions)
+    return float(np.percentile(single, 50)), batched
+
+
+def benchmark(teacher, student, holdout):
+    """Compare student and teacher on accuracy, latency per row and memory"""
+    print("\n📊 Benchmarking student vs teacher...")
+    # The teacher's own held-out split, so neither model is scored on the teacher's training rows
+    test_dataset, label_encoder = load_heldout_split(teacher.manifest)
+    eval_descriptions = test_dataset["description"]
+    expected = label_encoder.inverse_transform(test_dataset["label"])
+
+    teacher_on_holdout = teacher.predict_proba(holdout).argmax(axis=1)
+    student_on_holdout = student.predict_proba(holdout).argmax(axis=1)
+
+    report = {
+        "teacher_version": teacher.model_version,
+        "student_version": student.model_version,
+        "agreement_on_50k_holdout": float(np.mean(teacher_on_holdout == student_on_holdout)),
+    }
+    for name, predictor, module in (("teacher", teacher, teacher.model), ("student", student, student.model)):
+        predictions = predictor.predict_proba(eval_descriptions).argmax(axis=1)
+        single_p50, batched = latency_ms(predictor, eval_descriptions)
+        report[name] = {
+            "accuracy": float(np.mean(predictor.labels[predictions] == expected)),
+            "single_row_p50_ms": single_p50,
+            "batched_ms_per_row": batched,
+            "params_mb": param_megabytes(module),
+        }
+
+    print(f"\n{'model':>8} {'accuracy':>10} {'p50 ms':>8} {'ms/row':>8} {'MB':>8}")
+    for name in ("teacher", "student"):
+        r = report[name]
+        print(f"{name:>8} {r['accuracy']:>10.4f} {r['single_row_p50_ms']:>8.3f} "
+              f"{r['batched_ms_per_row']:>8.4f} {r['params_mb']:>8.1f}")
+    print(f"\n🤝 Student/teacher agreement on held-out 50k rows: "
+          f"{report['agreement_on_50k_holdout']:.2%}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distill the DistilBERT teacher into a tiny student")
+    parser.add_argument("--teacher-dir", default=MODEL_DIR)
+    parser.add_argument("--labels-file", default=LABELS_FILE)
+    parser.add_argument("--dataset", default=DATASET_PATH)
+    parser.add_argument("--student-dir", default=STUDENT_DIR)
+    parser.add_argument("--report", help="Benchmark JSON (default: <student-dir>_benchmark.json)")
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    parser.add_argument("--temperature", type=float, default=TEMPERATURE)
+    parser.add_argument("--seed", type=int, default=SEED)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🎓 KNOWLEDGE DISTILLATION - STUDENT TRAINING")
+    print("=" * 60)
+
+    print(f"\n📥 Loading teacher from {args.teacher_dir}...")
+    teacher = Predictor(args.teacher_dir, args.labels_file)
+
+    descriptions = load_unique_descriptions(args.dataset)
+    random.Random(args.seed).shuffle(descriptions)
+    holdout_size = max(1, int(len(descriptions) * HOLDOUT_FRACTION))
+    holdout, train_descriptions = descriptions[:holdout_size], descriptions[holdout_size:]
+    print(f"✅ {len(train_descriptions)} unique training descriptions, {len(holdout)} held out")
+
+    print("\n🏷️  Computing teacher soft labels...")
+    soft_targets = softmax(teacher.logits(train_descriptions) / args.temperature).astype(np.float32)
+
+    print("\n🚀 Training student...")
+    model = train_student(
+        train_descriptions, soft_targets, teacher.num_labels, args.epochs, args.temperature, args.seed
+    )
+    save_student(model, teacher.labels.tolist(), args.student_dir, temperature=args.temperature)
+
+    report = benchmark(teacher, StudentPredictor(args.student_dir), holdout)
+    # Beside the student, not in it: the directory's contents are its model_version
+    report_path = args.report or os.path.normpath(args.student_dir) + "_benchmark.json"
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print("\n" + "=" * 60)
+    print("✅ DISTILLATION COMPLETE!")
+    print("=" * 60)
+    print(f"\n📁 Student saved to: {args.student_dir}")
+    print(f"📁 Benchmark saved to: {report_path}")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main()
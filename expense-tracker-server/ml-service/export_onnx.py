@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Export the trained model to ONNX and an INT8 dynamically quantized variant
+Runs a parity check against FP32 on the held-out split
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from predict import (
+    INT8_ONNX_PATH,
+    LABELS_FILE,
+    MODEL_DIR,
+    ONNX_PATH,
+    OnnxPredictor,
+    Predictor,
+)
+from manifest import has_manifest, read_manifest
+from train import accuracy_resolution, load_heldout_split
+
+OPSET_VERSION = 14
+LATENCY_SAMPLES = 200
+
+
+def export_onnx(model_dir, onnx_path):
+    """Export the FP32 checkpoint to an ONNX graph with dynamic batch/sequence axes"""
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    class LogitsOnly(torch.nn.Module):
+        """Wraps the classifier so the exported graph has a single `logits` output"""
+
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+    print(f"\n📦 Exporting {model_dir} to ONNX...")
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    model = AutoModelForSequenceClassification.from_pretrained(model_dir)
+    model.eval()
+
+    sample = tokenizer(["Paid rent for apartment"], return_tensors="pt")
+    os.makedirs(os.path.dirname(onnx_path), exist_ok=True)
+    torch.onnx.export(
+        LogitsOnly(model),
+        (sample["input_ids"], sample["attention_mask"]),
+        onnx_path,
+        input_names=["input_ids", "attention_mask"],
+        output_names=["logits"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "logits": {0: "batch"},
+        },
+        opset_version=OPSET_VERSION,
+    )
+    print(f"✅ Saved ONNX graph to: {onnx_path}")
+
+
+def quantize_int8(onnx_path, int8_path):
+    """Dynamically quantize the ONNX graph's weights to INT8"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    print("\n🗜️  Quantizing to INT8...")
+    quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QInt8)
+    print(f"✅ Saved INT8 graph to: {int8_path}")
+
+
+def weights_size(path):
+    """Size in MB of a weights file, or of the weights inside a model directory"""
+    if os.path.isfile(path):
+        return os.path.getsize(path) / 1e6
+    for name in ("model.safetensors", "pytorch_model.bin"):
+        candidate = os.path.join(path, name)
+        if os.path.exists(candidate):
+            return os.path.getsize(candidate) / 1e6
+    return float("nan")
+
+
+def evaluate(predictor, descriptions, expected):
+    """Accuracy over the held-out split and single-row latency percentiles"""
+    predictions = predictor.predict_batch(descriptions, top_k=1)
+    accuracy = float(np.mean([p["category"] == e for p, e in zip(predictions, expected)]))
+
+    latencies = []
+    for description in descriptions[:LATENCY_SAMPLES]:
+        start = time.perf_counter()
+        predictor.predict_batch([description], top_k=1)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "rows": len(descriptions),
+        "accuracy": accuracy,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
+
+
+def parity_check(model_dir, labels_file, onnx_path, int8_path):
+    """Compare FP32, ONNX and INT8 on the held-out split the model was trained against"""
+    print("\n🔍 Running parity check on the held-out split...")
+    manifest = read_manifest(model_dir) if has_manifest(model_dir) else {}
+    test_dataset, label_encoder = load_heldout_split(manifest)
+    descriptions = test_dataset["description"]
+    expected = label_encoder.inverse_transform(test_dataset["label"]).tolist()
+
+    backends = [
+        ("fp32", Predictor(model_dir, labels_file), model_dir),
+        ("onnx", OnnxPredictor(onnx_path, model_dir, labels_file), onnx_path),
+        ("int8", OnnxPredictor(int8_path, model_dir, labels_file), int8_path),
+    ]
+
+    report = {}
+    for name, predictor, path in backends:
+        result = evaluate(predictor, descriptions, expected)
+        result["size_mb"] = weights_size(path)
+        report[name] = result
+
+    baseline = report["fp32"]["accuracy"]
+    print(f"\n{'backend':>8} {'accuracy':>10} {'delta':>9} {'p50 ms':>8} {'p99 ms':>8} {'size MB':>9}")
+    for name, result in report.items():
+        result["accuracy_delta"] = result["accuracy"] - baseline
+        print(
+            f"{name:>8} {result['accuracy']:>10.4f} {result['accuracy_delta']:>+9.4f} "
+            f"{result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['size_mb']:>9.1f}"
+        )
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the model to ONNX and INT8")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--labels-file", default=LABELS_FILE)
+    parser.add_argument("--onnx-path", default=ONNX_PATH)
+    parser.add_argument("--int8-path", default=INT8_ONNX_PATH)
+    parser.add_argument("--skip-parity", action="store_true", help="Export only")
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.01,
+                        help="Fail if INT8 accuracy drops more than this vs FP32")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("📦 ONNX EXPORT + INT8 QUANTIZATION")
+    print("=" * 60)
+
+    export_onnx(args.model_dir, args.onnx_path)
+    quantize_int8(args.onnx_path, args.int8_path)
+
+    if not args.skip_parity:
+        report = parity_check(args.model_dir, args.labels_file, args.onnx_path, args.int8_path)
+        # One held-out row is worth more than 1% on the deduplicated split
+        max_drop = max(args.max_accuracy_drop, accuracy_resolution(report["int8"]["rows"]))
+        if -report["int8"]["accuracy_delta"] > max_drop + 1e-9:
+            print(f"\n❌ INT8 accuracy dropped more than {max_drop:.2%}")
+            raise SystemExit(1)
+
+    print("\n" + "=" * 60)
+    print("✅ EXPORT COMPLETE!")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main()
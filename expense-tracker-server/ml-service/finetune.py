@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Incremental fine-tuning from user corrections
+Continues from ./model on newly labeled rows plus a replay sample of the original data
+"""
+
+import argparse
+import os
+import tempfile
+
+import numpy as np
+import pyarrow as pa
+
+from manifest import has_manifest, read_manifest, write_manifest
+from predict import LABELS_FILE, load_labels
+from train import (
+    BATCH_SIZE,
+    DATASET_PATH,
+    GROUP_BY_LENGTH,
+    LABEL_COLUMN,
+    MAX_LENGTH,
+    MODEL_NAME,
+    OUTPUT_DIR,
+    PADDING,
+    SPLIT_SEED,
+    accuracy_resolution,
+    collapse_duplicates,
+    compute_metrics,
+    create_dataset,
+    encode_labels,
+    make_collator,
+    read_table,
+    tokenize_dataset,
+    trained_dedupe,
+)
+
+LEARNING_RATE = 1e-5
+EPOCHS = 2
+# Replayed original rows per corrected row, so old categories are not forgotten
+REPLAY_RATIO = 4
+# Largest allowed drop in held-out accuracy before the update is rejected; never
+# tighter than one held-out row, which the small deduplicated split makes coarse
+MAX_REGRESSION = 0.005
+
+
+def load_labeled(path, label_column, classes, dedupe=False):
+    """Descriptions and label indices of a CSV/Parquet file under the given classes"""
+    from datasets import Dataset
+
+    table = read_table(path)
+    table = pa.table({
+        "description": table.column("description"),
+        "label": encode_labels(table.column(label_column), classes),
+    })
+    return Dataset(collapse_duplicates(table) if dedupe else table)
+
+
+def extend_classes(labels, names):
+    """Append unseen category names after the existing labels, keeping old indices stable"""
+    known = set(labels)
+    new = sorted({name for name in names if name not in known})
+    return labels + new, new
+
+
+def expand_classifier(model, labels):
+    """Grow the classification head to `labels`, copying the trained rows"""
+    import torch
+
+    old = model.classifier
+    new = torch.nn.Linear(old.in_features, len(labels))
+    with torch.no_grad():
+        new.weight.normal_(mean=0.0, std=model.config.initializer_range)
+        # Start new classes at the average old bias so they neither dominate nor vanish
+        new.bias.fill_(old.bias.mean().item())
+        new.weight[:old.out_features] = old.weight
+        new.bias[:old.out_features] = old.bias
+    model.classifier = new
+    model.num_labels = len(labels)
+    model.config.num_labels = len(labels)
+    model.config.id2label = {i: name for i, name in enumerate(labels)}
+    model.config.label2id = {name: i for i, name in enumerate(labels)}
+
+
+def accuracy(model, dataset, tokenizer, padding):
+    """Accuracy of `model` on a tokenized dataset"""
+    from transformers import Trainer, TrainingArguments
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        args = TrainingArguments(
+            output_dir=output_dir,
+            per_device_eval_batch_size=BATCH_SIZE * 4,
+            report_to=[],
+        )
+        trainer = Trainer(
+            model=model,
+            args=args,
+            data_collator=make_collator(tokenizer, padding),
+            compute_metrics=compute_metrics,
+        )
+        return trainer.evaluate(dataset)["eval_accuracy"]
+
+
+def build_training_set(corrections, original_train, replay_ratio, seed):
+    """Corrections mixed with a random replay sample of the original training split"""
+    from datasets import concatenate_datasets
+
+    replay_size = min(len(original_train), int(len(corrections) * replay_ratio))
+    rng = np.random.default_rng(seed)
+    replay_idx = rng.choice(len(original_train), size=replay_size, replace=False)
+    replay = original_train.select(np.sort(replay_idx))
+    print(f"✅ {len(corrections)} corrected rows + {len(replay)} replayed rows")
+    return concatenate_datasets([corrections, replay]).shuffle(seed=seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fine-tune the trained model on new labeled rows")
+    parser.add_argument("corrections", help="CSV or Parquet with description and category columns")
+    parser.add_argument("--dataset", default=DATASET_PATH, help="Original training data for replay")
+    parser.add_argument("--label-column", default=LABEL_COLUMN)
+    parser.add_argument("--model-dir", default=OUTPUT_DIR)
+    parser.add_argument("--labels-file", default=LABELS_FILE,
+                        help="Legacy labels.pkl, only read when the model has no manifest.json")
+    parser.add_argument("--output-dir", help="Where to write the updated model (default: update in place)")
+    parser.add_argument("--epochs", type=float, default=EPOCHS)
+    parser.add_argument("--learning-rate", type=float, default=LEARNING_RATE)
+    parser.add_argument("--replay-ratio", type=float, default=REPLAY_RATIO)
+    parser.add_argument("--max-regression", type=float, default=MAX_REGRESSION)
+    parser.add_argument("--seed", type=int, default=SPLIT_SEED)
+    args = parser.parse_args()
+    output_dir = args.output_dir or args.model_dir
+
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer, Trainer, TrainingArguments
+
+    print("=" * 60)
+    print("🔁 INCREMENTAL FINE-TUNING")
+    print("=" * 60)
+
+    previous = read_manifest(args.model_dir) if has_manifest(args.model_dir) else {}
+    corrected_names = read_table(args.corrections).column(args.label_column).cast(pa.string())
+    classes, new_classes = extend_classes(
+        load_labels(args.model_dir, args.labels_file).tolist(), corrected_names.unique().to_pylist()
+    )
+    if new_classes:
+        print(f"🆕 New categories: {new_classes}")
+
+    # Original classes are a prefix of `classes`, and deduplication follows the original
+    # run (models from before it existed used a row-level split), so the held-out split
+    # matches train.py's
+    dedupe = trained_dedupe(previous) != "off"
+    original_train, holdout = create_dataset(
+        load_labeled(args.dataset, args.label_column, classes, dedupe)
+    )
+    original_train = original_train.select_columns(["description", "label"])
+    corrections = load_labeled(args.corrections, args.label_column, classes)
+    train_dataset = build_training_set(corrections, original_train, args.replay_ratio, args.seed)
+
+    print(f"\n📥 Loading model from {args.model_dir}...")
+    tokenizer = AutoTokenizer.from_pretrained(args.model_dir)
+    model = AutoModelForSequenceClassification.from_pretrained(args.model_dir)
+    train_dataset, holdout = tokenize_dataset(train_dataset, holdout, tokenizer, PADDING)
+
+    print("\n📊 Baseline accuracy on the held-out split...")
+    baseline = accuracy(model, holdout, tokenizer, PADDING)
+    print(f"✅ Baseline: {baseline:.4f}")
+
+    if new_classes:
+        expand_classifier(model, classes)
+
+    print("\n🚀 Fine-tuning...")
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        training_args = TrainingArguments(
+            output_dir=scratch_dir,
+            learning_rate=args.learning_rate,
+            per_device_train_batch_size=BATCH_SIZE,
+            num_train_epochs=args.epochs,
+            weight_decay=0.01,
+            warmup_ratio=0.1,
+            save_strategy="no",
+            logging_steps=50,
+            report_to=[],
+            seed=args.seed,
+            group_by_length=GROUP_BY_LENGTH,
+        )
+        Trainer(
+            model=model,
+            args=training_args,
+            train_dataset=train_dataset,
+            data_collator=make_collator(tokenizer, PADDING),
+        ).train()
+
+    updated = accuracy(model, holdout, tokenizer, PADDING)
+    print(f"\n📊 Held-out accuracy: {baseline:.4f} -> {updated:.4f} ({updated - baseline:+.4f})")
+    max_regression = max(args.max_regression, accuracy_resolution(len(holdout)))
+    if baseline - updated > max_regression + 1e-9:
+        print(f"❌ Accuracy dropped more than {max_regression:.2%}; model not saved")
+        raise SystemExit(1)
+
+    print("\n💾 Saving model...")
+    os.makedirs(output_dir, exist_ok=True)
+    model.save_pretrained(output_dir, safe_serialization=True)
+    tokenizer.save_pretrained(output_dir)
+    # Keep what the original training run recorded (dataset, training settings)
+    fields = {"base_model": MODEL_NAME, "max_length": MAX_LENGTH, "padding": PADDING}
+    fields.update({k: v for k, v in previous.items() if k not in ("manifest_version", "created_at", "labels")})
+    fields.update(
+        label_column=args.label_column,
+        metrics={"eval_accuracy": updated, "baseline_eval_accuracy": baseline},
+        finetune={
+            "corrections": os.path.basename(args.corrections),
+            "rows": len(corrections),
+            "new_labels": new_classes,
+            "replay_ratio": args.replay_ratio,
+            "epochs": args.epochs,
+            "learning_rate": args.learning_rate,
+        },
+    )
+    write_manifest(output_dir, classes, **fields)
+
+    print("\n" + "=" * 60)
+    print("✅ FINE-TUNING COMPLETE!")
+    print("=" * 60)
+    print(f"\n📁 Model saved to: {output_dir}")
+    print(f"📁 Manifest saved to: {os.path.join(output_dir, 'manifest.json')}")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main()
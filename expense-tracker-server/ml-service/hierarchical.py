@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Hierarchical master/subcategory classifier
+One shared encoder with a master head and a subcategory head masked to the master's children
+"""
+
+import functools
+import json
+import os
+
+import numpy as np
+
+HIERARCHY_FILE = "hierarchy.json"
+HEADS_FILE = "heads.pt"
+ENCODER_DIR = "encoder"
+MAX_LENGTH = 64
+BATCH_SIZE = 64
+
+
+def build_hierarchy(pairs):
+    """Master list, subcategory list and master -> children map from (master, sub) pairs"""
+    masters = sorted({master for master, _ in pairs})
+    subcategories = sorted({sub for _, sub in pairs})
+    children = {master: set() for master in masters}
+    for master, sub in pairs:
+        children[master].add(sub)
+    return {
+        "masters": masters,
+        "subcategories": subcategories,
+        "children": {master: sorted(subs) for master, subs in children.items()},
+    }
+
+
+def child_mask(hierarchy):
+    """(num_masters, num_subcategories) bool matrix of allowed subcategories"""
+    import torch
+
+    sub_index = {sub: i for i, sub in enumerate(hierarchy["subcategories"])}
+    mask = torch.zeros(len(hierarchy["masters"]), len(sub_index), dtype=torch.bool)
+    for m, master in enumerate(hierarchy["masters"]):
+        for sub in hierarchy["children"][master]:
+            mask[m, sub_index[sub]] = True
+    return mask
+
+
+@functools.lru_cache(maxsize=None)
+def hierarchical_classifier_class():
+    """HierarchicalClassifier, defined on first use so importing this module does not load torch"""
+    import torch
+    from torch import nn
+
+    class HierarchicalClassifier(nn.Module):
+        """Shared encoder with master and subcategory heads"""
+
+        def __init__(self, encoder, hierarchy, dropout=0.1):
+            super().__init__()
+            self.encoder = encoder
+            self.hierarchy = hierarchy
+            hidden_size = encoder.config.hidden_size
+            self.dropout = nn.Dropout(dropout)
+            self.master_head = nn.Linear(hidden_size, len(hierarchy["masters"]))
+            self.sub_head = nn.Linear(hidden_size, len(hierarchy["subcategories"]))
+            self.register_buffer("child_mask", child_mask(hierarchy), persistent=False)
+
+        def forward(self, input_ids, attention_mask=None, master_labels=None, sub_labels=None):
+            hidden = self.encoder(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+            pooled = self.dropout(hidden[:, 0])
+            master_logits = self.master_head(pooled)
+            sub_logits = self.sub_head(pooled)
+
+            min_value = torch.finfo(sub_logits.dtype).min
+            # Returned subcategories are restricted to the predicted master's children
+            predicted = master_logits.argmax(dim=-1)
+            outputs = {
+                "master_logits": master_logits,
+                "sub_logits": sub_logits.masked_fill(~self.child_mask[predicted], min_value),
+            }
+            if master_labels is not None and sub_labels is not None:
+                # The loss masks by the true master, in training and eval alike; a wrong
+                # master prediction would otherwise mask the true subcategory out
+                teacher = sub_logits.masked_fill(~self.child_mask[master_labels], min_value)
+                loss_fn = nn.CrossEntropyLoss()
+                outputs["loss"] = loss_fn(master_logits, master_labels) + loss_fn(teacher, sub_labels)
+            return outputs
+
+        def save(self, output_dir):
+            """Save encoder, heads and hierarchy to a directory"""
+            os.makedirs(output_dir, exist_ok=True)
+            self.encoder.save_pretrained(os.path.join(output_dir, ENCODER_DIR))
+            torch.save(
+                {"master_head": self.master_head.state_dict(), "sub_head": self.sub_head.state_dict()},
+                os.path.join(output_dir, HEADS_FILE),
+            )
+            with open(os.path.join(output_dir, HIERARCHY_FILE), "w") as f:
+                json.dump(self.hierarchy, f, indent=2)
+
+        @classmethod
+        def load(cls, model_dir):
+            from transformers import AutoModel
+
+            with open(os.path.join(model_dir, HIERARCHY_FILE)) as f:
+                hierarchy = json.load(f)
+            encoder = AutoModel.from_pretrained(os.path.join(model_dir, ENCODER_DIR))
+            model = cls(encoder, hierarchy)
+            heads = torch.load(os.path.join(model_dir, HEADS_FILE), map_location="cpu")
+            model.master_head.load_state_dict(heads["master_head"])
+            model.sub_head.load_state_dict(heads["sub_head"])
+            model.eval()
+            return model
+
+    return HierarchicalClassifier
+
+
+def __getattr__(name):
+    # `from hierarchical import HierarchicalClassifier` keeps working; torch loads at that point
+    if name == "HierarchicalClassifier":
+        return hierarchical_classifier_class()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class HierarchicalPredictor:
+    """Returns master and subcategory for each description from one forward pass"""
+
+    def __init__(self, model_dir, max_length=MAX_LENGTH, batch_size=BATCH_SIZE):
+        from transformers import AutoTokenizer
+
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.model = hierarchical_classifier_class().load(model_dir)
+        self.masters = np.asarray(self.model.hierarchy["masters"], dtype=object)
+        self.subcategories = np.asarray(self.model.hierarchy["subcategories"], dtype=object)
+
+    def _forward(self, batch):
+        import torch
+
+        inputs = self.tokenizer(
+            batch,
+            return_tensors="pt",
+            truncation=True,
+            padding=True,
+            max_length=self.max_length,
+        )
+        with torch.inference_mode():
+            outputs = self.model(input_ids=inputs["input_ids"], attention_mask=inputs["attention_mask"])
+        return (
+            torch.softmax(outputs["master_logits"], dim=-1).numpy(),
+            torch.softmax(outputs["sub_logits"], dim=-1).numpy(),
+        )
+
+    def predict_batch(self, descriptions):
+        descriptions = list(descriptions)
+        master_probs = np.zeros((len(descriptions), len(self.masters)), dtype=np.float32)
+        sub_probs = np.zeros((len(descriptions), len(self.subcategories)), dtype=np.float32)
+
+        order = sorted(range(len(descriptions)), key=lambda i: len(descriptions[i]))
+        for start in range(0, len(order), self.batch_size):
+            index = order[start:start + self.batch_size]
+            master_probs[index], sub_probs[index] = self._forward([descriptions[i] for i in index])
+
+        master_idx = master_probs.argmax(axis=1)
+        sub_idx = sub_probs.argmax(axis=1)
+        rows = np.arange(len(descriptions))
+        return [
+            {
+                "description": description,
+                "master_category": master,
+                "master_confidence": float(master_conf),
+                "subcategory": sub,
+                "sub_confidence": float(sub_conf),
+            }
+            for description, master, master_conf, sub, sub_conf in zip(
+                descriptions,
+                self.masters[master_idx],
+                master_probs[rows, master_idx],
+                self.subcategories[sub_idx],
+                sub_probs[rows, sub_idx],
+            )
+        ]
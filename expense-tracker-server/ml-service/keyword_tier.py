@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Keyword tier for expense categorization
+Matches descriptions against a compiled keyword trie before falling back to the model
+"""
+
+import argparse
+import json
+import re
+import string
+import time
+
+from dataset import generate_expense_dataset_50000 as vocab
+
+# Higher rank wins when several keywords match one description
+SOURCE_RANK = {"template": 0, "merchant": 1, "subcategory": 2, "user": 3}
+SKIP_SUBCATEGORIES = {"Other"}
+STOPWORDS = {
+    "a", "an", "and", "at", "for", "from", "in", "of", "on", "the", "to", "via",
+    "aur", "ka", "ke", "ki", "me", "se", "liya", "liye", "kiya",
+}
+MIN_KEYWORD_LENGTH = 4
+
+# Generator master categories -> labels of the default 15k model
+# (dataset/expense_training_dataset_15000.csv). Masters missing here have no
+# counterpart in that label set, so their keywords are dropped.
+LEGACY_LABELS = {
+    "Food & Dining": "food",
+    "Groceries": "groceries",
+    "Travel": "travel",
+    "Transport": "travel",
+    "Fuel": "travel",
+    "Bills & Utilities": "bills",
+    "Entertainment": "entertainment",
+    "Shopping": "shopping",
+    "Health & Medicine": "medicine",
+    "Repairs & Maintenance": "other",
+    "Miscellaneous / Other": "other",
+}
+
+
+def normalize_keyword(keyword):
+    return " ".join(keyword.lower().split())
+
+
+def _add(table, keyword, master, sub, source):
+    keyword = normalize_keyword(keyword)
+    if keyword:
+        table.setdefault(keyword, set()).add((master, sub, source))
+
+
+def template_fragments(template):
+    """Literal text between placeholders, trimmed of punctuation"""
+    for literal, _, _, _ in string.Formatter().parse(template):
+        fragment = literal.strip(" :,.-")
+        if len(fragment) >= MIN_KEYWORD_LENGTH:
+            yield fragment
+
+
+def distinctive_words():
+    """Template words used under exactly one master category"""
+    masters_by_word = {}
+    for master, subcategories in vocab.CATEGORIES.items():
+        for sub in subcategories:
+            for template in vocab.TEMPLATES[sub]:
+                for fragment in template_fragments(template):
+                    for word in fragment.lower().split():
+                        masters_by_word.setdefault(word, set()).add(master)
+    return {
+        word for word, masters in masters_by_word.items()
+        if len(masters) == 1 and word not in STOPWORDS
+    }
+
+
+def vocabulary_keywords():
+    """Keyword -> (master, subcategory, source) seeded from the dataset generator
+
+    Keywords that point at more than one master category are dropped as ambiguous;
+    a keyword shared by several subcategories of one master keeps only the master.
+    """
+    candidates = {}
+    pool_targets = {name: set() for name in vocab.POOLS}
+    # Fragments made only of generic words ("Bought", "Paid") say nothing on their own
+    distinctive = distinctive_words()
+
+    for master, subcategories in vocab.CATEGORIES.items():
+        for sub in subcategories:
+            if sub in SKIP_SUBCATEGORIES:
+                continue
+            for name in sub.split("/"):
+                _add(candidates, name, master, sub, "subcategory")
+            for template in vocab.TEMPLATES[sub]:
+                for fragment in template_fragments(template):
+                    if any(w in distinctive for w in fragment.lower().split()):
+                        _add(candidates, fragment, master, sub, "template")
+                for field in vocab.template_fields(template):
+                    pool_targets[field].add((master, sub))
+
+    for field, targets in pool_targets.items():
+        for value in vocab.POOLS[field]:
+            for master, sub in targets:
+                _add(candidates, value, master, sub, "merchant")
+
+    keywords = {}
+    for keyword, targets in candidates.items():
+        masters = {master for master, _, _ in targets}
+        if len(masters) != 1:
+            continue
+        subs = {sub for _, sub, _ in targets}
+        source = max((source for _, _, source in targets), key=SOURCE_RANK.get)
+        keywords[keyword] = (masters.pop(), subs.pop() if len(subs) == 1 else None, source)
+    return keywords
+
+
+def label_map_for(labels):
+    """Master category -> model label for a model trained on `labels`
+
+    None when the labels include every master category. A model trained on some of
+    them keeps those; otherwise the LEGACY_LABELS entries whose label the model has
+    (possibly none).
+    """
+    labels = set(labels)
+    if set(vocab.CATEGORIES) <= labels:
+        return None
+    if labels & set(vocab.CATEGORIES):
+        return {master: master for master in vocab.CATEGORIES if master in labels}
+    return {master: label for master, label in LEGACY_LABELS.items() if label in labels}
+
+
+def load_user_keywords(path):
+    """User keywords from JSON: {"keyword": "Master"} or {"keyword": ["Master", "Sub"]}"""
+    with open(path) as f:
+        raw = json.load(f)
+    keywords = {}
+    for keyword, target in raw.items():
+        master, sub = (target, None) if isinstance(target, str) else (target[0], target[1])
+        keywords[normalize_keyword(keyword)] = (master, sub, "user")
+    return keywords
+
+
+def compile_trie(keywords):
+    """Compile keywords into one regex shaped like a trie
+
+    Alternatives are factored by shared prefix, so the regex engine walks the
+    text once per start position instead of trying every keyword. Longer
+    continuations are tried first, so the longest keyword at a position wins.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def emit(node):
+        end = "" in node
+        branches = [
+            # Any run of whitespace except the newline that separates batch rows
+            (r"[^\S\n]+" if char == " " else re.escape(char)) + emit(child)
+            for char, child in sorted(node.items()) if char
+        ]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if end:
+            return "(?:" + body + ")?"
+        return body
+
+    return r"(?<!\w)" + emit(trie) + r"(?!\w)"
+
+
+def _is_word_char(text, index):
+    if index < 0 or index >= len(text):
+        return False
+    char = text[index]
+    return char.isalnum() or char == "_"
+
+
+class KeywordTier:
+    """Compiled keyword matcher returning category, match source and span
+
+    `label_map` renames the generator's master categories to a model's labels and
+    drops keywords of unmapped masters. User keywords are kept as given.
+    """
+
+    def __init__(self, user_keywords=None, label_map=None):
+        self.keywords = vocabulary_keywords()
+        if label_map is not None:
+            self.keywords = {
+                keyword: (label_map[master], sub, source)
+                for keyword, (master, sub, source) in self.keywords.items()
+                if master in label_map
+            }
+        # User keywords override the seeded vocabulary
+        self.keywords.update(user_keywords or {})
+        pattern = compile_trie(self.keywords)
+        # Keywords are stored lowercased and matched against lowercased text
+        self.pattern = re.compile(pattern)
+        # Newlines come back as their own tokens and mark row boundaries
+        self._scanner = re.compile(r"\n|" + pattern)
+        self._priority = {
+            keyword: (SOURCE_RANK[source], len(keyword))
+            for keyword, (_, _, source) in self.keywords.items()
+        }
+
+    def _lookup(self, token):
+        if token in self._priority:
+            return token
+        return normalize_keyword(token)
+
+    def _span(self, keyword, lowered):
+        """Position of `keyword` as a whole word in the row"""
+        start = lowered.find(keyword)
+        while start >= 0:
+            end = start + len(keyword)
+            if not _is_word_char(lowered, start - 1) and not _is_word_char(lowered, end):
+                return (start, end)
+            start = lowered.find(keyword, start + 1)
+        # Whitespace inside the match differed from the stored keyword
+        for match in self.pattern.finditer(lowered):
+            if normalize_keyword(match.group()) == keyword:
+                return match.span()
+        return None
+
+    def _result(self, keyword, lowered):
+        """Result dict for a row's winning keyword, with its span in the row"""
+        span = self._span(keyword, lowered)
+        master, sub, source = self.keywords[keyword]
+        return {
+            "category": master,
+            "subcategory": sub,
+            "source": "keyword",
+            "match_source": source,
+            "keyword": keyword,
+            "span": span,
+        }
+
+    def match(self, description):
+        """Best keyword match for one description, or None"""
+        return self.match_batch([description])[0]
+
+    def match_batch(self, descriptions):
+        """Best match per description (None when nothing matches), in one regex scan
+
+        Identical descriptions are scanned once and share one (read-only) result.
+        """
+        rows = [d.replace("\n", " ").lower() for d in descriptions]
+        unique = list(dict.fromkeys(rows))
+        best = [None] * len(unique)
+        best_priority = [None] * len(unique)
+
+        row = 0
+        for token in self._scanner.findall("\n".join(unique)):
+            if token == "\n":
+                row += 1
+                continue
+            keyword = self._lookup(token)
+            priority = self._priority[keyword]
+            # Strictly greater, so the leftmost keyword wins a tie
+            if best_priority[row] is None or priority > best_priority[row]:
+                best[row] = keyword
+                best_priority[row] = priority
+
+        results = {
+            lowered: self._result(keyword, lowered) if keyword else None
+            for keyword, lowered in zip(best, unique)
+        }
+        return [results[lowered] for lowered in rows]
+
+    def categorize(self, descriptions, predictor=None, top_k=1):
+        """Keyword matches first; rows with no match go to `predictor` if given"""
+        descriptions = list(descriptions)
+        results = self.match_batch(descriptions)
+        unmatched = [i for i, result in enumerate(results) if result is None]
+        if predictor is not None and unmatched:
+            predictions = predictor.predict_batch([descriptions[i] for i in unmatched], top_k=top_k)
+            for i, prediction in zip(unmatched, predictions):
+                results[i] = {**prediction, "source": "ml"}
+        return results
+
+
+def benchmark(tier, descriptions, repeat=5):
+    """Descriptions matched per millisecond using match_batch"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        tier.match_batch(descriptions)
+        best = min(best, time.perf_counter() - start)
+    return len(descriptions) / (best * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keyword tier for expense categorization")
+    parser.add_argument("descriptions", nargs="*", help="Descriptions to match")
+    parser.add_argument("--user-keywords", help="JSON file of extra keywords")
+    parser.add_argument("--bench", help="CSV dataset to benchmark matching throughput on")
+    args = parser.parse_args()
+
+    user_keywords = load_user_keywords(args.user_keywords) if args.user_keywords else None
+    tier = KeywordTier(user_keywords)
+    print(f"🔑 Compiled {len(tier.keywords)} keywords")
+
+    for description, result in zip(args.descriptions, tier.match_batch(args.descriptions)):
+        print(f"\n📝 {description}")
+        if result:
+            print(f"   ✅ {result['category']} / {result['subcategory']} "
+                  f"({result['match_source']}: '{result['keyword']}' at {result['span']})")
+        else:
+            print("   ➡️  No keyword match, send to model")
+
+    if args.bench:
+        import csv
+        with open(args.bench, newline="", encoding="utf-8") as f:
+            descriptions = [row["description"] for row in csv.DictReader(f)]
+        distinct = list(dict.fromkeys(descriptions))
+        matched = sum(r is not None for r in tier.match_batch(descriptions))
+        # Distinct rows are the honest figure: repeats reuse one scan and one result
+        unique_rate = benchmark(tier, distinct)
+        rate = benchmark(tier, descriptions)
+        print(f"\n⏱️  {unique_rate:,.0f} descriptions/ms over {len(distinct)} distinct descriptions "
+              f"({matched / len(descriptions):.1%} of rows matched)")
+        print(f"⏱️  {rate:,.0f} descriptions/ms over all {len(descriptions)} rows, "
+              f"repeats included")
+
+if __name__ == "__main__":
+    main()
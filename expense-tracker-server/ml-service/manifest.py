@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Versioned JSON manifest stored alongside the model weights
+Records labels, tokenizer settings, dataset fingerprint and metrics; readable without sklearn
+"""
+
+import json
+import os
+import time
+
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def manifest_path(model_dir):
+    return os.path.join(model_dir, MANIFEST_FILE)
+
+
+def has_manifest(model_dir):
+    return os.path.isfile(manifest_path(model_dir))
+
+
+def read_manifest(model_dir):
+    """Load and sanity-check a model directory's manifest"""
+    with open(manifest_path(model_dir)) as f:
+        manifest = json.load(f)
+    version = manifest.get("manifest_version")
+    if version != MANIFEST_VERSION:
+        raise ValueError(
+            f"{manifest_path(model_dir)} has manifest_version {version!r}, expected {MANIFEST_VERSION}"
+        )
+    return manifest
+
+
+def write_manifest(model_dir, labels, **fields):
+    """Write the manifest; `labels[i]` is the category for class index i
+
+    Other fields (base_model, max_length, padding, dataset, metrics, ...) are
+    stored as given and must be JSON-serializable.
+    """
+    manifest = {
+        "manifest_version": MANIFEST_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "labels": [str(label) for label in labels],
+        **fields,
+    }
+    os.makedirs(model_dir, exist_ok=True)
+    tmp_path = manifest_path(model_dir) + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    # Readers never see a half-written manifest
+    os.replace(tmp_path, manifest_path(model_dir))
+    return manifest
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Local registry of model versions and a hot-swapping predictor
+Each version is a model directory under ./models; CURRENT names the active one.
+HotSwapPredictor loads and warms a new version in the background, switches to it
+atomically, can shadow-score a fraction of traffic on a candidate, and frees the
+old version once its in-flight batches finish
+"""
+
+import argparse
+import ctypes
+import gc
+import hashlib
+import itertools
+import os
+import random
+import shutil
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from manifest import has_manifest, read_manifest
+from predict import BACKENDS, INT8_ONNX_PATH, ONNX_PATH, TOP_K, OnnxPredictor, Predictor
+from startup_profile import WARMUP_DESCRIPTIONS
+
+REGISTRY_DIR = "./models"
+CURRENT_FILE = "CURRENT"
+# Inactive versions kept on disk after a publish, newest first
+KEEP_VERSIONS = 5
+WATCH_INTERVAL = 10.0
+# Shadow batches allowed to queue before new ones are skipped, so shadowing never backs up
+MAX_SHADOW_PENDING = 4
+DISAGREEMENT_EXAMPLES = 20
+# Trainer output that train.py leaves in ./model and serving never reads
+# (checkpoints hold optimizer state, several hundred MB each)
+TRAINING_OUTPUTS = ("checkpoint-*", "logs")
+
+
+class ModelRegistry:
+    """Versioned model directories plus an atomically replaced CURRENT pointer"""
+
+    def __init__(self, root=REGISTRY_DIR):
+        self.root = root
+
+    def path(self, version):
+        return os.path.join(self.root, version)
+
+    def versions(self):
+        """Published versions, oldest first (names sort by publish time)"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if not name.startswith(".") and has_manifest(self.path(name))
+        )
+
+    def current_version(self):
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def activate(self, version):
+        if not has_manifest(self.path(version)):
+            raise ValueError(f"Unknown model version {version!r} in {self.root}")
+        tmp_path = os.path.join(self.root, CURRENT_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            f.write(version + "\n")
+        # Watchers never see a half-written pointer
+        os.replace(tmp_path, os.path.join(self.root, CURRENT_FILE))
+
+    def publish(self, model_dir, onnx_dir=None, activate=True, keep=KEEP_VERSIONS):
+        """Copy a trained model directory in as a new version; returns the version name"""
+        if not has_manifest(model_dir):
+            raise ValueError(f"{model_dir} has no manifest.json; retrain with the current train.py")
+        manifest = read_manifest(model_dir)
+        digest = hashlib.sha256(repr(sorted(manifest.items())).encode("utf-8")).hexdigest()[:8]
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{digest}"
+
+        os.makedirs(self.root, exist_ok=True)
+        tmp_dir = os.path.join(self.root, f".{name}.{os.getpid()}.tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        shutil.copytree(model_dir, tmp_dir, ignore=shutil.ignore_patterns(*TRAINING_OUTPUTS))
+        if onnx_dir:
+            shutil.copytree(onnx_dir, os.path.join(tmp_dir, "onnx"))
+        # Names have one-second resolution; a second publish of the same model within
+        # that second gets a -2, -3, ... suffix (which still sorts after the first)
+        for attempt in itertools.count(1):
+            version = name if attempt == 1 else f"{name}-{attempt}"
+            if os.path.exists(self.path(version)):
+                continue
+            try:
+                os.replace(tmp_dir, self.path(version))
+                break
+            except OSError:
+                if not os.path.exists(self.path(version)):
+                    raise
+
+        if activate:
+            self.activate(version)
+        self.prune(keep)
+        return version
+
+    def prune(self, keep=KEEP_VERSIONS):
+        """Delete the oldest inactive versions beyond `keep`"""
+        current = self.current_version()
+        inactive = [v for v in self.versions() if v != current]
+        removed = inactive[:max(0, len(inactive) - keep)]
+        for version in removed:
+            shutil.rmtree(self.path(version), ignore_errors=True)
+        return removed
+
+
+def load_version(backend, model_dir, telemetry=None, shared_weights=False):
+    """Predictor for one version directory; ONNX backends read <version>/onnx/"""
+    if backend == "torch":
+        return Predictor(model_dir, telemetry=telemetry, shared_weights=shared_weights)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+    onnx_file = os.path.basename(ONNX_PATH if backend == "onnx" else INT8_ONNX_PATH)
+    return OnnxPredictor(os.path.join(model_dir, "onnx", onnx_file), model_dir, telemetry=telemetry,
+                         shared_weights=shared_weights)
+
+
+def release_memory():
+    """Return freed model memory to the OS after the last reference is dropped"""
+    gc.collect()
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+    # glibc keeps freed arenas mapped; trimming hands the weight buffers back
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+class _Loaded:
+    """A loaded version and the number of batches currently running on it"""
+
+    def __init__(self, version, predictor):
+        self.version = version
+        self.predictor = predictor
+        self.in_flight = 0
+
+
+class HotSwapPredictor:
+    """predict_batch on the active registry version, swappable without a restart"""
+
+    def __init__(self, registry, backend="torch", version=None, telemetry=None,
+                 shared_weights=False):
+        self.registry = registry
+        self.backend = backend
+        self.telemetry = telemetry
+        self.shared_weights = shared_weights
+        self._lock = threading.Condition()
+        self._loader = ThreadPoolExecutor(max_workers=1)
+        self._shadow_executor = ThreadPoolExecutor(max_workers=1)
+        self._watcher = None
+        self._active = self._load(version or registry.current_version())
+        self._shadow = None
+        self.shadow_fraction = 0.0
+        self._shadow_pending = 0
+        self._random = random.Random()
+        self._reset_shadow_stats()
+
+    def _load(self, version):
+        if version is None:
+            raise ValueError(f"No active model version in {self.registry.root}; publish one first")
+        predictor = load_version(self.backend, self.registry.path(version), self.telemetry,
+                                 self.shared_weights)
+        # First batches pay for lazy kernel and allocator setup; do it before taking traffic
+        predictor.predict_batch(WARMUP_DESCRIPTIONS, top_k=1)
+        return _Loaded(version, predictor)
+
+    # --- serving ---
+
+    @property
+    def version(self):
+        return self._active.version
+
+    @property
+    def model_version(self):
+        return self._active.predictor.model_version
+
+    @property
+    def labels(self):
+        return self._active.predictor.labels
+
+    @property
+    def num_labels(self):
+        return self._active.predictor.num_labels
+
+    def _acquire(self):
+        with self._lock:
+            loaded = self._active
+            loaded.in_flight += 1
+            return loaded
+
+    def _release(self, loaded):
+        with self._lock:
+            loaded.in_flight -= 1
+            self._lock.notify_all()
+
+    def predict_batch(self, descriptions, top_k=TOP_K):
+        descriptions = list(descriptions)
+        loaded = self._acquire()
+        try:
+            predictions = loaded.predictor.predict_batch(descriptions, top_k=top_k)
+        finally:
+            self._release(loaded)
+        self._maybe_shadow(descriptions, predictions)
+        return predictions
+
+    # --- swapping ---
+
+    def _retire(self, old):
+        """Drop `old` once its in-flight batches finish, then give its memory back"""
+        with self._lock:
+            self._lock.wait_for(lambda: old.in_flight == 0)
+        old.predictor = None
+        release_memory()
+
+    def swap_to(self, version):
+        """Load and warm `version` in the background, then switch to it atomically
+
+        Returns a Future resolving to the retired version name. Requests keep
+        being served by the old version until the switch.
+        """
+        def load_and_swap():
+            loaded = self._load(version)
+            with self._lock:
+                old, self._active = self._active, loaded
+            self._retire(old)
+            print(f"🔁 Model {old.version} -> {loaded.version}")
+            return old.version
+
+        return self._loader.submit(load_and_swap)
+
+    def sync_with_registry(self):
+        """Swap to the registry's CURRENT version if it changed; returns a Future or None"""
+        current = self.registry.current_version()
+        if current and current != self._active.version:
+            return self.swap_to(current)
+        return None
+
+    def watch(self, interval=WATCH_INTERVAL):
+        """Poll CURRENT from a daemon thread and hot-swap whenever it changes"""
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    future = self.sync_with_registry()
+                    if future is not None:
+                        future.result()
+                except Exception as e:  # keep serving the current version
+                    print(f"⚠️  Model reload failed: {e}")
+
+        self._watcher = threading.Thread(target=loop, name="model-watcher", daemon=True)
+        self._watcher.start()
+
+    # --- shadow mode ---
+
+    def _reset_shadow_stats(self):
+        self.shadow_stats = {"rows": 0, "disagreements": 0, "skipped_rows": 0, "errors": 0}
+        self.shadow_examples = deque(maxlen=DISAGREEMENT_EXAMPLES)
+
+    def start_shadow(self, version, fraction):
+        """Load a candidate in the background and score `fraction` of rows on it too"""
+        def load_shadow():
+            loaded = self._load(version)
+            with self._lock:
+                old, self._shadow = self._shadow, loaded
+                self.shadow_fraction = fraction
+                self._reset_shadow_stats()
+            if old is not None:
+                self._retire(old)
+            return version
+
+        return self._loader.submit(load_shadow)
+
+    def stop_shadow(self):
+        with self._lock:
+            old, self._shadow = self._shadow, None
+            self.shadow_fraction = 0.0
+        if old is not None:
+            self._shadow_executor.submit(self._retire, old)
+
+    def promote_shadow(self):
+        """Make the shadow version active (and CURRENT in the registry)"""
+        with self._lock:
+            if self._shadow is None:
+                raise ValueError("No shadow version loaded")
+            old, self._active, self._shadow = self._active, self._shadow, None
+            self.shadow_fraction = 0.0
+        self.registry.activate(self._active.version)
+        self._shadow_executor.submit(self._retire, old)
+        return self._active.version
+
+    def _maybe_shadow(self, descriptions, predictions):
+        shadow = self._shadow
+        if shadow is None or not self.shadow_fraction:
+            return
+        sample = [i for i in range(len(descriptions)) if self._random.random() < self.shadow_fraction]
+        if not sample:
+            return
+        with self._lock:
+            if self._shadow_pending >= MAX_SHADOW_PENDING:
+                self.shadow_stats["skipped_rows"] += len(sample)
+                return
+            self._shadow_pending += 1
+            shadow.in_flight += 1
+        rows = [descriptions[i] for i in sample]
+        primary = [predictions[i]["category"] for i in sample]
+        self._shadow_executor.submit(self._score_shadow, shadow, rows, primary)
+
+    def _score_shadow(self, shadow, rows, primary):
+        try:
+            candidate = [p["category"] for p in shadow.predictor.predict_batch(rows, top_k=1)]
+        except Exception:
+            with self._lock:
+                self.shadow_stats["errors"] += 1
+            return
+        finally:
+            with self._lock:
+                self._shadow_pending -= 1
+                shadow.in_flight -= 1
+                self._lock.notify_all()
+        with self._lock:
+            self.shadow_stats["rows"] += len(rows)
+            for description, old, new in zip(rows, primary, candidate):
+                if old != new:
+                    self.shadow_stats["disagreements"] += 1
+                    self.shadow_examples.append(
+                        {"description": description, "active": old, "shadow": new}
+                    )
+
+    def stats(self):
+        with self._lock:
+            shadow_rows = self.shadow_stats["rows"]
+            return {
+                "active": self._active.version,
+                "model_version": self._active.predictor.model_version,
+                "shadow": None if self._shadow is None else {
+                    "version": self._shadow.version,
+                    "fraction": self.shadow_fraction,
+                    **self.shadow_stats,
+                    "disagreement_rate": (
+                        self.shadow_stats["disagreements"] / shadow_rows if shadow_rows else None
+                    ),
+                    "examples": list(self.shadow_examples),
+                },
+            }
+
+    def close(self):
+        self._loader.shutdown(wait=False)
+        self._shadow_executor.shutdown(wait=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the local model version registry")
+    parser.add_argument("--registry-dir", default=REGISTRY_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    publish = commands.add_parser("publish", help="Copy a trained model in as a new version")
+    publish.add_argument("model_dir", nargs="?", default="./model")
+    publish.add_argument("--onnx-dir", help="Exported ONNX files to ship with the version")
+    publish.add_argument("--no-activate", action="store_true", help="Publish without switching CURRENT")
+    publish.add_argument("--keep", type=int, default=KEEP_VERSIONS)
+    activate = commands.add_parser("activate", help="Point CURRENT at a version (e.g. to roll back)")
+    activate.add_argument("version")
+    commands.add_parser("list", help="Show versions and which is active")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.registry_dir)
+    if args.command == "publish":
+        version = registry.publish(args.model_dir, args.onnx_dir, not args.no_activate, args.keep)
+        print(f"📦 Published {args.model_dir} as {version}"
+              + ("" if args.no_activate else " (active)"))
+    elif args.command == "activate":
+        registry.activate(args.version)
+        print(f"✅ Active version: {args.version}")
+    else:
+        current = registry.current_version()
+        for version in registry.versions():
+            metrics = read_manifest(registry.path(version)).get("metrics") or {}
+            accuracy = metrics.get("eval_accuracy")
+            marker = "*" if version == current else " "
+            print(f"{marker} {version}" + (f"  accuracy {accuracy:.4f}" if accuracy is not None else ""))
+
+if __name__ == "__main__":
+    main()
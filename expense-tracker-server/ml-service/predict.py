@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Batched prediction API for the expense category model
+Tokenizes whole batches with dynamic padding and runs one forward pass per batch
+
+torch, transformers and onnxruntime are imported by the predictor that needs them,
+so importing this module (e.g. for constants or decode helpers) stays cheap.
+"""
+
+import fnmatch
+import hashlib
+import os
+import pickle
+import time
+import numpy as np
+
+from manifest import has_manifest, read_manifest
+
+MODEL_DIR = "./model"
+# Legacy label table, only read when the model directory has no manifest.json
+LABELS_FILE = "./labels.pkl"
+MAX_LENGTH = 64
+BATCH_SIZE = 64
+TOP_K = 3
+ONNX_PATH = "./onnx/model.onnx"
+INT8_ONNX_PATH = "./onnx/model.int8.onnx"
+# model_version hashes files up to this size whole; larger ones (weights) by their
+# size plus the first and last VERSION_SAMPLE_BYTES, which any retrain rewrites
+VERSION_FULL_HASH_LIMIT = 4 << 20
+VERSION_SAMPLE_BYTES = 1 << 20
+# Files in a model directory that change predictions: config, weights, tokenizer,
+# manifest (and the student's own two). Checkpoints, logs and the README that
+# upload_to_hf.py writes are left out, so they never invalidate the cache
+VERSION_FILES = (
+    "manifest.json",
+    "config.json",
+    "*.safetensors",
+    "model.safetensors.index.json",
+    "pytorch_model*.bin",
+    "pytorch_model.bin.index.json",
+    "tokenizer.json",
+    "tokenizer_config.json",
+    "special_tokens_map.json",
+    "added_tokens.json",
+    "vocab.txt",
+    "vocab.json",
+    "merges.txt",
+    "*.model",
+    "student.json",
+    "student.pt",
+)
+
+
+def softmax(logits):
+    """Row-wise softmax over a 2D logits array"""
+    shifted = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def load_labels(model_dir=MODEL_DIR, labels_file=LABELS_FILE):
+    """Load the index -> category name table
+
+    Read from the model's manifest.json when present. Older models fall back to
+    the pickled label encoder, which needs scikit-learn to unpickle.
+    """
+    if has_manifest(model_dir):
+        labels = read_manifest(model_dir)["labels"]
+    else:
+        with open(labels_file, "rb") as f:
+            labels = pickle.load(f).classes_
+    # Object array so a whole batch decodes with one fancy index
+    return np.asarray(labels, dtype=object)
+
+
+def _hash_file_content(digest, path):
+    """Whole contents of a small file, or size plus head and tail of a large one"""
+    size = os.path.getsize(path)
+    digest.update(f"{size}\0".encode("utf-8"))
+    with open(path, "rb") as f:
+        if size <= VERSION_FULL_HASH_LIMIT:
+            digest.update(f.read())
+            return
+        digest.update(f.read(VERSION_SAMPLE_BYTES))
+        f.seek(size - VERSION_SAMPLE_BYTES)
+        digest.update(f.read(VERSION_SAMPLE_BYTES))
+
+
+def model_version(*paths):
+    """Short fingerprint of model files from their contents
+
+    Files are named relative to the path given, so `./model`, `model`, an absolute
+    path and a copy of the directory all share one version (and one prediction
+    cache). A directory contributes only its top-level VERSION_FILES; a file path
+    is hashed whatever its name. Manifest, config and tokenizer files are hashed
+    whole, weights by size plus head and tail, so this stays cheap at load time
+    while any retrain or fine-tune (which rewrites the weights and the manifest)
+    changes it.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        if os.path.isdir(path):
+            files = sorted(
+                name for name in os.listdir(path)
+                if os.path.isfile(os.path.join(path, name))
+                and any(fnmatch.fnmatchcase(name, pattern) for pattern in VERSION_FILES)
+            )
+        else:
+            path, files = os.path.dirname(path), [os.path.basename(path)]
+        for name in files:
+            digest.update(f"{name}\0".encode("utf-8"))
+            _hash_file_content(digest, os.path.join(path, name))
+    return digest.hexdigest()[:12]
+
+
+def decode_predictions(descriptions, probabilities, labels, top_k=TOP_K):
+    """Turn an (N, num_labels) probability matrix into prediction dicts"""
+    top_k = max(1, min(top_k, probabilities.shape[1]))
+    top_indices = np.argsort(-probabilities, axis=1)[:, :top_k]
+    top_probs = np.take_along_axis(probabilities, top_indices, axis=1)
+    top_names = labels[top_indices]
+
+    results = []
+    for row, description in enumerate(descriptions):
+        results.append({
+            "description": description,
+            "category": top_names[row, 0],
+            "confidence": float(top_probs[row, 0]),
+            "top_k": [
+                {"category": name, "confidence": float(prob)}
+                for name, prob in zip(top_names[row], top_probs[row])
+            ],
+        })
+    return results
+
+
+class Predictor:
+    """Scores expense descriptions in padded batches with the trained model"""
+
+    def __init__(self, model_dir=MODEL_DIR, labels_file=LABELS_FILE,
+                 max_length=None, batch_size=BATCH_SIZE, telemetry=None, shared_weights=False):
+        self.model_dir = model_dir
+        # Optional telemetry.Telemetry receiving per-batch latency
+        self.telemetry = telemetry
+        # Map weights from model.safetensors so processes share one copy (see shared_weights.py)
+        self.shared_weights = shared_weights
+        self.manifest = read_manifest(model_dir) if has_manifest(model_dir) else {}
+        # Tokenize the way the model was trained unless told otherwise
+        self.max_length = max_length or self.manifest.get("max_length", MAX_LENGTH)
+        self.batch_size = batch_size
+
+        from transformers import AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.labels = load_labels(model_dir, labels_file)
+        self.model_version = model_version(model_dir, labels_file)
+        self._load_model()
+
+    def _load_model(self):
+        if self.shared_weights:
+            from shared_weights import load_mmap_model
+
+            self.model = load_mmap_model(self.model_dir)
+        else:
+            from transformers import AutoModelForSequenceClassification
+
+            self.model = AutoModelForSequenceClassification.from_pretrained(self.model_dir)
+        self.model.eval()
+
+    @property
+    def num_labels(self):
+        return len(self.labels)
+
+    def _forward(self, batch):
+        """Run one padded forward pass and return float32 logits"""
+        import torch
+
+        inputs = self.tokenizer(
+            batch,
+            return_tensors="pt",
+            truncation=True,
+            padding=True,
+            max_length=self.max_length,
+        )
+        with torch.inference_mode():
+            return self.model(**inputs).logits.float().numpy()
+
+    def logits(self, descriptions):
+        """Return raw logits for every description, in input order"""
+        descriptions = list(descriptions)
+        if not descriptions:
+            return np.empty((0, self.num_labels), dtype=np.float32)
+
+        # Sort by length so each batch pads to a similar width, then restore order
+        order = sorted(range(len(descriptions)), key=lambda i: len(descriptions[i]))
+        logits = np.empty((len(descriptions), self.num_labels), dtype=np.float32)
+        for start in range(0, len(order), self.batch_size):
+            index = order[start:start + self.batch_size]
+            if self.telemetry is None:
+                logits[index] = self._forward([descriptions[i] for i in index])
+            else:
+                self._timed_forward(logits, index, descriptions)
+        return logits
+
+    def _timed_forward(self, logits, index, descriptions):
+        batch_start = time.perf_counter()
+        logits[index] = self._forward([descriptions[i] for i in index])
+        seconds = time.perf_counter() - batch_start
+        self.telemetry.observe("inference_batch_seconds", seconds)
+        self.telemetry.inc("inference_batches_total")
+        self.telemetry.inc("inference_rows_total", len(index))
+        self.telemetry.event("inference_batch", rows=len(index), seconds=seconds,
+                             model_version=self.model_version)
+
+    def predict_proba(self, descriptions):
+        """Return an (N, num_labels) matrix of class probabilities"""
+        return softmax(self.logits(descriptions))
+
+    def predict_batch(self, descriptions, top_k=TOP_K):
+        """Predict categories for a list of descriptions"""
+        descriptions = list(descriptions)
+        probabilities = self.predict_proba(descriptions)
+        return decode_predictions(descriptions, probabilities, self.labels, top_k)
+
+
+class OnnxPredictor(Predictor):
+    """Same interface as Predictor, backed by an ONNX Runtime CPU session"""
+
+    def __init__(self, onnx_path=ONNX_PATH, model_dir=MODEL_DIR, labels_file=LABELS_FILE,
+                 max_length=None, batch_size=BATCH_SIZE, telemetry=None, shared_weights=False):
+        if shared_weights:
+            # ONNX Runtime loads its own copy of the graph's weights
+            raise ValueError("shared_weights is only supported by the torch backend, not ONNX")
+        self.onnx_path = onnx_path
+        super().__init__(model_dir, labels_file, max_length, batch_size, telemetry)
+        self.model_version = model_version(onnx_path, model_dir, labels_file)
+
+    def _load_model(self):
+        try:
+            import onnxruntime as ort
+        except ImportError:  # Optional dependency; only needed for the ONNX backends
+            raise RuntimeError("onnxruntime is not installed: pip install onnxruntime") from None
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            self.onnx_path, options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _forward(self, batch):
+        inputs = self.tokenizer(
+            batch,
+            return_tensors="np",
+            truncation=True,
+            padding=True,
+            max_length=self.max_length,
+        )
+        feed = {k: v.astype(np.int64) for k, v in inputs.items() if k in self.input_names}
+        return self.session.run(["logits"], feed)[0].astype(np.float32)
+
+
+BACKENDS = ("torch", "onnx", "int8")
+
+
+def load_predictor(backend="torch", model_dir=MODEL_DIR, labels_file=LABELS_FILE, **kwargs):
+    """Load a predictor for the given backend: torch (FP32), onnx or int8"""
+    if backend == "torch":
+        return Predictor(model_dir, labels_file, **kwargs)
+    if backend == "onnx":
+        return OnnxPredictor(ONNX_PATH, model_dir, labels_file, **kwargs)
+    if backend == "int8":
+        return OnnxPredictor(INT8_ONNX_PATH, model_dir, labels_file, **kwargs)
+    raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+
+
+_default_predictor = None
+
+
+def get_predictor():
+    """Load the default predictor once and reuse it"""
+    global _default_predictor
+    if _default_predictor is None:
+        _default_predictor = Predictor()
+    return _default_predictor
+
+
+def predict_batch(descriptions, top_k=TOP_K):
+    """Predict categories with the default model in ./model"""
+    return get_predictor().predict_batch(descriptions, top_k=top_k)
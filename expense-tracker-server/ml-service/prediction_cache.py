@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Prediction cache keyed by normalized description and model version
+Bounded in-process LRU with TTL, optionally backed by a SQLite file shared across workers
+"""
+
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from predict import TOP_K
+
+MAX_ENTRIES = 100_000
+TTL_SECONDS = 24 * 60 * 60
+
+WHITESPACE_RE = re.compile(r"\s+")
+DIGITS_RE = re.compile(r"\d+")
+
+
+def normalize_description(description):
+    """Fold case, whitespace and digits so "Paid 500  rent" == "paid 1200 rent" """
+    text = DIGITS_RE.sub("0", description.lower())
+    return WHITESPACE_RE.sub(" ", text).strip()
+
+
+class PredictionCache:
+    """LRU + TTL cache of prediction dicts, with an optional SQLite second tier"""
+
+    def __init__(self, max_entries=MAX_ENTRIES, ttl_seconds=TTL_SECONDS, db_path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.db_path = db_path
+        self._db = None
+        if db_path:
+            # One connection per process; SQLite's own locking handles other workers
+            self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=5)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS predictions "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def _put_memory(self, key, value, expires_at):
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _get_disk(self, keys, now):
+        found = {}
+        keys = list(keys)
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = self._db.execute(
+                f"SELECT key, value, expires_at FROM predictions "
+                f"WHERE key IN ({','.join('?' * len(chunk))}) AND expires_at > ?",
+                (*chunk, now),
+            ).fetchall()
+            for key, value, expires_at in rows:
+                found[key] = (json.loads(value), expires_at)
+        return found
+
+    def get_many(self, keys):
+        """Cached values for `keys` that are present and unexpired"""
+        now = time.time()
+        found = {}
+        with self._lock:
+            missing = []
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] > now:
+                    self._entries.move_to_end(key)
+                    found[key] = entry[0]
+                    self.hits += 1
+                else:
+                    if entry is not None:
+                        del self._entries[key]
+                    missing.append(key)
+
+            if self._db is not None and missing:
+                for key, (value, expires_at) in self._get_disk(missing, now).items():
+                    self._put_memory(key, value, expires_at)
+                    found[key] = value
+                    self.disk_hits += 1
+
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items):
+        """Store {key: value} pairs in memory and, if enabled, on disk"""
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            for key, value in items.items():
+                self._put_memory(key, value, expires_at)
+            if self._db is not None and items:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO predictions (key, value, expires_at) VALUES (?, ?, ?)",
+                    [(key, json.dumps(value), expires_at) for key, value in items.items()],
+                )
+                self._db.execute("DELETE FROM predictions WHERE expires_at <= ?", (time.time(),))
+                self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM predictions")
+                self._db.commit()
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            "db_path": self.db_path,
+        }
+
+
+class CachedPredictor:
+    """Wraps any predictor with predict_batch and answers repeated descriptions from cache"""
+
+    def __init__(self, predictor, cache=None):
+        self.predictor = predictor
+        self.cache = cache if cache is not None else PredictionCache()
+
+    @property
+    def num_labels(self):
+        return self.predictor.num_labels
+
+    @property
+    def model_version(self):
+        return self.predictor.model_version
+
+    def _key(self, normalized, top_k):
+        # The model version makes a retrained model miss every old entry
+        return f"{self.model_version}:{top_k}:{normalized}"
+
+    def predict_batch(self, descriptions, top_k=TOP_K):
+        """Predict categories, running the model only for unseen normalized descriptions"""
+        descriptions = list(descriptions)
+        version = self.model_version
+        keys = [self._key(normalize_description(d), top_k) for d in descriptions]
+        cached = self.cache.get_many(dict.fromkeys(keys))
+
+        # First description seen for each missing key stands in for its duplicates
+        pending = {}
+        for key, description in zip(keys, descriptions):
+            if key not in cached and key not in pending:
+                pending[key] = description
+        if pending:
+            predictions = self.predictor.predict_batch(list(pending.values()), top_k=top_k)
+            fresh = {}
+            for key, prediction in zip(pending, predictions):
+                fresh[key] = {k: v for k, v in prediction.items() if k != "description"}
+            # A hot swap mid-batch would file new predictions under the old version
+            if self.model_version == version:
+                self.cache.put_many(fresh)
+            cached.update(fresh)
+
+        return [{"description": d, **cached[key]} for key, d in zip(keys, descriptions)]
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Publish a model directory as a content-addressed bundle
+bundle.json lists every file's sha256 and size; the bundle id hashes that list. Only
+files whose hash differs from the published bundle are uploaded, in parallel with
+retries, and the new bundle becomes visible in one step once everything is uploaded.
+
+Backends:
+- LocalArtifactStore: a directory of blobs and bundles, for CI and offline use
+- HfBackend: a HuggingFace Hub model repo (one commit per publish)
+
+An interrupted publish resumes by running it again: uploaded content is addressed by
+hash, so the local store skips blobs it already has and the Hub skips LFS objects it
+already stores.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+BUNDLE_FILE = "bundle.json"
+BUNDLE_VERSION = 1
+ARTIFACT_DIR = "./artifacts"
+LATEST_FILE = "LATEST"
+HASH_CHUNK = 1 << 20
+UPLOAD_WORKERS = 4
+# Attempts per file; waits RETRY_BACKOFF, then twice that, ... seconds between them
+UPLOAD_RETRIES = 4
+RETRY_BACKOFF = 1.0
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def bundle_files(model_dir):
+    """Relative paths (with /) of the files to publish: everything but hidden files and bundle.json"""
+    paths = []
+    for root, dirs, names in os.walk(model_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith(".") and d != "__pycache__")
+        for name in sorted(names):
+            if name.startswith(".") or name == BUNDLE_FILE:
+                continue
+            path = os.path.relpath(os.path.join(root, name), model_dir)
+            paths.append(path.replace(os.sep, "/"))
+    return paths
+
+
+def bundle_id(files):
+    """Content address of a bundle: sha256 over its sorted (path, sha256) pairs"""
+    digest = hashlib.sha256()
+    for path in sorted(files):
+        digest.update(f"{path}\0{files[path]['sha256']}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def build_bundle(model_dir):
+    """Hash every file in `model_dir` into a bundle dict (not written anywhere)"""
+    files = {}
+    for path in bundle_files(model_dir):
+        full_path = os.path.join(model_dir, path)
+        files[path] = {"sha256": hash_file(full_path), "size": os.path.getsize(full_path)}
+    if not files:
+        raise ValueError(f"{model_dir} has no files to publish")
+    return {
+        "bundle_version": BUNDLE_VERSION,
+        "bundle_id": bundle_id(files),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "files": files,
+    }
+
+
+def diff_bundles(bundle, published):
+    """(paths to upload, paths to delete) to turn `published` into `bundle`"""
+    old = published["files"] if published else {}
+    changed = [p for p, info in bundle["files"].items()
+               if old.get(p, {}).get("sha256") != info["sha256"]]
+    deleted = [p for p in old if p not in bundle["files"]]
+    return changed, deleted
+
+
+def with_retries(fn, *args, label, retries=UPLOAD_RETRIES, backoff=RETRY_BACKOFF):
+    """Call fn(*args), retrying I/O errors (network errors included) with exponential backoff"""
+    for attempt in range(retries):
+        try:
+            return fn(*args)
+        except OSError as e:
+            if attempt == retries - 1:
+                raise
+            delay = backoff * 2 ** attempt
+            print(f"⚠️  {label} failed ({e}); retrying in {delay:.0f}s")
+            time.sleep(delay)
+
+
+def _atomic_write_json(path, data):
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class LocalArtifactStore:
+    """Content-addressed store on the local filesystem
+
+    root/blobs/<sha[:2]>/<sha>   file contents, written once
+    root/bundles/<id>.json       bundle manifests
+    root/LATEST                  id of the latest published bundle
+    """
+
+    def __init__(self, root=ARTIFACT_DIR):
+        self.root = root
+        self.name = os.path.abspath(root)
+        for sub in ("blobs", "bundles"):
+            os.makedirs(os.path.join(root, sub), exist_ok=True)
+
+    def blob_path(self, sha256):
+        return os.path.join(self.root, "blobs", sha256[:2], sha256)
+
+    def bundle_path(self, bundle_id):
+        return os.path.join(self.root, "bundles", bundle_id + ".json")
+
+    def latest_id(self):
+        try:
+            with open(os.path.join(self.root, LATEST_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def read_bundle(self, bundle_id=None):
+        bundle_id = bundle_id or self.latest_id()
+        if bundle_id is None:
+            return None
+        try:
+            with open(self.bundle_path(bundle_id)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise ValueError(f"Unknown bundle {bundle_id!r} in {self.root}") from None
+
+    def published_bundle(self):
+        return self.read_bundle()
+
+    def upload(self, model_dir, path, info):
+        """Copy one file into its blob, verifying the hash; a no-op if the blob exists"""
+        blob = self.blob_path(info["sha256"])
+        if os.path.exists(blob):
+            return
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        tmp_path = f"{blob}.{uuid.uuid4().hex}.tmp"
+        digest = hashlib.sha256()
+        try:
+            with open(os.path.join(model_dir, path), "rb") as src, open(tmp_path, "wb") as dst:
+                for chunk in iter(lambda: src.read(HASH_CHUNK), b""):
+                    digest.update(chunk)
+                    dst.write(chunk)
+                dst.flush()
+                os.fsync(dst.fileno())
+            if digest.hexdigest() != info["sha256"]:
+                raise ValueError(f"{path} changed while publishing; rebuild the bundle")
+            os.replace(tmp_path, blob)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def commit(self, bundle, model_dir, changed, deleted, message):
+        missing = [p for p, info in bundle["files"].items()
+                   if not os.path.exists(self.blob_path(info["sha256"]))]
+        if missing:
+            raise ValueError(f"Blobs missing for {missing}; upload them before committing")
+        _atomic_write_json(self.bundle_path(bundle["bundle_id"]), {**bundle, "message": message})
+        # Readers only ever see LATEST pointing at a complete bundle
+        tmp_path = os.path.join(self.root, f"{LATEST_FILE}.{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, "w") as f:
+            f.write(bundle["bundle_id"] + "\n")
+        os.replace(tmp_path, os.path.join(self.root, LATEST_FILE))
+
+    def fetch(self, dest, bundle_id=None):
+        """Materialize a bundle (default: latest) into `dest`, verifying every hash"""
+        bundle = self.read_bundle(bundle_id)
+        if bundle is None:
+            raise ValueError(f"Nothing published in {self.root}")
+        for path, info in bundle["files"].items():
+            target = os.path.join(dest, *path.split("/"))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(self.blob_path(info["sha256"]), target)
+            if hash_file(target) != info["sha256"]:
+                raise ValueError(f"{target} does not match its sha256 in bundle {bundle['bundle_id']}")
+        _atomic_write_json(os.path.join(dest, BUNDLE_FILE), bundle)
+        return bundle
+
+
+class HfBackend:
+    """A HuggingFace Hub model repo; bundle.json at the repo root records what is published
+
+    LFS files are pre-uploaded one by one (the Hub skips objects it already has), then
+    all changes and bundle.json land in a single commit, so the repo never shows a
+    half-updated model.
+    """
+
+    def __init__(self, repo_id, api=None):
+        from huggingface_hub import HfApi
+
+        self.repo_id = repo_id
+        self.name = f"hf://{repo_id}"
+        self.api = api or HfApi()
+        self._additions = {}
+        self._lock = threading.Lock()
+
+    def published_bundle(self):
+        from huggingface_hub import hf_hub_download
+        from huggingface_hub.utils import EntryNotFoundError
+
+        try:
+            path = hf_hub_download(self.repo_id, BUNDLE_FILE, repo_type="model")
+        except EntryNotFoundError:
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def upload(self, model_dir, path, info):
+        from huggingface_hub import CommitOperationAdd
+
+        addition = CommitOperationAdd(path_in_repo=path, path_or_fileobj=os.path.join(model_dir, path))
+        self.api.preupload_lfs_files(self.repo_id, additions=[addition], repo_type="model")
+        with self._lock:
+            self._additions[path] = addition
+
+    def commit(self, bundle, model_dir, changed, deleted, message):
+        from huggingface_hub import CommitOperationAdd, CommitOperationDelete
+
+        operations = [self._additions[path] for path in changed]
+        operations += [CommitOperationDelete(path_in_repo=path) for path in deleted]
+        operations.append(CommitOperationAdd(
+            path_in_repo=BUNDLE_FILE,
+            path_or_fileobj=json.dumps(bundle, indent=2).encode("utf-8"),
+        ))
+        self.api.create_commit(self.repo_id, operations, commit_message=message, repo_type="model")
+
+
+def publish(model_dir, backend, workers=UPLOAD_WORKERS, retries=UPLOAD_RETRIES,
+            message=None, dry_run=False):
+    """Upload what changed in `model_dir` since the backend's published bundle
+
+    Nothing is written into `model_dir`, so publishing never changes the model's
+    version fingerprint. Returns the bundle dict, or None for a dry run.
+    """
+    bundle = build_bundle(model_dir)
+    published = backend.published_bundle()
+    changed, deleted = diff_bundles(bundle, published)
+    total_bytes = sum(bundle["files"][p]["size"] for p in changed)
+
+    print(f"📦 Bundle {bundle['bundle_id'][:12]}: {len(bundle['files'])} files")
+    if published and published["bundle_id"] == bundle["bundle_id"]:
+        print(f"✅ {backend.name} is already up to date")
+        return bundle
+    print(f"   {len(changed)} changed ({total_bytes / 1e6:.1f} MB), {len(deleted)} deleted "
+          f"vs {published['bundle_id'][:12] if published else 'nothing published'}")
+    for path in changed:
+        print(f"   + {path}")
+    for path in deleted:
+        print(f"   - {path}")
+    if dry_run:
+        return None
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {
+            pool.submit(with_retries, backend.upload, model_dir, path, bundle["files"][path],
+                        label=f"upload {path}", retries=retries): path
+            for path in changed
+        }
+        for future in as_completed(futures):
+            future.result()
+            print(f"   📤 {futures[future]}")
+    message = message or f"Publish bundle {bundle['bundle_id'][:12]}"
+    with_retries(backend.commit, bundle, model_dir, changed, deleted, message,
+                 label="commit", retries=retries)
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ Published {bundle['bundle_id'][:12]} to {backend.name} in {elapsed:.1f}s")
+    return bundle
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish a model directory as a content-addressed bundle")
+    parser.add_argument("model_dir", nargs="?", default="./model")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--store", default=ARTIFACT_DIR,
+                        help=f"Local artifact store directory (default {ARTIFACT_DIR})")
+    target.add_argument("--hf-repo", help="Publish to this HuggingFace repo id instead")
+    parser.add_argument("--workers", type=int, default=UPLOAD_WORKERS)
+    parser.add_argument("--retries", type=int, default=UPLOAD_RETRIES)
+    parser.add_argument("--message", help="Commit message")
+    parser.add_argument("--dry-run", action="store_true", help="Only list what would be uploaded")
+    parser.add_argument("--fetch", metavar="DEST",
+                        help="Instead of publishing, restore a bundle from the local store into DEST")
+    parser.add_argument("--bundle", help="Bundle id for --fetch (default: latest)")
+    args = parser.parse_args()
+
+    if args.fetch:
+        bundle = LocalArtifactStore(args.store).fetch(args.fetch, args.bundle)
+        print(f"✅ Restored bundle {bundle['bundle_id'][:12]} "
+              f"({len(bundle['files'])} files) into {args.fetch}")
+        return
+    backend = HfBackend(args.hf_repo) if args.hf_repo else LocalArtifactStore(args.store)
+    publish(args.model_dir, backend, args.workers, args.retries, args.message, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
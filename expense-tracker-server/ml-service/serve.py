@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+Local inference server for the expense category model
+Queues concurrent /categorize requests and scores them as one padded batch
+"""
+
+import os
+import sys
+import time
+
+_IMPORT_START = time.perf_counter()
+_IMPORT_MODULES = len(sys.modules)
+
+# Never reach out to the HuggingFace Hub: everything is loaded from disk
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+import argparse
+import asyncio
+import gc
+import signal
+import socket
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import List, Union
+
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
+
+from model_registry import HotSwapPredictor, ModelRegistry
+from predict import load_predictor
+from prediction_cache import CachedPredictor, PredictionCache
+from startup_profile import WARMUP_DESCRIPTIONS, StartupProfile, profile_inference_startup
+from telemetry import Telemetry
+
+_IMPORT_SECONDS = time.perf_counter() - _IMPORT_START
+_IMPORT_MODULES = len(sys.modules) - _IMPORT_MODULES
+
+# Configuration
+MODEL_DIR = os.environ.get("MODEL_DIR", "./model")
+LABELS_FILE = os.environ.get("LABELS_FILE", "./labels.pkl")
+BACKEND = os.environ.get("BACKEND", "torch")  # torch, onnx or int8
+HOST = os.environ.get("HOST", "127.0.0.1")
+PORT = int(os.environ.get("PORT", "8000"))
+
+# Micro-batching limits: flush when either is reached
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", "32"))
+MAX_WAIT_MS = float(os.environ.get("MAX_WAIT_MS", "5"))
+TOP_K = int(os.environ.get("TOP_K", "3"))
+
+# Prediction cache: CACHE_SIZE=0 disables it, CACHE_DB shares it across workers
+CACHE_SIZE = int(os.environ.get("CACHE_SIZE", "100000"))
+CACHE_TTL = float(os.environ.get("CACHE_TTL", str(24 * 60 * 60)))
+CACHE_DB = os.environ.get("CACHE_DB") or None
+
+# Model registry: when set, serve its CURRENT version and hot-swap when it changes
+REGISTRY_DIR = os.environ.get("REGISTRY_DIR") or None
+MODEL_WATCH_INTERVAL = float(os.environ.get("MODEL_WATCH_INTERVAL", "10"))
+
+# Torch weights mapped from model.safetensors, shared by every process serving the file
+SHARED_WEIGHTS = os.environ.get("SHARED_WEIGHTS", "0") == "1"
+# Server processes forked from one preloaded parent, all accepting on the same socket
+WORKERS = int(os.environ.get("WORKERS", "1"))
+
+# A forked worker that dies within WORKER_MIN_UPTIME seconds counts as a crash. Restarts
+# back off exponentially up to WORKER_MAX_BACKOFF, and the server gives up after
+# WORKER_MAX_CRASHES crashes in a row instead of restarting a broken worker forever.
+WORKER_MIN_UPTIME = 10.0
+WORKER_RESTART_BACKOFF = 1.0
+WORKER_MAX_BACKOFF = 30.0
+WORKER_MAX_CRASHES = 5
+# Worker exit code when the app failed to start (uvicorn has already logged why)
+STARTUP_FAILURE = 3
+
+# Set by serve_preforked() before forking; workers serve it instead of loading their own
+_preloaded_predictor = None
+
+
+class CategorizeRequest(BaseModel):
+    inputs: Union[str, List[str]]
+
+
+class VersionRequest(BaseModel):
+    version: str
+
+
+class ShadowRequest(BaseModel):
+    version: str
+    fraction: float = 0.1
+
+
+class MicroBatcher:
+    """Collects queued descriptions and scores them in size/time bounded batches"""
+
+    def __init__(self, predictor, max_batch_size=MAX_BATCH_SIZE,
+                 max_wait_ms=MAX_WAIT_MS, top_k=TOP_K):
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.top_k = top_k
+        self.queue = asyncio.Queue()
+        # One model thread: torch already parallelises inside a forward pass
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self.executor.shutdown(wait=False)
+
+    async def submit(self, descriptions):
+        """Queue descriptions and wait for their predictions"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((descriptions, future))
+        return await future
+
+    async def _collect(self):
+        """Wait for the first request, then gather more until a limit is hit"""
+        loop = asyncio.get_running_loop()
+        items = [await self.queue.get()]
+        rows = len(items[0][0])
+        deadline = loop.time() + self.max_wait
+
+        while rows < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            items.append(item)
+            rows += len(item[0])
+        return items
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = await self._collect()
+            descriptions = [d for batch, _ in items for d in batch]
+            try:
+                predictions = await loop.run_in_executor(
+                    self.executor, self.predictor.predict_batch, descriptions, self.top_k
+                )
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            offset = 0
+            for batch, future in items:
+                if not future.done():
+                    future.set_result(predictions[offset:offset + len(batch)])
+                offset += len(batch)
+
+
+def to_hf_format(predictions):
+    """Shape predictions like the HuggingFace Inference API response"""
+    return [
+        [{"label": c["category"], "score": c["confidence"]} for c in p["top_k"]]
+        for p in predictions
+    ]
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # In-memory only: scraped from /metrics rather than written per batch
+    app.state.telemetry = Telemetry()
+    app.state.models = None
+    weights = {"shared_weights": True} if SHARED_WEIGHTS and BACKEND == "torch" else {}
+    if REGISTRY_DIR:
+        registry = ModelRegistry(REGISTRY_DIR)
+        print(f"📥 Loading {BACKEND} model {registry.current_version()} from {REGISTRY_DIR}...")
+        predictor = app.state.models = HotSwapPredictor(
+            registry, BACKEND, telemetry=app.state.telemetry, **weights
+        )
+        predictor.watch(MODEL_WATCH_INTERVAL)
+    elif _preloaded_predictor is not None:
+        predictor = _preloaded_predictor
+        predictor.telemetry = app.state.telemetry
+    else:
+        print(f"📥 Loading {BACKEND} model from {MODEL_DIR}...")
+        predictor = load_predictor(BACKEND, MODEL_DIR, LABELS_FILE,
+                                   telemetry=app.state.telemetry, **weights)
+    app.state.cache = None
+    if CACHE_SIZE > 0:
+        app.state.cache = PredictionCache(CACHE_SIZE, CACHE_TTL, CACHE_DB)
+        predictor = CachedPredictor(predictor, app.state.cache)
+    app.state.batcher = MicroBatcher(predictor)
+    app.state.batcher.start()
+    print(f"✅ Model {predictor.model_version} loaded with {predictor.num_labels} categories")
+    yield
+    await app.state.batcher.stop()
+    if app.state.models:
+        app.state.models.close()
+
+
+app = FastAPI(title="Expense Categorizer", lifespan=lifespan)
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+
+@app.get("/stats")
+async def stats():
+    cache = app.state.cache
+    return {"cache": cache.stats() if cache else None}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text format: inference batch latency, rows, cache hit counts"""
+    telemetry = app.state.telemetry
+    telemetry.record_memory()
+    cache = app.state.cache
+    if cache:
+        for name, value in cache.stats().items():
+            if isinstance(value, (int, float)):
+                telemetry.set_gauge(f"cache_{name}", value)
+    return telemetry.prometheus_text()
+
+
+def registry_models():
+    if app.state.models is None:
+        raise HTTPException(status_code=404, detail="Model registry not enabled (set REGISTRY_DIR)")
+    return app.state.models
+
+
+@app.get("/models")
+async def models():
+    """Published versions, the active one and shadow disagreement stats"""
+    hot = registry_models()
+    return {"versions": hot.registry.versions(), **hot.stats()}
+
+
+@app.post("/models/activate")
+async def activate_model(request: VersionRequest):
+    """Switch to a version (or roll back); serving continues on the old one until it is warm"""
+    hot = registry_models()
+    try:
+        hot.registry.activate(request.version)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    future = hot.sync_with_registry()
+    if future is not None:
+        await asyncio.wrap_future(future)
+    return hot.stats()
+
+
+@app.post("/models/shadow")
+async def start_shadow(request: ShadowRequest):
+    """Score a fraction of rows on a candidate version too and track disagreement"""
+    hot = registry_models()
+    if request.version not in hot.registry.versions():
+        raise HTTPException(status_code=404, detail=f"Unknown model version {request.version!r}")
+    await asyncio.wrap_future(hot.start_shadow(request.version, request.fraction))
+    return hot.stats()
+
+
+@app.post("/models/shadow/promote")
+async def promote_shadow():
+    hot = registry_models()
+    try:
+        hot.promote_shadow()
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return hot.stats()
+
+
+@app.delete("/models/shadow")
+async def stop_shadow():
+    hot = registry_models()
+    hot.stop_shadow()
+    return hot.stats()
+
+
+@app.post("/categorize")
+async def categorize(request: CategorizeRequest):
+    descriptions = [request.inputs] if isinstance(request.inputs, str) else request.inputs
+    if not descriptions:
+        raise HTTPException(status_code=400, detail="inputs must not be empty")
+    predictions = await app.state.batcher.submit(descriptions)
+    return to_hf_format(predictions)
+
+
+def profile_startup():
+    """Report cold-start time per phase, from server imports to the first batch"""
+    profile = StartupProfile()
+    profile.record("import server", _IMPORT_SECONDS, _IMPORT_MODULES)
+    profile_inference_startup(BACKEND, MODEL_DIR, LABELS_FILE, profile)
+    profile.report()
+
+
+def run_worker(sock, workers):
+    """Body of one forked server process"""
+    if BACKEND == "torch":
+        import torch
+
+        # Split the cores between workers instead of every worker using all of them
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // workers))
+    server = uvicorn.Server(uvicorn.Config(app, host=HOST, port=PORT))
+    server.run(sockets=[sock])
+    return server.started
+
+
+def fork_worker(sock, workers):
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0 if run_worker(sock, workers) else STARTUP_FAILURE
+        except BaseException:
+            print(f"❌ Worker {os.getpid()} crashed:", file=sys.stderr)
+            traceback.print_exc()
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(code)
+    return pid
+
+
+def serve_preforked(workers):
+    """Load the torch model once, then fork `workers` servers sharing it and one socket
+
+    Children never write to the weights, so their pages stay shared copy-on-write
+    (or, with SHARED_WEIGHTS=1, shared page cache) and N workers cost about one model.
+    ONNX Runtime sessions and the registry's watcher threads do not survive a fork, so
+    with those each worker loads its own copy after forking.
+    """
+    global _preloaded_predictor
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((HOST, PORT))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    if BACKEND == "torch" and not REGISTRY_DIR:
+        import torch
+
+        print(f"📥 Preloading {BACKEND} model from {MODEL_DIR} for {workers} workers...")
+        # Workers share the cores, so fast-tokenizer threads would only oversubscribe them
+        os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+        _preloaded_predictor = load_predictor(BACKEND, MODEL_DIR, LABELS_FILE,
+                                              shared_weights=SHARED_WEIGHTS)
+        # Warm up once here, so lazy imports and allocator setup are shared instead of
+        # repeated (~90 MB private each) in every worker. On one thread there is no
+        # OpenMP pool for the fork to break; workers set their own thread count.
+        torch.set_num_threads(1)
+        _preloaded_predictor.predict_batch(WARMUP_DESCRIPTIONS, top_k=1)
+    # Keep the cyclic GC from rewriting (and so un-sharing) every preloaded object's header
+    gc.freeze()
+
+    stopping = False
+    children = {}  # pid -> start time
+    crashes = 0
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(workers):
+        children[fork_worker(sock, workers)] = time.monotonic()
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        uptime = time.monotonic() - children.pop(pid)
+        if stopping:
+            continue
+        code = os.waitstatus_to_exitcode(status)
+        # Uptime can include our own backoff sleep, so a failed startup always counts
+        crashed = code == STARTUP_FAILURE or uptime < WORKER_MIN_UPTIME
+        crashes = crashes + 1 if crashed else 0
+        if crashes >= WORKER_MAX_CRASHES:
+            print(f"❌ Workers crashed {crashes} times in a row (last exit {code}); shutting down")
+            stop(signal.SIGTERM, None)
+            continue
+        delay = min(WORKER_MAX_BACKOFF, WORKER_RESTART_BACKOFF * 2 ** crashes) if crashes else 0
+        print(f"⚠️  Worker {pid} exited ({code}) after {uptime:.1f}s, restarting in {delay:.0f}s")
+        time.sleep(delay)
+        if not stopping:
+            children[fork_worker(sock, workers)] = time.monotonic()
+    sock.close()
+    if crashes >= WORKER_MAX_CRASHES:
+        raise SystemExit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local inference server for the expense model")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Time each cold-start phase, print it and exit without serving")
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help="Fork this many server processes from one preloaded model")
+    args = parser.parse_args()
+    if args.profile_startup:
+        profile_startup()
+        return
+
+    print("=" * 60)
+    print("🚀 STARTING LOCAL INFERENCE SERVER")
+    print("=" * 60)
+    print(f"   Batching: up to {MAX_BATCH_SIZE} rows or {MAX_WAIT_MS} ms")
+    print(f"   Workers: {args.workers}" + (" (shared weights)" if SHARED_WEIGHTS else ""))
+    print(f"   Endpoint: http://{HOST}:{PORT}/categorize")
+    print("=" * 60)
+    if args.workers > 1:
+        serve_preforked(args.workers)
+    else:
+        uvicorn.run(app, host=HOST, port=PORT)
+
+if __name__ == "__main__":
+    main()
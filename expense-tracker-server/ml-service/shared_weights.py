@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Zero-copy model loading from memory-mapped safetensors
+Parameters are views into a private mapping of model.safetensors, so every process
+serving the same file shares its page-cache pages instead of holding its own copy
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+from contextlib import contextmanager
+
+SAFETENSORS_FILE = "model.safetensors"
+
+# safetensors dtype codes -> torch dtype names
+DTYPES = {
+    "F64": "float64",
+    "F32": "float32",
+    "F16": "float16",
+    "BF16": "bfloat16",
+    "I64": "int64",
+    "I32": "int32",
+    "I16": "int16",
+    "I8": "int8",
+    "U8": "uint8",
+    "BOOL": "bool",
+}
+
+
+def read_header(path):
+    """(tensor header dict, byte offset where tensor data starts)"""
+    with open(path, "rb") as f:
+        (header_size,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_size))
+    header.pop("__metadata__", None)
+    return header, 8 + header_size
+
+
+def mmap_state_dict(path):
+    """State dict whose tensors all view one copy-on-write mapping of the file
+
+    Reading never copies: the pages stay in the shared page cache. A write (which
+    inference never does) would only copy the touched page into this process.
+    """
+    import torch
+
+    header, data_start = read_header(path)
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    state_dict = {}
+    for name, info in header.items():
+        dtype = getattr(torch, DTYPES[info["dtype"]])
+        start, end = info["data_offsets"]
+        count = (end - start) // torch.empty(0, dtype=dtype).element_size()
+        if count == 0:
+            state_dict[name] = torch.empty(info["shape"], dtype=dtype)
+            continue
+        tensor = torch.frombuffer(mapped, dtype=dtype, count=count, offset=data_start + start)
+        state_dict[name] = tensor.reshape(info["shape"])
+    return state_dict
+
+
+# parameters_on_meta() is per thread: the hook below only acts in threads inside it, so
+# a background loader (HotSwapPredictor) never changes how other threads build modules
+_meta_scope = threading.local()
+_hook_lock = threading.Lock()
+
+
+def _install_meta_hook():
+    """Wrap Module.register_parameter once, process-wide, under a lock"""
+    import torch
+
+    with _hook_lock:
+        register_parameter = torch.nn.Module.register_parameter
+        if getattr(register_parameter, "_meta_scoped", False):
+            return
+
+        def register_scoped(module, name, param):
+            register_parameter(module, name, param)
+            if param is not None and getattr(_meta_scope, "depth", 0):
+                module._parameters[name] = torch.nn.Parameter(
+                    param.to("meta"), requires_grad=param.requires_grad
+                )
+
+        register_scoped._meta_scoped = True
+        torch.nn.Module.register_parameter = register_scoped
+
+
+@contextmanager
+def parameters_on_meta():
+    """In this thread only, build modules with parameters on the meta device and real buffers
+
+    torch.device("meta") would also move buffers the checkpoint does not hold (e.g.
+    DistilBERT's non-persistent position_ids), so only parameters are redirected.
+    Meta parameters take no memory and their random init does no work.
+    """
+    _install_meta_hook()
+    _meta_scope.depth = getattr(_meta_scope, "depth", 0) + 1
+    try:
+        yield
+    finally:
+        _meta_scope.depth -= 1
+
+
+def load_mmap_model(model_dir):
+    """Sequence classifier from `model_dir` with weights mapped from model.safetensors"""
+    from transformers import AutoConfig, AutoModelForSequenceClassification
+
+    path = os.path.join(model_dir, SAFETENSORS_FILE)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} not found; shared weights need a safetensors checkpoint")
+
+    config = AutoConfig.from_pretrained(model_dir)
+    with parameters_on_meta():
+        model = AutoModelForSequenceClassification.from_config(config)
+    # assign=True keeps the mapped tensors instead of copying into new parameters
+    model.load_state_dict(mmap_state_dict(path), strict=True, assign=True)
+    unmapped = [name for name, p in model.named_parameters() if p.is_meta]
+    if unmapped:
+        raise ValueError(f"{path} is missing weights for {unmapped}")
+    model.requires_grad_(False)
+    return model
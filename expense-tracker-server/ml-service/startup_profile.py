@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Startup-time profile for inference workers
+Times each cold-start phase (library imports, model load, first batch) separately
+"""
+
+import argparse
+import json
+import sys
+import time
+from contextlib import contextmanager
+
+WARMUP_DESCRIPTIONS = ["Paid rent for apartment", "Swiggy order dinner"]
+
+
+class StartupProfile:
+    """Records wall time and newly imported module count per named phase"""
+
+    def __init__(self):
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name):
+        modules = len(sys.modules)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, len(sys.modules) - modules)
+
+    def record(self, name, seconds, new_modules=0):
+        self.phases.append({"phase": name, "ms": seconds * 1000, "new_modules": new_modules})
+
+    @property
+    def total_ms(self):
+        return sum(p["ms"] for p in self.phases)
+
+    def report(self):
+        print(f"\n{'phase':<28} {'ms':>9} {'modules':>8}")
+        for p in self.phases:
+            print(f"{p['phase']:<28} {p['ms']:>9.1f} {p['new_modules']:>8}")
+        print(f"{'total':<28} {self.total_ms:>9.1f}")
+
+    def to_dict(self):
+        return {"phases": self.phases, "total_ms": self.total_ms}
+
+
+def profile_inference_startup(backend="torch", model_dir=None, labels_file=None, profile=None):
+    """Cold-start an inference predictor phase by phase; returns (predictor, profile)"""
+    profile = profile or StartupProfile()
+    with profile.phase("import numpy"):
+        import numpy  # noqa: F401
+    if backend == "torch":
+        with profile.phase("import torch"):
+            import torch  # noqa: F401
+    else:
+        with profile.phase("import onnxruntime"):
+            import onnxruntime  # noqa: F401
+    with profile.phase("import transformers"):
+        import transformers  # noqa: F401
+    with profile.phase("import predict"):
+        from predict import LABELS_FILE, MODEL_DIR, load_predictor
+
+    with profile.phase("load model"):
+        predictor = load_predictor(backend, model_dir or MODEL_DIR, labels_file or LABELS_FILE)
+    # The first forward pass pays for lazy kernel and allocator setup
+    with profile.phase("first batch"):
+        predictor.predict_batch(WARMUP_DESCRIPTIONS, top_k=1)
+    with profile.phase("second batch"):
+        predictor.predict_batch(WARMUP_DESCRIPTIONS, top_k=1)
+    return predictor, profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile inference cold-start time per phase")
+    # No import of predict here: that would hide its cost from the profile
+    parser.add_argument("--backend", default="torch", help="torch, onnx or int8")
+    parser.add_argument("--model-dir")
+    parser.add_argument("--labels-file")
+    parser.add_argument("--output", help="Write the profile as JSON to this file")
+    args = parser.parse_args()
+
+    _, profile = profile_inference_startup(args.backend, args.model_dir, args.labels_file)
+    profile.report()
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(profile.to_dict(), f, indent=2)
+
+if __name__ == "__main__":
+    main()
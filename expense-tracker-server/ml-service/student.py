@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Tiny fastText-style student model for expense categorization
+Hashed word, word-bigram and character n-gram features averaged into one linear layer
+"""
+
+import functools
+import json
+import os
+import re
+import zlib
+
+import numpy as np
+
+from predict import TOP_K, decode_predictions, model_version, softmax
+
+STUDENT_DIR = "./student"
+CONFIG_FILE = "student.json"
+WEIGHTS_FILE = "student.pt"
+
+NUM_BUCKETS = 2 ** 17
+EMBEDDING_DIM = 32
+CHAR_NGRAMS = (3, 4, 5)
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _bucket(token, num_buckets):
+    # crc32 rather than hash() so bucket ids are stable across processes
+    return zlib.crc32(token.encode("utf-8")) % num_buckets
+
+
+def featurize(description, num_buckets=NUM_BUCKETS, char_ngrams=CHAR_NGRAMS):
+    """Hashed bucket ids for words, word bigrams and character n-grams"""
+    words = WORD_RE.findall(description.lower())
+    tokens = [f"w:{w}" for w in words]
+    tokens += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+    # Character n-grams carry Hinglish spelling variants ("mangaya", "mangwaya")
+    for word in words:
+        padded = f"<{word}>"
+        for n in char_ngrams:
+            tokens += [f"c:{padded[i:i + n]}" for i in range(len(padded) - n + 1)]
+    if not tokens:
+        tokens = ["<empty>"]
+    return [_bucket(token, num_buckets) for token in tokens]
+
+
+def pack(feature_lists):
+    """Flatten feature id lists into EmbeddingBag (ids, offsets) tensors"""
+    import torch
+
+    lengths = [len(ids) for ids in feature_lists]
+    offsets = np.zeros(len(feature_lists), dtype=np.int64)
+    if lengths:
+        offsets[1:] = np.cumsum(lengths[:-1])
+    ids = np.fromiter((i for ids in feature_lists for i in ids), dtype=np.int64, count=sum(lengths))
+    return torch.from_numpy(ids), torch.from_numpy(offsets)
+
+
+@functools.lru_cache(maxsize=None)
+def student_model_class():
+    """StudentModel, defined on first use so importing this module does not load torch"""
+    from torch import nn
+
+    class StudentModel(nn.Module):
+        """Mean-pooled bag of hashed n-gram embeddings followed by a linear classifier"""
+
+        def __init__(self, num_labels, num_buckets=NUM_BUCKETS, embedding_dim=EMBEDDING_DIM):
+            super().__init__()
+            self.embedding = nn.EmbeddingBag(num_buckets, embedding_dim, mode="mean")
+            self.classifier = nn.Linear(embedding_dim, num_labels)
+
+        def forward(self, ids, offsets):
+            return self.classifier(self.embedding(ids, offsets))
+
+    return StudentModel
+
+
+def __getattr__(name):
+    # `from student import StudentModel` keeps working; torch loads at that point
+    if name == "StudentModel":
+        return student_model_class()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class StudentPredictor:
+    """Same predict_batch interface as predict.Predictor, backed by the student"""
+
+    def __init__(self, student_dir=STUDENT_DIR):
+        import torch
+
+        with open(os.path.join(student_dir, CONFIG_FILE)) as f:
+            self.config = json.load(f)
+        self.labels = np.asarray(self.config["labels"], dtype=object)
+        self.model = student_model_class()(
+            len(self.labels), self.config["num_buckets"], self.config["embedding_dim"]
+        )
+        self.model.load_state_dict(torch.load(os.path.join(student_dir, WEIGHTS_FILE), map_location="cpu"))
+        self.model.eval()
+        self.model_version = model_version(student_dir)
+
+    @property
+    def num_labels(self):
+        return len(self.labels)
+
+    def logits(self, descriptions):
+        import torch
+
+        descriptions = list(descriptions)
+        if not descriptions:
+            return np.empty((0, self.num_labels), dtype=np.float32)
+        features = [featurize(d, self.config["num_buckets"]) for d in descriptions]
+        ids, offsets = pack(features)
+        with torch.inference_mode():
+            return self.model(ids, offsets).numpy()
+
+    def predict_proba(self, descriptions):
+        return softmax(self.logits(descriptions))
+
+    def predict_batch(self, descriptions, top_k=TOP_K):
+        descriptions = list(descriptions)
+        return decode_predictions(descriptions, self.predict_proba(descriptions), self.labels, top_k)
+
+
+def save_student(model, labels, student_dir=STUDENT_DIR, **metadata):
+    """Write student weights and config (labels, feature settings) to a directory"""
+    import torch
+
+    os.makedirs(student_dir, exist_ok=True)
+    torch.save(model.state_dict(), os.path.join(student_dir, WEIGHTS_FILE))
+    config = {
+        "labels": list(labels),
+        "num_buckets": model.embedding.num_embeddings,
+        "embedding_dim": model.embedding.embedding_dim,
+        **metadata,
+    }
+    with open(os.path.join(student_dir, CONFIG_FILE), "w") as f:
+        json.dump(config, f, indent=2)
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Hyperparameter sweep for the expense category model
+Runs a grid of trials in parallel processes on shared cached tokenizations, prunes
+trials that trail the field after their first eval and writes a leaderboard of
+accuracy against training time and model size. Trials are pruned and picked on a
+validation split carved out of train; the test split only reports the result
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+
+from train import (
+    BATCH_SIZE,
+    DATASET_PATH,
+    DEDUPE,
+    DEDUPE_MODES,
+    EPOCHS,
+    LABEL_COLUMN,
+    LEARNING_RATE,
+    MAX_LENGTH,
+    MODEL_NAME,
+    PADDING,
+    RESAMPLE_CAP,
+    SPLIT_SEED,
+    accuracy_resolution,
+    compute_metrics,
+    configure_threads,
+    load_and_preprocess_data,
+    make_collator,
+    make_trainer,
+    make_training_args,
+    prepare_datasets,
+    tokenized_cache_key,
+)
+from tokenize_cache import file_sha256, load_cached
+
+SWEEP_DIR = "./sweeps/latest"
+LEADERBOARD_FILE = "leaderboard.json"
+FIRST_EVALS_FILE = "first_evals.jsonl"
+# Data settings every trial in a sweep dir shares, written when the dir is first used
+CONFIG_FILE = "sweep.json"
+WORKERS = 2
+TARGET_ACCURACY = 0.95
+
+# Default grid; every flag below takes a comma-separated list
+LEARNING_RATES = (LEARNING_RATE, 5e-5)
+BATCH_SIZES = (BATCH_SIZE, 32)
+EPOCH_CHOICES = (1, 2, EPOCHS)
+MAX_LENGTHS = (32, MAX_LENGTH)
+
+# Pruning: after its first eval a trial stops when its validation accuracy trails the
+# median first-eval accuracy of the other trials by more than PRUNE_MARGIN, widened to
+# two validation rows (the deduplicated split has only a few dozen)
+PRUNE_MARGIN = 0.02
+PRUNE_MIN_REPORTS = 3
+
+
+def sweep_config(dataset, label_column, dedupe, seed):
+    """Inputs shared by every trial; results are only comparable under identical ones"""
+    return {
+        "dataset_sha256": file_sha256(dataset),
+        "label_column": label_column,
+        "dedupe": dedupe,
+        "resample_cap": RESAMPLE_CAP,
+        "padding": PADDING,
+        "seed": seed,
+        "selection": "validation",
+    }
+
+
+def check_sweep_dir(sweep_dir, config):
+    """Record `config` in a fresh sweep dir, or refuse one holding a different sweep
+
+    Finished trials are skipped and first evals feed pruning, so reusing a dir
+    across datasets or seeds would silently mix incomparable results.
+    """
+    path = os.path.join(sweep_dir, CONFIG_FILE)
+    if os.path.exists(path):
+        with open(path) as f:
+            recorded = json.load(f)
+        changed = sorted(key for key in recorded.keys() | config.keys() if recorded.get(key) != config.get(key))
+        if changed:
+            raise SystemExit(f"❌ {sweep_dir} holds a sweep with different {', '.join(changed)}; "
+                             f"pass another --sweep-dir")
+        return
+    if any(os.path.exists(os.path.join(sweep_dir, name)) for name in (LEADERBOARD_FILE, FIRST_EVALS_FILE)):
+        raise SystemExit(f"❌ {sweep_dir} holds results with no {CONFIG_FILE} to check them against; "
+                         f"pass another --sweep-dir")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(config, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def trial_id(params, config):
+    encoded = json.dumps({"params": params, "config": config}, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:10]
+
+
+def build_grid(models, learning_rates, batch_sizes, epochs, max_lengths, config):
+    """One params dict per combination, in a stable order"""
+    grid = []
+    for base_model, lr, batch_size, num_epochs, max_length in itertools.product(
+        models, learning_rates, batch_sizes, epochs, max_lengths
+    ):
+        params = {
+            "base_model": base_model,
+            "learning_rate": lr,
+            "batch_size": batch_size,
+            "epochs": num_epochs,
+            "max_length": max_length,
+        }
+        grid.append({"id": trial_id(params, config), "params": params})
+    return grid
+
+
+def report_first_eval(sweep_dir, trial, accuracy):
+    # One short O_APPEND write per trial, safe across processes
+    with open(os.path.join(sweep_dir, FIRST_EVALS_FILE), "a") as f:
+        f.write(json.dumps({"id": trial, "accuracy": accuracy}) + "\n")
+
+
+def should_prune(sweep_dir, trial, accuracy, margin=PRUNE_MARGIN, min_reports=PRUNE_MIN_REPORTS):
+    """True when enough other trials have reported and this one clearly trails them"""
+    path = os.path.join(sweep_dir, FIRST_EVALS_FILE)
+    if not os.path.exists(path):
+        return False
+    with open(path) as f:
+        # Latest report per trial, so a rerun of an interrupted trial counts once
+        reports = {r["id"]: r["accuracy"] for r in map(json.loads, f)}
+    others = [value for other, value in reports.items() if other != trial]
+    return len(others) >= min_reports and accuracy < statistics.median(others) - margin
+
+
+def prune_margin(validation_rows):
+    """PRUNE_MARGIN, or two validation rows of accuracy when that is wider"""
+    return max(PRUNE_MARGIN, 2 * accuracy_resolution(validation_rows))
+
+
+def pruning_callback(trial, sweep_dir, evals, start, margin=PRUNE_MARGIN):
+    """Records each epoch's validation eval and stops the trial after a losing first one"""
+    from transformers import TrainerCallback
+
+    class PruningCallback(TrainerCallback):
+        pruned = False
+
+        def on_evaluate(self, args, state, control, metrics=None, **kwargs):
+            accuracy = metrics["eval_accuracy"]
+            evals.append({
+                "epoch": state.epoch,
+                "accuracy": accuracy,
+                "eval_loss": metrics["eval_loss"],
+                "seconds": time.perf_counter() - start,
+            })
+            if len(evals) == 1:
+                report_first_eval(sweep_dir, trial, accuracy)
+                if state.epoch < args.num_train_epochs and should_prune(sweep_dir, trial, accuracy, margin):
+                    self.pruned = True
+                    control.should_training_stop = True
+
+    return PruningCallback()
+
+
+def run_trial(trial):
+    """Train and evaluate one configuration in this (fresh) worker process"""
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    params = trial["params"]
+    result = {"id": trial["id"], "params": params}
+    try:
+        configure_threads(trial["threads"])
+        # Memory-mapped Arrow files, so parallel trials share the same pages
+        train_dataset, validation_dataset = load_cached(trial["cache_key"])
+        _, test_dataset = load_cached(trial["test_cache_key"])
+        tokenizer = AutoTokenizer.from_pretrained(params["base_model"])
+        model = AutoModelForSequenceClassification.from_pretrained(
+            params["base_model"], num_labels=trial["num_labels"]
+        )
+        evals = []
+        start = time.perf_counter()
+        callback = pruning_callback(trial["id"], trial["sweep_dir"], evals, start,
+                                    prune_margin(len(validation_dataset)))
+        with tempfile.TemporaryDirectory() as output_dir:
+            training_args = make_training_args(
+                trial["padding"],
+                output_dir=output_dir,
+                learning_rate=params["learning_rate"],
+                per_device_train_batch_size=params["batch_size"],
+                per_device_eval_batch_size=params["batch_size"] * 4,
+                num_train_epochs=params["epochs"],
+                save_strategy="no",
+                load_best_model_at_end=False,
+                logging_strategy="no",
+                report_to=[],
+                disable_tqdm=True,
+                seed=trial["seed"],
+            )
+            trainer = make_trainer(
+                model=model,
+                args=training_args,
+                train_dataset=train_dataset,
+                eval_dataset=validation_dataset,
+                data_collator=make_collator(tokenizer, trial["padding"]),
+                compute_metrics=compute_metrics,
+                callbacks=[callback],
+            )
+            metrics = trainer.train().metrics
+            train_seconds = time.perf_counter() - start
+            # predict() rather than evaluate(), which would reach the pruning callback
+            test_accuracy = trainer.predict(test_dataset).metrics["test_accuracy"]
+
+        parameters = sum(p.numel() for p in model.parameters())
+        result.update(
+            status="pruned" if callback.pruned else "complete",
+            val_accuracy=evals[-1]["accuracy"] if evals else None,
+            eval_loss=evals[-1]["eval_loss"] if evals else None,
+            test_accuracy=test_accuracy,
+            epochs_run=evals[-1]["epoch"] if evals else 0,
+            train_seconds=train_seconds,
+            samples_per_sec=metrics["train_samples_per_second"],
+            parameters=parameters,
+            size_mb=sum(p.numel() * p.element_size() for p in model.parameters()) / 1e6,
+            evals=evals,
+        )
+    except Exception as e:  # one broken config should not sink the sweep
+        result.update(status="failed", error=f"{type(e).__name__}: {e}")
+    return result
+
+
+def cheapest_meeting_target(results, target):
+    """Fastest completed trial at or above the target validation accuracy, smaller model on ties"""
+    passing = [r for r in results if r["status"] == "complete" and r["val_accuracy"] >= target]
+    return min(passing, key=lambda r: (r["train_seconds"], r["size_mb"]), default=None)
+
+
+def write_leaderboard(sweep_dir, results, target):
+    ranked = sorted(
+        results, key=lambda r: (r["status"] != "complete", -(r.get("val_accuracy") or 0), r.get("train_seconds", 0))
+    )
+    best = cheapest_meeting_target(results, target)
+    leaderboard = {
+        "target_accuracy": target,
+        "cheapest_meeting_target": best and best["id"],
+        "trials": ranked,
+    }
+    tmp_path = os.path.join(sweep_dir, LEADERBOARD_FILE + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(leaderboard, f, indent=2)
+    os.replace(tmp_path, os.path.join(sweep_dir, LEADERBOARD_FILE))
+    return ranked, best
+
+
+def print_leaderboard(ranked, best):
+    print(f"\n{'id':<11}{'status':<10}{'val':>7}{'test':>7}{'secs':>8}{'MB':>7}  "
+          f"{'model':<24}{'lr':>8}{'bs':>4}{'ep':>4}{'len':>5}")
+    for r in ranked:
+        p = r["params"]
+        val = f"{r['val_accuracy']:.4f}" if r.get("val_accuracy") is not None else "-"
+        test = f"{r['test_accuracy']:.4f}" if r.get("test_accuracy") is not None else "-"
+        seconds = f"{r['train_seconds']:.0f}" if "train_seconds" in r else "-"
+        size = f"{r['size_mb']:.0f}" if "size_mb" in r else "-"
+        marker = " ⭐" if best and r["id"] == best["id"] else ""
+        print(f"{r['id']:<11}{r['status']:<10}{val:>7}{test:>7}{seconds:>8}{size:>7}  "
+              f"{p['base_model'][-24:]:<24}{p['learning_rate']:>8.0e}{p['batch_size']:>4}"
+              f"{p['epochs']:>4}{p['max_length']:>5}{marker}")
+
+
+def comma_list(cast):
+    return lambda text: [cast(value) for value in text.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep training hyperparameters in parallel")
+    parser.add_argument("--dataset", default=DATASET_PATH)
+    parser.add_argument("--label-column", default=LABEL_COLUMN)
+    parser.add_argument("--dedupe", choices=DEDUPE_MODES, default=DEDUPE)
+    parser.add_argument("--models", type=comma_list(str), default=[MODEL_NAME])
+    parser.add_argument("--learning-rates", type=comma_list(float), default=list(LEARNING_RATES))
+    parser.add_argument("--batch-sizes", type=comma_list(int), default=list(BATCH_SIZES))
+    parser.add_argument("--epochs", type=comma_list(int), default=list(EPOCH_CHOICES))
+    parser.add_argument("--max-lengths", type=comma_list(int), default=list(MAX_LENGTHS))
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Trials run at once")
+    parser.add_argument("--target-accuracy", type=float, default=TARGET_ACCURACY)
+    parser.add_argument("--sweep-dir", default=SWEEP_DIR,
+                        help="Leaderboard location; finished trials found here are not rerun")
+    parser.add_argument("--seed", type=int, default=SPLIT_SEED)
+    args = parser.parse_args()
+    from transformers import AutoTokenizer
+
+    print("=" * 60)
+    print("🧪 HYPERPARAMETER SWEEP")
+    print("=" * 60)
+    os.makedirs(args.sweep_dir, exist_ok=True)
+    config = sweep_config(args.dataset, args.label_column, args.dedupe, args.seed)
+    check_sweep_dir(args.sweep_dir, config)
+
+    dataset, label_encoder = load_and_preprocess_data(
+        args.dataset, args.label_column, dedupe=args.dedupe != "off"
+    )
+    # Tokenize once per (tokenizer, max_length) and split; trials then memory-map the
+    # (train, validation) entry and the test side of the usual (train, test) entry
+    cache_keys = {}
+    for base_model in args.models:
+        tokenizer = AutoTokenizer.from_pretrained(base_model)
+        for max_length in args.max_lengths:
+            for validation in (True, False):
+                prepare_datasets(dataset, tokenizer, args.dataset, args.label_column, PADDING,
+                                 dedupe=args.dedupe, resample_cap=RESAMPLE_CAP,
+                                 max_length=max_length, validation=validation)
+                cache_keys[base_model, max_length, validation] = tokenized_cache_key(
+                    args.dataset, tokenizer, args.label_column, PADDING, args.dedupe, RESAMPLE_CAP,
+                    max_length, validation
+                )
+
+    results = []
+    leaderboard_path = os.path.join(args.sweep_dir, LEADERBOARD_FILE)
+    if os.path.exists(leaderboard_path):
+        with open(leaderboard_path) as f:
+            results = [r for r in json.load(f)["trials"] if r["status"] != "failed"]
+    done = {r["id"] for r in results}
+
+    threads = max(1, (os.cpu_count() or 1) // args.workers)
+    trials = [
+        {
+            **trial,
+            "cache_key": cache_keys[trial["params"]["base_model"], trial["params"]["max_length"], True],
+            "test_cache_key": cache_keys[trial["params"]["base_model"], trial["params"]["max_length"], False],
+            "num_labels": len(label_encoder.classes_),
+            "padding": PADDING,
+            "sweep_dir": args.sweep_dir,
+            "threads": threads,
+            "seed": args.seed,
+        }
+        for trial in build_grid(args.models, args.learning_rates, args.batch_sizes,
+                                args.epochs, args.max_lengths, config)
+        if trial["id"] not in done
+    ]
+    print(f"\n🚀 {len(trials)} trials ({len(done)} already done) on {args.workers} workers, "
+          f"{threads} threads each")
+
+    # Fresh spawned process per trial: no inherited tokenizer threads, memory freed after
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(args.workers, maxtasksperchild=1) as pool:
+        for result in pool.imap_unordered(run_trial, trials):
+            results.append(result)
+            write_leaderboard(args.sweep_dir, results, args.target_accuracy)
+            accuracy = result.get("val_accuracy")
+            print(f"   {result['id']} {result['status']:<9} "
+                  f"{'-' if accuracy is None else f'{accuracy:.4f}'} {result['params']}")
+
+    ranked, best = write_leaderboard(args.sweep_dir, results, args.target_accuracy)
+    print_leaderboard(ranked, best)
+    if best:
+        print(f"\n⭐ Cheapest config at >= {args.target_accuracy:.2%} validation accuracy: {best['params']} "
+              f"({best['val_accuracy']:.4f} validation, {best['test_accuracy']:.4f} test, "
+              f"in {best['train_seconds']:.0f}s)")
+    else:
+        print(f"\n⚠️  No trial reached {args.target_accuracy:.2%}")
+    print(f"\n📁 Leaderboard saved to: {leaderboard_path}")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main()
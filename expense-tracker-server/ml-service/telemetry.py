@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Structured telemetry for training and inference
+Counters, gauges and latency histograms, exported as JSON lines and as a
+Prometheus text-format file (or served from /metrics)
+
+transformers is only imported by trainer_callback(), so inference workers can use
+this module without it.
+"""
+
+import json
+import os
+import platform
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+TELEMETRY_DIR = "./telemetry"
+JSONL_FILE = "metrics.jsonl"
+PROMETHEUS_FILE = "metrics.prom"
+METRIC_PREFIX = "expense"
+# Seconds; spans a single-row ONNX call up to a slow training step
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def peak_rss_bytes():
+    """High-water resident set size of this process"""
+    # ru_maxrss is in kilobytes on Linux (bytes on macOS)
+    scale = 1 if platform.system() == "Darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def memory_high_water():
+    """Peak RSS, plus peak CUDA allocation when torch is already in use on a GPU"""
+    memory = {"peak_rss_bytes": peak_rss_bytes()}
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        memory["cuda_max_allocated_bytes"] = torch.cuda.max_memory_allocated()
+    return memory
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def quantile(self, q):
+        """Upper bucket bound containing the q-quantile (None when empty)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, count in zip(self.buckets, self.counts):
+            if count >= rank:
+                return bound
+        return float("inf")
+
+
+class Telemetry:
+    """Thread-safe metrics registry with optional JSON-lines event log"""
+
+    def __init__(self, jsonl_path=None, prometheus_path=None, prefix=METRIC_PREFIX, **labels):
+        self.jsonl_path = jsonl_path
+        self.prometheus_path = prometheus_path
+        self.prefix = prefix
+        # Constant labels on every exported series, e.g. rank=1
+        self.labels = {k: str(v) for k, v in labels.items()}
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+        self._jsonl = None
+        if jsonl_path:
+            os.makedirs(os.path.dirname(jsonl_path) or ".", exist_ok=True)
+            self._jsonl = open(jsonl_path, "a", buffering=1)
+
+    def event(self, name, **fields):
+        """Append one JSON line; a no-op without a JSON-lines path"""
+        if self._jsonl is None:
+            return
+        line = json.dumps({"ts": time.time(), "event": name, **self.labels, **fields})
+        with self._lock:
+            self._jsonl.write(line + "\n")
+
+    def inc(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name, value):
+        with self._lock:
+            self.gauges[name] = value
+
+    def max_gauge(self, name, value):
+        """Keep the largest value seen, for high-water marks"""
+        with self._lock:
+            self.gauges[name] = max(self.gauges.get(name, value), value)
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram(buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name):
+        """Observe the block's wall time (seconds) into histogram `name`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def record_memory(self):
+        for name, value in memory_high_water().items():
+            self.max_gauge(name, value)
+
+    def summary(self):
+        """Plain dict of every metric, for JSON reports"""
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "histograms": {
+                    name: {
+                        "count": h.count,
+                        "sum": h.sum,
+                        "mean": h.sum / h.count if h.count else None,
+                        "p50_le": h.quantile(0.5),
+                        "p95_le": h.quantile(0.95),
+                        "p99_le": h.quantile(0.99),
+                    }
+                    for name, h in self.histograms.items()
+                },
+            }
+
+    def _series(self, name, extra=None):
+        labels = {**self.labels, **(extra or {})}
+        label_text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+        return f"{self.prefix}_{name}" + (f"{{{label_text}}}" if label_text else "")
+
+    def prometheus_text(self):
+        """Every metric in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name, value in sorted(self.counters.items()):
+                lines += [f"# TYPE {self.prefix}_{name} counter", f"{self._series(name)} {value}"]
+            for name, value in sorted(self.gauges.items()):
+                lines += [f"# TYPE {self.prefix}_{name} gauge", f"{self._series(name)} {value}"]
+            for name, h in sorted(self.histograms.items()):
+                lines.append(f"# TYPE {self.prefix}_{name} histogram")
+                for bound, count in zip(h.buckets, h.counts):
+                    lines.append(f"{self._series(name + '_bucket', {'le': repr(bound)})} {count}")
+                lines.append(f"{self._series(name + '_bucket', {'le': '+Inf'})} {h.count}")
+                lines.append(f"{self._series(name + '_sum')} {h.sum}")
+                lines.append(f"{self._series(name + '_count')} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path=None):
+        """Atomically rewrite the Prometheus file (e.g. for node_exporter's textfile collector)"""
+        path = path or self.prometheus_path
+        if not path:
+            return
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    def close(self):
+        self.write_prometheus()
+        if self._jsonl is not None:
+            self._jsonl.close()
+            self._jsonl = None
+
+
+def open_telemetry(directory=TELEMETRY_DIR, rank=None):
+    """Telemetry writing metrics.jsonl and metrics.prom under `directory`
+
+    With a rank (torchrun), each process writes its own pair of files.
+    """
+    suffix = "" if rank is None else f".rank{rank}"
+    jsonl_name, jsonl_ext = os.path.splitext(JSONL_FILE)
+    prom_name, prom_ext = os.path.splitext(PROMETHEUS_FILE)
+    labels = {} if rank is None else {"rank": rank}
+    return Telemetry(
+        os.path.join(directory, jsonl_name + suffix + jsonl_ext),
+        os.path.join(directory, prom_name + suffix + prom_ext),
+        **labels,
+    )
+
+
+def trainer_callback(telemetry):
+    """A transformers TrainerCallback that records per-step timings into `telemetry`
+
+    Per optimizer step it records:
+    - dataloader wait: time from the previous step's end to this step's start
+    - forward time: from hooks on the model, training-mode calls only
+    - backward time: step time minus forward time, so it includes the optimizer step
+    - samples/sec and peak memory
+
+    On GPU the model hooks synchronize so the timings are not just kernel launch
+    times. That costs a little throughput while telemetry is on.
+    """
+    from transformers import TrainerCallback
+
+    class TelemetryCallback(TrainerCallback):
+        def __init__(self):
+            self.hooks = []
+            self.sync = None
+            self.step_start = None
+            self.last_step_end = None
+            self.forward_seconds = 0.0
+            self.forward_start = None
+
+        def _now(self):
+            if self.sync is not None:
+                self.sync()
+            return time.perf_counter()
+
+        def _forward_pre(self, module, inputs):
+            if module.training:
+                self.forward_start = self._now()
+
+        def _forward_post(self, module, inputs, outputs):
+            if module.training and self.forward_start is not None:
+                self.forward_seconds += self._now() - self.forward_start
+                self.forward_start = None
+
+        def on_train_begin(self, args, state, control, model=None, **kwargs):
+            import torch
+
+            if model is not None:
+                if next(model.parameters()).is_cuda:
+                    self.sync = torch.cuda.synchronize
+                self.hooks = [
+                    model.register_forward_pre_hook(self._forward_pre),
+                    model.register_forward_hook(self._forward_post),
+                ]
+            self.samples_per_step = (args.per_device_train_batch_size
+                                     * args.gradient_accumulation_steps * args.world_size)
+            telemetry.event("train_begin", max_steps=state.max_steps,
+                            samples_per_step=self.samples_per_step, world_size=args.world_size)
+
+        def on_step_begin(self, args, state, control, **kwargs):
+            now = self._now()
+            if self.last_step_end is not None:
+                telemetry.observe("train_dataloader_wait_seconds", now - self.last_step_end)
+            self.step_start = now
+            self.forward_seconds = 0.0
+
+        def on_step_end(self, args, state, control, **kwargs):
+            now = self._now()
+            step_seconds = now - self.step_start
+            wait_seconds = self.step_start - self.last_step_end if self.last_step_end else None
+            self.last_step_end = now
+            backward_seconds = max(0.0, step_seconds - self.forward_seconds)
+
+            telemetry.observe("train_step_seconds", step_seconds)
+            telemetry.observe("train_forward_seconds", self.forward_seconds)
+            telemetry.observe("train_backward_seconds", backward_seconds)
+            telemetry.inc("train_steps_total")
+            telemetry.inc("train_samples_total", self.samples_per_step)
+            telemetry.set_gauge("train_samples_per_second", self.samples_per_step / step_seconds)
+            telemetry.record_memory()
+            telemetry.event(
+                "train_step",
+                step=state.global_step,
+                epoch=state.epoch,
+                step_seconds=step_seconds,
+                dataloader_wait_seconds=wait_seconds,
+                forward_seconds=self.forward_seconds,
+                backward_seconds=backward_seconds,
+                samples_per_sec=self.samples_per_step / step_seconds,
+                **memory_high_water(),
+            )
+
+        def on_log(self, args, state, control, logs=None, **kwargs):
+            # Loss, learning rate and eval metrics, same cadence as logging_steps
+            telemetry.event("train_log", step=state.global_step, **(logs or {}))
+            telemetry.write_prometheus()
+
+        def on_train_end(self, args, state, control, **kwargs):
+            for hook in self.hooks:
+                hook.remove()
+            self.hooks = []
+            telemetry.event("train_end", step=state.global_step, **memory_high_water())
+            telemetry.write_prometheus()
+
+    return TelemetryCallback()
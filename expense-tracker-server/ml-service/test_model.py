@@ -3,31 +3,31 @@
 Test the trained model locally before uploading
 """
 
-import pickle
-import torch
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
+import argparse
 
 MODEL_DIR = "./model"
-LABELS_FILE = "./labels.pkl"
 
-def test_model():
+def test_model(profile_startup=False, telemetry_dir=None):
     """Test the model with sample inputs"""
     print("=" * 60)
     print("🧪 TESTING TRAINED MODEL")
     print("=" * 60)
     
-    # Load model and tokenizer
-    print("\n📥 Loading model and tokenizer...")
-    tokenizer = AutoTokenizer.from_pretrained(MODEL_DIR)
-    model = AutoModelForSequenceClassification.from_pretrained(MODEL_DIR)
+    # Load model, tokenizer and label table
+    print("\n📥 Loading model, tokenizer and labels...")
+    if profile_startup:
+        from startup_profile import profile_inference_startup
+        predictor, profile = profile_inference_startup("torch", MODEL_DIR)
+        profile.report()
+    else:
+        from predict import Predictor
+        predictor = Predictor(MODEL_DIR)
+    if telemetry_dir:
+        from telemetry import open_telemetry
+        predictor.telemetry = open_telemetry(telemetry_dir)
     
-    # Load label encoder
-    print("📥 Loading label encoder...")
-    with open(LABELS_FILE, "rb") as f:
-        label_encoder = pickle.load(f)
-    
-    print(f"✅ Model loaded with {len(label_encoder.classes_)} categories")
-    print(f"📋 Categories: {label_encoder.classes_.tolist()}")
+    print(f"✅ Model loaded with {predictor.num_labels} categories")
+    print(f"📋 Categories: {predictor.labels.tolist()}")
     
     # Test cases
     test_cases = [
@@ -49,35 +49,26 @@ def test_model():
     print("🔍 PREDICTIONS")
     print("=" * 60)
     
-    for description in test_cases:
-        # Tokenize
-        inputs = tokenizer(description, return_tensors="pt", truncation=True, padding=True, max_length=64)
-        
-        # Predict
-        with torch.no_grad():
-            outputs = model(**inputs)
-            logits = outputs.logits
-            probabilities = torch.softmax(logits, dim=1)[0]
-            predicted_idx = torch.argmax(probabilities).item()
-            confidence = probabilities[predicted_idx].item()
-        
-        # Decode label
-        predicted_category = label_encoder.inverse_transform([predicted_idx])[0]
-        
-        # Get top 3 predictions
-        top3_indices = torch.topk(probabilities, 3).indices.tolist()
-        top3_probs = torch.topk(probabilities, 3).values.tolist()
-        
-        print(f"\n📝 Description: {description}")
-        print(f"   ✅ Predicted: {predicted_category} (confidence: {confidence:.2%})")
+    for prediction in predictor.predict_batch(test_cases, top_k=3):
+        print(f"\n📝 Description: {prediction['description']}")
+        print(f"   ✅ Predicted: {prediction['category']} (confidence: {prediction['confidence']:.2%})")
         print(f"   📊 Top 3:")
-        for idx, prob in zip(top3_indices, top3_probs):
-            cat = label_encoder.inverse_transform([idx])[0]
-            print(f"      {cat}: {prob:.2%}")
+        for candidate in prediction["top_k"]:
+            print(f"      {candidate['category']}: {candidate['confidence']:.2%}")
+    
+    if predictor.telemetry:
+        predictor.telemetry.record_memory()
+        predictor.telemetry.close()
+        print(f"\n📈 Telemetry written to: {telemetry_dir}")
     
     print("\n" + "=" * 60)
     print("✅ TESTING COMPLETE!")
     print("=" * 60)
 
 if __name__ == "__main__":
-    test_model()
+    parser = argparse.ArgumentParser(description="Test the trained model locally")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Report import and model-load time per phase")
+    parser.add_argument("--telemetry-dir", help="Write per-batch latency metrics here")
+    args = parser.parse_args()
+    test_model(args.profile_startup, args.telemetry_dir)
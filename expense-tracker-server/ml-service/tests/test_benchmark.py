@@ -0,0 +1,41 @@
+from benchmark import check_regressions
+
+
+def report(single_p95=10.0, batched_p95=100.0, overall=0.90, per_master=None):
+    return {
+        "inference": {"single_row": {"p95_ms": single_p95}, "batched": {"p95_ms": batched_p95}},
+        "accuracy": {"overall": overall, "per_master": per_master or {"Food": 0.95, "Rent": 0.85}},
+    }
+
+
+def check(new, baseline=None):
+    return check_regressions(baseline or report(), new, max_latency_regression=0.20, max_accuracy_drop=0.01)
+
+
+def test_identical_reports_pass():
+    assert check(report()) == []
+
+
+def test_changes_within_the_limits_pass():
+    assert check(report(single_p95=12.0, batched_p95=119.0, overall=0.89,
+                        per_master={"Food": 0.94, "Rent": 0.84})) == []
+
+
+def test_latency_regression_fails_per_section():
+    failures = check(report(batched_p95=121.0))
+    assert len(failures) == 1
+    assert failures[0].startswith("batched p95 100.00 ms -> 121.00 ms")
+
+
+def test_accuracy_drop_fails_overall_and_per_master():
+    failures = check(report(overall=0.88, per_master={"Food": 0.95, "Rent": 0.80}))
+    assert [f.split()[0] for f in failures] == ["accuracy[overall]", "accuracy[Rent]"]
+
+
+def test_masters_missing_from_either_side_are_skipped():
+    assert check(report(per_master={"Food": 0.95, "Travel": 0.10})) == []
+
+
+def test_sections_missing_from_either_report_are_skipped():
+    assert check({"inference": {}, "accuracy": None}) == []
+    assert check(report(single_p95=50.0), baseline={"meta": {}}) == []
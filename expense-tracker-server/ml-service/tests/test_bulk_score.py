@@ -0,0 +1,59 @@
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+import pytest
+
+from bulk_score import dedupe_chunk, iter_chunks
+
+COLUMNS = ["id", "description"]
+NUM_ROWS = 23
+
+
+def rows(start, stop):
+    return pa.table({
+        "id": [str(i) for i in range(start, stop)],
+        "description": [f"expense {i % 5}" for i in range(start, stop)],
+    })
+
+
+@pytest.fixture(params=["parquet", "csv"])
+def export_path(request, tmp_path):
+    if request.param == "csv":
+        path = tmp_path / "export.csv"
+        pa_csv.write_csv(rows(0, NUM_ROWS), path)
+        return str(path)
+    # Uneven files and row groups so reader batches never line up with chunks
+    path = tmp_path / "export"
+    path.mkdir()
+    for part, (start, stop) in enumerate([(0, 7), (7, 8), (8, 20), (20, NUM_ROWS)]):
+        pq.write_table(rows(start, stop), path / f"part-{part}.parquet", row_group_size=5)
+    return str(path)
+
+
+def ids(chunks):
+    return [chunk.column("id").to_pylist() for chunk in chunks]
+
+
+def test_chunks_have_fixed_size_and_cover_every_row(export_path):
+    chunks = ids(iter_chunks(export_path, COLUMNS, 4))
+    assert [len(c) for c in chunks] == [4, 4, 4, 4, 4, 3]
+    assert sum(chunks, []) == [str(i) for i in range(NUM_ROWS)]
+
+
+@pytest.mark.parametrize("chunks_done", [1, 3, 5, 6])
+def test_resume_yields_the_remaining_chunks_unchanged(export_path, chunks_done):
+    full = ids(iter_chunks(export_path, COLUMNS, 4))
+    assert ids(iter_chunks(export_path, COLUMNS, 4, skip_rows=chunks_done * 4)) == full[chunks_done:]
+
+
+def test_skip_inside_a_reader_batch(export_path):
+    chunks = ids(iter_chunks(export_path, COLUMNS, 4, skip_rows=9))
+    assert chunks[0] == ["9", "10", "11", "12"]
+    assert sum(chunks, []) == [str(i) for i in range(9, NUM_ROWS)]
+
+
+def test_dedupe_chunk_maps_rows_to_distinct_descriptions():
+    chunk = pa.table({"description": ["rent", None, "food", "rent"]})
+    distinct, index = dedupe_chunk(chunk)
+    assert [distinct[i] for i in index] == ["rent", "", "food", "rent"]
+    assert len(distinct) == 3
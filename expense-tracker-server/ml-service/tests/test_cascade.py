@@ -0,0 +1,25 @@
+import numpy as np
+
+from cascade import calibration_split
+
+
+def test_calibration_split_takes_a_share_of_every_label():
+    labels = np.repeat([0, 1, 2], [10, 4, 1])
+    fit_rows, report_rows = calibration_split(labels, 0.5, seed=42)
+    assert sorted(np.concatenate([fit_rows, report_rows]).tolist()) == list(range(len(labels)))
+    assert np.bincount(labels[fit_rows], minlength=3).tolist() == [5, 2, 0]
+    assert np.bincount(labels[report_rows], minlength=3).tolist() == [5, 2, 1]
+
+
+def test_calibration_split_does_not_follow_row_order():
+    # Sorted input (as the held-out split is) must not put the first half in calibration
+    labels = np.zeros(100, dtype=np.int64)
+    fit_rows, _ = calibration_split(labels, 0.5, seed=42)
+    assert 0 < (fit_rows < 50).sum() < 50
+
+
+def test_calibration_split_is_reproducible():
+    labels = np.arange(40) % 4
+    first = calibration_split(labels, 0.5, seed=7)
+    second = calibration_split(labels, 0.5, seed=7)
+    assert all(np.array_equal(a, b) for a, b in zip(first, second))
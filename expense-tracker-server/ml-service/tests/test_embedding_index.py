@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+import embedding_index
+from embedding_index import EmbeddingIndex, build_index, near_duplicate_groups, normalize
+
+
+def clustered(rows, dim=16, copies=3, seed=0):
+    """`rows` vectors where each consecutive run of `copies` rows is one tight cluster"""
+    rng = np.random.default_rng(seed)
+    centers = normalize(rng.standard_normal((rows // copies, dim)).astype(np.float32))
+    noise = rng.standard_normal((rows, dim)).astype(np.float32) * 0.01
+    return normalize(np.repeat(centers, copies, axis=0) + noise)
+
+
+def expected_groups(rows, copies=3):
+    return sorted(list(range(i, i + copies)) for i in range(0, rows, copies))
+
+
+def test_near_duplicates_found_by_exact_scan(monkeypatch):
+    # A block smaller than the row count exercises the chunked scan
+    monkeypatch.setattr(embedding_index, "SCORE_BLOCK", 64 * 30)
+    assert sorted(near_duplicate_groups(clustered(30), threshold=0.99)) == expected_groups(30)
+
+
+def test_near_duplicates_found_through_the_inverted_lists(monkeypatch):
+    monkeypatch.setattr(embedding_index, "IVF_MIN_ROWS", 100)
+    vectors = clustered(600)
+    # Shuffle so the index's list order differs from the input order
+    order = np.random.default_rng(1).permutation(len(vectors))
+    groups = near_duplicate_groups(vectors[order], threshold=0.99, dim=0)
+    assert sorted(sorted(order[members].tolist()) for members in groups) == expected_groups(600)
+
+
+def test_unrelated_rows_form_no_groups():
+    assert near_duplicate_groups(clustered(20, copies=1), threshold=0.99) == []
+    assert near_duplicate_groups(clustered(1, copies=1)) == []
+
+
+def test_index_refuses_a_different_encoder(tmp_path):
+    build_index(clustered(30), np.zeros(30), ["-"], str(tmp_path), dim=0, encoder_version="abc")
+    assert len(EmbeddingIndex(str(tmp_path), encoder_version="abc")) == 30
+    with pytest.raises(ValueError, match="rebuild"):
+        EmbeddingIndex(str(tmp_path), encoder_version="def")
@@ -0,0 +1,66 @@
+import pytest
+
+from hierarchical import build_hierarchy, child_mask
+
+torch = pytest.importorskip("torch")
+
+PAIRS = {
+    ("Food & Dining", "Cafe"),
+    ("Food & Dining", "Swiggy"),
+    ("Fuel", "Petrol"),
+    ("Travel", "Flights"),
+}
+
+
+def test_build_hierarchy_sorts_masters_subcategories_and_children():
+    hierarchy = build_hierarchy(PAIRS)
+    assert hierarchy["masters"] == ["Food & Dining", "Fuel", "Travel"]
+    assert hierarchy["subcategories"] == ["Cafe", "Flights", "Petrol", "Swiggy"]
+    assert hierarchy["children"]["Food & Dining"] == ["Cafe", "Swiggy"]
+
+
+def test_child_mask_allows_only_each_masters_children():
+    hierarchy = build_hierarchy(PAIRS)
+    mask = child_mask(hierarchy)
+    assert mask.dtype == torch.bool
+    assert mask.tolist() == [
+        [True, False, False, True],   # Food & Dining: Cafe, Swiggy
+        [False, False, True, False],  # Fuel: Petrol
+        [False, True, False, False],  # Travel: Flights
+    ]
+
+
+def test_child_mask_gives_every_subcategory_exactly_one_master():
+    hierarchy = build_hierarchy(PAIRS)
+    assert child_mask(hierarchy).sum(dim=0).tolist() == [1, 1, 1, 1]
+
+
+class FixedEncoder(torch.nn.Module):
+    """Returns the same hidden state for every token, in place of DistilBERT"""
+
+    class config:
+        hidden_size = 4
+
+    def forward(self, input_ids, attention_mask=None):
+        from types import SimpleNamespace
+
+        hidden = torch.ones(input_ids.shape[0], input_ids.shape[1], self.config.hidden_size)
+        return SimpleNamespace(last_hidden_state=hidden)
+
+
+def test_loss_stays_finite_when_the_predicted_master_is_wrong():
+    from hierarchical import hierarchical_classifier_class
+
+    hierarchy = build_hierarchy(PAIRS)
+    model = hierarchical_classifier_class()(FixedEncoder(), hierarchy).eval()
+    with torch.no_grad():
+        model.master_head.weight.zero_()
+        model.master_head.bias.copy_(torch.tensor([0.0, 0.0, 5.0]))  # always predicts Travel
+    outputs = model(
+        input_ids=torch.zeros(1, 3, dtype=torch.long),
+        master_labels=torch.tensor([0]),  # Food & Dining
+        sub_labels=torch.tensor([3]),  # Swiggy
+    )
+    assert torch.isfinite(outputs["loss"]) and outputs["loss"] < 20
+    # Returned subcategories still follow the predicted master
+    assert outputs["sub_logits"].argmax(dim=-1).tolist() == [1]  # Flights
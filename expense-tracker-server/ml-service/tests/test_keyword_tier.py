@@ -0,0 +1,81 @@
+import re
+
+import pytest
+
+from dataset import generate_expense_dataset_50000 as vocab
+from keyword_tier import KeywordTier, compile_trie, load_user_keywords, vocabulary_keywords
+
+
+@pytest.fixture(scope="module")
+def tier():
+    return KeywordTier()
+
+
+def test_match_returns_master_subcategory_and_span(tier):
+    result = tier.match("Paid rent for apartment")
+    assert result["category"] == "Home Expenses"
+    assert result["subcategory"] == "Rent"
+    assert result["source"] == "keyword"
+    assert result["span"] == (5, 9)
+
+
+def test_match_ignores_case_and_extra_whitespace(tier):
+    result = tier.match("SWIGGY   order")
+    assert result["keyword"] == "swiggy order"
+    assert result["span"] == (0, 14)
+
+
+def test_keywords_match_whole_words_only(tier):
+    assert tier.match("swiggyx") is None
+    assert tier.match("parent meeting") is None  # "rent" inside a word
+
+
+def test_no_match_returns_none(tier):
+    assert tier.match("random text xyz") is None
+
+
+def test_match_batch_keeps_order_duplicates_and_row_boundaries(tier):
+    descriptions = ["Paid rent for apartment", "nothing here", "Paid rent for apartment",
+                    "first line\nBought petrol for bike"]
+    results = tier.match_batch(descriptions)
+    assert [r and r["category"] for r in results] == ["Home Expenses", None, "Home Expenses", "Fuel"]
+    assert results == [tier.match(d) for d in descriptions]
+
+
+def test_seeded_keywords_point_at_one_known_master():
+    keywords = vocabulary_keywords()
+    assert keywords
+    assert {master for master, _, _ in keywords.values()} <= set(vocab.CATEGORIES)
+
+
+def test_user_keywords_override_the_vocabulary(tmp_path):
+    path = tmp_path / "keywords.json"
+    path.write_text('{"Rent": ["Bills & Utilities", "Housing"], "chai  tapri": "Food & Dining"}')
+    user_keywords = load_user_keywords(path)
+    assert set(user_keywords) == {"rent", "chai tapri"}
+
+    tier = KeywordTier(user_keywords)
+    rent = tier.match("Paid rent for apartment")
+    assert (rent["category"], rent["subcategory"], rent["match_source"]) == ("Bills & Utilities", "Housing", "user")
+    assert tier.match("Chai tapri near office")["category"] == "Food & Dining"
+
+
+def test_compiled_trie_prefers_the_longest_keyword_at_a_position():
+    pattern = re.compile(compile_trie(["uber", "uber ride", "ola"]))
+    assert pattern.findall("uber ride home, then ola, then uber") == ["uber ride", "ola", "uber"]
+    assert pattern.findall("ubers") == []
+
+
+def test_categorize_sends_only_unmatched_rows_to_the_predictor(tier):
+    class RecordingPredictor:
+        def __init__(self):
+            self.batches = []
+
+        def predict_batch(self, descriptions, top_k=1):
+            self.batches.append(list(descriptions))
+            return [{"category": "other", "confidence": 0.5} for _ in descriptions]
+
+    predictor = RecordingPredictor()
+    results = tier.categorize(["Paid rent for apartment", "mystery", "???"], predictor)
+    assert predictor.batches == [["mystery", "???"]]
+    assert [r["source"] for r in results] == ["keyword", "ml", "ml"]
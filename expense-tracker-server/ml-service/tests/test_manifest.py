@@ -0,0 +1,42 @@
+import json
+import pickle
+
+import pytest
+
+from manifest import MANIFEST_FILE, has_manifest, read_manifest, write_manifest
+from predict import load_labels
+
+
+def test_write_then_read_round_trips(tmp_path):
+    model_dir = tmp_path / "model"
+    written = write_manifest(model_dir, ["food", "rent"], max_length=64, metrics={"eval_accuracy": 0.9})
+    assert has_manifest(model_dir)
+    assert not (model_dir / (MANIFEST_FILE + ".tmp")).exists()
+
+    manifest = read_manifest(model_dir)
+    assert manifest == written
+    assert manifest["labels"] == ["food", "rent"]
+    assert manifest["metrics"] == {"eval_accuracy": 0.9}
+
+
+def test_read_rejects_other_manifest_versions(tmp_path):
+    (tmp_path / MANIFEST_FILE).write_text(json.dumps({"manifest_version": 99, "labels": []}))
+    with pytest.raises(ValueError, match="manifest_version 99"):
+        read_manifest(tmp_path)
+
+
+def test_load_labels_prefers_the_manifest(tmp_path):
+    write_manifest(tmp_path, ["food", "rent"])
+    labels = load_labels(str(tmp_path), str(tmp_path / "missing.pkl"))
+    assert labels.tolist() == ["food", "rent"]
+    assert labels.dtype == object
+
+
+def test_load_labels_falls_back_to_labels_pkl(tmp_path):
+    preprocessing = pytest.importorskip("sklearn.preprocessing")
+    encoder = preprocessing.LabelEncoder().fit(["rent", "food", "travel"])
+    labels_file = tmp_path / "labels.pkl"
+    labels_file.write_bytes(pickle.dumps(encoder))
+
+    labels = load_labels(str(tmp_path / "model"), str(labels_file))
+    assert labels.tolist() == ["food", "rent", "travel"]
@@ -0,0 +1,44 @@
+import os
+
+import model_registry
+from manifest import write_manifest
+from model_registry import ModelRegistry
+
+
+def trained_model_dir(path):
+    write_manifest(path, ["food", "rent"], max_length=64)
+    (path / "model.safetensors").write_bytes(b"\0" * 100)
+    (path / "checkpoint-500").mkdir()
+    (path / "checkpoint-500" / "optimizer.pt").write_bytes(b"\0" * 1000)
+    (path / "logs").mkdir()
+    (path / "logs" / "events.out.tfevents").write_bytes(b"")
+    return path
+
+
+def test_publish_copies_the_model_without_training_outputs(tmp_path):
+    registry = ModelRegistry(str(tmp_path / "models"))
+    version = registry.publish(str(trained_model_dir(tmp_path / "model")))
+    assert sorted(os.listdir(registry.path(version))) == ["manifest.json", "model.safetensors"]
+    assert registry.current_version() == version
+
+
+def test_publishes_in_the_same_second_get_distinct_versions(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_registry.time, "strftime", lambda fmt, *args: "20260101-120000")
+    registry = ModelRegistry(str(tmp_path / "models"))
+    model_dir = str(trained_model_dir(tmp_path / "model"))
+    first = registry.publish(model_dir)
+    second = registry.publish(model_dir)
+    third = registry.publish(model_dir)
+    assert second == f"{first}-2" and third == f"{first}-3"
+    assert registry.versions() == [first, second, third]
+    assert registry.current_version() == third
+    assert not [name for name in os.listdir(registry.root) if name.endswith(".tmp")]
+
+
+def test_prune_keeps_the_newest_inactive_versions(tmp_path, monkeypatch):
+    registry = ModelRegistry(str(tmp_path / "models"))
+    model_dir = str(trained_model_dir(tmp_path / "model"))
+    stamps = iter(f"20260101-12000{i}" for i in range(5))
+    monkeypatch.setattr(model_registry.time, "strftime", lambda fmt, *args: next(stamps))
+    versions = [registry.publish(model_dir, keep=2) for _ in range(5)]
+    assert registry.versions() == versions[2:]
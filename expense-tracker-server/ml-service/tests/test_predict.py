@@ -0,0 +1,9 @@
+import pytest
+
+from predict import load_predictor
+
+
+@pytest.mark.parametrize("backend", ["onnx", "int8"])
+def test_shared_weights_are_rejected_for_onnx_backends(backend, tmp_path):
+    with pytest.raises(ValueError, match="only supported by the torch backend"):
+        load_predictor(backend, str(tmp_path), shared_weights=True)
@@ -0,0 +1,117 @@
+import shutil
+
+import pytest
+
+import prediction_cache
+from predict import model_version
+from prediction_cache import CachedPredictor, PredictionCache, normalize_description
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(prediction_cache.time, "time", clock)
+    return clock
+
+
+def test_normalize_folds_case_whitespace_and_digits():
+    assert normalize_description("Paid 500  Rent\n") == normalize_description("paid 1200 rent")
+
+
+def test_lru_evicts_the_least_recently_used_entry(clock):
+    cache = PredictionCache(max_entries=2)
+    cache.put_many({"a": 1, "b": 2})
+    assert cache.get_many(["a"]) == {"a": 1}  # "b" is now the oldest
+    cache.put_many({"c": 3})
+    assert cache.get_many(["a", "b", "c"]) == {"a": 1, "c": 3}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = PredictionCache(ttl_seconds=60)
+    cache.put_many({"a": 1})
+    clock.now += 59
+    assert cache.get_many(["a"]) == {"a": 1}
+    clock.now += 2
+    assert cache.get_many(["a"]) == {}
+    assert cache.stats()["entries"] == 0
+
+
+def test_sqlite_tier_serves_other_instances_until_expiry(clock, tmp_path):
+    db_path = str(tmp_path / "cache.db")
+    PredictionCache(ttl_seconds=60, db_path=db_path).put_many({"a": {"category": "Rent"}})
+
+    other = PredictionCache(ttl_seconds=60, db_path=db_path)
+    assert other.get_many(["a"]) == {"a": {"category": "Rent"}}
+    assert other.stats()["disk_hits"] == 1
+    clock.now += 61
+    assert PredictionCache(ttl_seconds=60, db_path=db_path).get_many(["a"]) == {}
+
+
+class CountingPredictor:
+    num_labels = 2
+    model_version = "v1"
+
+    def __init__(self):
+        self.calls = []
+
+    def predict_batch(self, descriptions, top_k=1):
+        self.calls.append(list(descriptions))
+        return [{"description": d, "category": d.split()[0].lower()} for d in descriptions]
+
+
+def test_cached_predictor_runs_each_normalized_description_once():
+    predictor = CountingPredictor()
+    cached = CachedPredictor(predictor)
+    first = cached.predict_batch(["Rent 500", "rent  900", "Food"])
+    second = cached.predict_batch(["RENT 1"])
+    assert predictor.calls == [["Rent 500", "Food"]]
+    assert [r["description"] for r in first] == ["Rent 500", "rent  900", "Food"]
+    assert second == [{"description": "RENT 1", "category": "rent"}]
+
+    predictor.model_version = "v2"
+    cached.predict_batch(["RENT 1"])
+    assert predictor.calls[-1] == ["RENT 1"]
+
+
+def test_model_version_depends_on_contents_not_location(tmp_path):
+    model_dir = tmp_path / "model"
+    model_dir.mkdir()
+    (model_dir / "config.json").write_text('{"labels": 8}')
+    (model_dir / "vocab.txt").write_text("a\nb\n")
+    version = model_version(str(model_dir))
+
+    copy = shutil.copytree(model_dir, tmp_path / "elsewhere" / "copy")
+    assert model_version(str(copy)) == version
+    assert model_version(str(model_dir) + "/") == version
+
+    (copy / "config.json").write_text('{"labels": 9}')
+    assert model_version(str(copy)) != version
+    (copy / "config.json").write_text('{"labels": 8}')
+    (copy / "vocab.txt").write_text("a\nc\n")
+    assert model_version(str(copy)) != version
+
+
+def test_model_version_ignores_files_inference_does_not_read(tmp_path):
+    (tmp_path / "config.json").write_text('{"labels": 8}')
+    (tmp_path / "model.safetensors").write_bytes(b"\0" * 64)
+    version = model_version(str(tmp_path))
+
+    (tmp_path / "README.md").write_text("# Model card")
+    (tmp_path / "training_args.bin").write_bytes(b"\1")
+    (tmp_path / "checkpoint-500").mkdir()
+    (tmp_path / "checkpoint-500" / "model.safetensors").write_bytes(b"\1" * 64)
+    (tmp_path / "logs").mkdir()
+    (tmp_path / "logs" / "events.out.tfevents.1").write_bytes(b"\1")
+    assert model_version(str(tmp_path)) == version
+
+    (tmp_path / "model.safetensors").write_bytes(b"\1" * 64)
+    assert model_version(str(tmp_path)) != version
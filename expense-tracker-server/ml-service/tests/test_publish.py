@@ -0,0 +1,80 @@
+import hashlib
+import json
+
+import pytest
+
+from publish import BUNDLE_FILE, LocalArtifactStore, build_bundle, bundle_files, diff_bundles, hash_file, publish
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    model_dir = tmp_path / "model"
+    (model_dir / "tokenizer").mkdir(parents=True)
+    (model_dir / ".cache").mkdir()
+    (model_dir / "config.json").write_text('{"num_labels": 8}')
+    (model_dir / "model.safetensors").write_bytes(b"\0" * 3000)
+    (model_dir / "tokenizer" / "vocab.txt").write_text("rent\nfood\n")
+    (model_dir / ".cache" / "lock").write_text("")
+    (model_dir / BUNDLE_FILE).write_text("{}")
+    return model_dir
+
+
+def test_hash_file_matches_sha256(model_dir):
+    path = model_dir / "model.safetensors"
+    assert hash_file(path) == hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def test_bundle_skips_hidden_files_and_bundle_json(model_dir):
+    assert bundle_files(model_dir) == ["config.json", "model.safetensors", "tokenizer/vocab.txt"]
+
+
+def test_bundle_id_depends_only_on_contents(model_dir, tmp_path):
+    bundle = build_bundle(model_dir)
+    assert bundle["files"]["model.safetensors"]["size"] == 3000
+
+    copy = tmp_path / "copy"
+    for path in bundle_files(model_dir):
+        (copy / path).parent.mkdir(parents=True, exist_ok=True)
+        (copy / path).write_bytes((model_dir / path).read_bytes())
+    assert build_bundle(copy)["bundle_id"] == bundle["bundle_id"]
+
+    (copy / "config.json").write_text('{"num_labels": 9}')
+    assert build_bundle(copy)["bundle_id"] != bundle["bundle_id"]
+
+
+def test_diff_lists_changed_new_and_deleted_paths(model_dir):
+    published = build_bundle(model_dir)
+    assert diff_bundles(published, None) == (sorted(published["files"]), [])
+    assert diff_bundles(published, published) == ([], [])
+
+    (model_dir / "config.json").write_text('{"num_labels": 9}')
+    (model_dir / "manifest.json").write_text("{}")
+    (model_dir / "tokenizer" / "vocab.txt").unlink()
+    changed, deleted = diff_bundles(build_bundle(model_dir), published)
+    assert sorted(changed) == ["config.json", "manifest.json"]
+    assert deleted == ["tokenizer/vocab.txt"]
+
+
+def test_empty_directory_is_refused(tmp_path):
+    with pytest.raises(ValueError, match="no files"):
+        build_bundle(tmp_path)
+
+
+def test_local_store_publishes_only_changes_and_fetches_them_back(model_dir, tmp_path):
+    store = LocalArtifactStore(tmp_path / "artifacts")
+    first = publish(model_dir, store)
+    assert store.latest_id() == first["bundle_id"]
+
+    uploaded = []
+    upload = store.upload
+    store.upload = lambda model_dir, path, info: (uploaded.append(path), upload(model_dir, path, info))
+    (model_dir / "config.json").write_text('{"num_labels": 9}')
+    second = publish(model_dir, store)
+    assert uploaded == ["config.json"]
+    assert store.latest_id() == second["bundle_id"] != first["bundle_id"]
+
+    dest = tmp_path / "restored"
+    store.fetch(dest, first["bundle_id"])
+    assert (dest / "config.json").read_text() == '{"num_labels": 8}'
+    assert json.loads((dest / BUNDLE_FILE).read_text())["bundle_id"] == first["bundle_id"]
+    assert build_bundle(dest)["bundle_id"] == first["bundle_id"]
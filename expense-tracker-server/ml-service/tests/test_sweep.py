@@ -0,0 +1,42 @@
+import json
+
+from sweep import FIRST_EVALS_FILE, cheapest_meeting_target, prune_margin, should_prune
+
+
+def write_first_evals(sweep_dir, accuracies):
+    with open(sweep_dir / FIRST_EVALS_FILE, "w") as f:
+        for trial, accuracy in accuracies.items():
+            f.write(json.dumps({"id": trial, "accuracy": accuracy}) + "\n")
+
+
+def test_prune_margin_is_at_least_two_validation_rows():
+    assert prune_margin(42) == 2 / 42
+    assert prune_margin(10_000) == 0.02
+
+
+def test_should_prune_needs_enough_reports_and_a_clear_gap(tmp_path):
+    write_first_evals(tmp_path, {"a": 0.90, "b": 0.92})
+    assert not should_prune(tmp_path, "me", 0.50)
+
+    write_first_evals(tmp_path, {"a": 0.90, "b": 0.92, "c": 0.94})
+    margin = prune_margin(42)
+    # Two validation rows behind the median is noise, not a losing trial
+    assert not should_prune(tmp_path, "me", 0.92 - 2 / 42, margin)
+    assert should_prune(tmp_path, "me", 0.92 - 3 / 42, margin)
+
+
+def test_should_prune_ignores_the_trials_own_earlier_report(tmp_path):
+    write_first_evals(tmp_path, {"me": 0.10, "a": 0.90, "b": 0.92})
+    assert not should_prune(tmp_path, "me", 0.50)
+
+
+def test_cheapest_trial_is_picked_on_validation_accuracy():
+    results = [
+        {"id": "fast", "status": "complete", "val_accuracy": 0.93, "test_accuracy": 0.99,
+         "train_seconds": 10, "size_mb": 1},
+        {"id": "slow", "status": "complete", "val_accuracy": 0.96, "test_accuracy": 0.90,
+         "train_seconds": 50, "size_mb": 1},
+        {"id": "pruned", "status": "pruned", "val_accuracy": 0.99, "train_seconds": 1, "size_mb": 1},
+    ]
+    assert cheapest_meeting_target(results, 0.95)["id"] == "slow"
+    assert cheapest_meeting_target(results, 0.999) is None
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Persistent on-disk cache for tokenized train/test datasets
+Entries are keyed by dataset content, tokenizer and split settings and evicted LRU
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+
+CACHE_DIR = "./.cache/tokenized"
+MAX_CACHE_BYTES = 2 * 1024 ** 3
+LAST_USED_FILE = ".last_used"
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Content hash of a file, or of every file under a directory (e.g. Parquet parts)"""
+    digest = hashlib.sha256()
+    if os.path.isdir(path):
+        paths = sorted(
+            os.path.join(root, name) for root, _, files in os.walk(path) for name in files
+        )
+    else:
+        paths = [path]
+    for file_path in paths:
+        digest.update(os.path.relpath(file_path, path).encode("utf-8"))
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(dataset_path, tokenizer, **settings):
+    """Key built from the dataset hash, tokenizer name/version and split settings"""
+    import tokenizers
+    import transformers
+
+    parts = {
+        "dataset_sha256": file_sha256(dataset_path),
+        "tokenizer": tokenizer.name_or_path,
+        "vocab_size": len(tokenizer),
+        "transformers": transformers.__version__,
+        "tokenizers": tokenizers.__version__,
+        **settings,
+    }
+    encoded = json.dumps(parts, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:24]
+
+
+def _touch(entry_dir):
+    with open(os.path.join(entry_dir, LAST_USED_FILE), "w") as f:
+        f.write(str(time.time()))
+
+
+def _last_used(entry_dir):
+    try:
+        return os.path.getmtime(os.path.join(entry_dir, LAST_USED_FILE))
+    except OSError:
+        return 0.0
+
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def load_cached(key, cache_dir=CACHE_DIR):
+    """Memory-map the cached (train, test) datasets, or return None on a miss"""
+    from datasets import load_from_disk
+
+    entry_dir = os.path.join(cache_dir, key)
+    if not os.path.isdir(entry_dir):
+        return None
+    train_dataset = load_from_disk(os.path.join(entry_dir, "train"))
+    test_dataset = load_from_disk(os.path.join(entry_dir, "test"))
+    _touch(entry_dir)
+    return train_dataset, test_dataset
+
+
+def save_cached(key, train_dataset, test_dataset, cache_dir=CACHE_DIR,
+                max_bytes=MAX_CACHE_BYTES):
+    """Write both splits under `key`, then evict old entries over the size limit"""
+    entry_dir = os.path.join(cache_dir, key)
+    # Write to a temporary directory first so a crash never leaves a half entry
+    tmp_dir = f"{entry_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    train_dataset.save_to_disk(os.path.join(tmp_dir, "train"))
+    test_dataset.save_to_disk(os.path.join(tmp_dir, "test"))
+    _touch(tmp_dir)
+
+    shutil.rmtree(entry_dir, ignore_errors=True)
+    os.replace(tmp_dir, entry_dir)
+    evict(cache_dir, max_bytes, keep=key)
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES, keep=None):
+    """Delete least recently used entries until the cache fits in `max_bytes`"""
+    if not os.path.isdir(cache_dir):
+        return []
+
+    entries = []
+    for name in os.listdir(cache_dir):
+        entry_dir = os.path.join(cache_dir, name)
+        if os.path.isdir(entry_dir) and ".tmp-" not in name:
+            entries.append((_last_used(entry_dir), name, _dir_size(entry_dir)))
+
+    total = sum(size for _, _, size in entries)
+    evicted = []
+    for _, name, size in sorted(entries):
+        if total <= max_bytes:
+            break
+        if name == keep:
+            continue
+        shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+        total -= size
+        evicted.append(name)
+    return evicted
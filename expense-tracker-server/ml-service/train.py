@@ -2,76 +2,241 @@
 """
 Expense Category Classification Model Training Script
 Trains a DistilBERT model on expense descriptions
+
+torch, datasets, transformers and scikit-learn are imported inside the functions
+that use them, so `--help` and scripts that only need constants start instantly.
 """
 
-import pandas as pd
-import pickle
+import argparse
+import numpy as np
 import os
-from datasets import Dataset
-from transformers import (
-    AutoTokenizer,
-    AutoModelForSequenceClassification,
-    TrainingArguments,
-    Trainer
-)
-from sklearn.preprocessing import LabelEncoder
-from sklearn.model_selection import train_test_split
+import time
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from manifest import write_manifest
+from telemetry import open_telemetry, trainer_callback
+from tokenize_cache import cache_key, file_sha256, load_cached, save_cached
 
 # Configuration
-DATASET_PATH = "../dataset/expense_training_dataset_15000.csv"
+DATASET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dataset")
+DATASET_PATH = os.path.join(DATASET_DIR, "expense_training_dataset_15000.csv")
+LABEL_COLUMN = "category"
 MODEL_NAME = "distilbert-base-uncased"
 OUTPUT_DIR = "./model"
-LABELS_FILE = "./labels.pkl"
 
 # Training parameters (optimized for free tier)
 BATCH_SIZE = 16
 EPOCHS = 3
 LEARNING_RATE = 2e-5
 MAX_LENGTH = 64
+SPLIT_SEED = 42
+TEST_SIZE = 0.2
+
+# Padding: "dynamic" pads each batch to its longest row with a data collator,
+# "max_length" pads every row to MAX_LENGTH at tokenization time
+PADDING = "dynamic"
+PADDING_MODES = ("dynamic", "max_length")
+# Batch rows of similar token length together (only useful with dynamic padding)
+GROUP_BY_LENGTH = True
+
+# Parallelism: launch with torchrun for multi-process data parallel training.
+# CPU processes talk over gloo; each one gets an equal share of the cores.
+DDP_BACKEND = "gloo"
+DATALOADER_WORKERS = 0
+
+# Deduplication: the generated data repeats a few templates per subcategory, so
+# identical (description, label) rows collapse into one row with a count and the
+# train/test split is made over unique descriptions. "capped" repeats each unique
+# row min(count, RESAMPLE_CAP) times, "weighted" trains on each once with its loss
+# scaled by its count, "off" trains on every copy with a row-level split
+DEDUPE = "capped"
+DEDUPE_MODES = ("off", "capped", "weighted")
+RESAMPLE_CAP = 8
+
+def read_table(dataset_path):
+    """Read a dataset as an Arrow table: Parquet is memory-mapped, CSV parsed by Arrow"""
+    if os.path.isdir(dataset_path) or dataset_path.endswith(".parquet"):
+        return pq.read_table(dataset_path, memory_map=True)
+    return pa_csv.read_csv(dataset_path)
+
+def encode_labels(column, classes):
+    """Map a (possibly dictionary-encoded) string column to label indices"""
+    return pc.index_in(column.cast(pa.string()), value_set=pa.array(classes, pa.string()))
+
+def collapse_duplicates(table, label_columns=("label",)):
+    """One row per distinct (description, *labels) with a `count` column, sorted for a stable split"""
+    keys = ["description", *label_columns]
+    return (
+        table.group_by(keys)
+        .aggregate([(label_columns[0], "count")])
+        .rename_columns(keys + ["count"])
+        .sort_by([(key, "ascending") for key in keys])
+    )
+
+def load_and_preprocess_data(dataset_path=DATASET_PATH, label_column=LABEL_COLUMN, dedupe=True):
+    """Load CSV or Parquet dataset and preprocess"""
+    from datasets import Dataset
+    from sklearn.preprocessing import LabelEncoder
 
-def load_and_preprocess_data():
-    """Load CSV dataset and preprocess"""
     print("📊 Loading dataset...")
-    df = pd.read_csv(DATASET_PATH)
+    table = read_table(dataset_path)
+    categories = table.column(label_column).cast(pa.string())
+    counts = sorted(
+        ((c["values"].as_py(), c["counts"].as_py()) for c in pc.value_counts(categories)),
+        key=lambda item: -item[1],
+    )
     
-    print(f"✅ Loaded {len(df)} samples")
-    print(f"📋 Categories: {df['category'].unique().tolist()}")
-    print(f"📈 Category distribution:\n{df['category'].value_counts()}")
+    print(f"✅ Loaded {table.num_rows} samples")
+    print(f"📋 Categories: {[name for name, _ in counts]}")
+    print("📈 Category distribution:")
+    for name, count in counts:
+        print(f"  {name}: {count}")
     
     # Encode labels
     le = LabelEncoder()
-    df["label"] = le.fit_transform(df["category"])
+    le.fit([name for name, _ in counts])
+    # Only the columns training needs: datasets cannot wrap dictionary-encoded columns
+    table = pa.table({
+        "description": table.column("description"),
+        "label": encode_labels(categories, le.classes_.tolist()),
+    })
     
     print(f"\n🏷️  Label mapping:")
     for idx, category in enumerate(le.classes_):
         print(f"  {idx}: {category}")
     
-    return df, le
+    if dedupe:
+        rows = table.num_rows
+        table = collapse_duplicates(table)
+        print(f"\n🧹 {rows} rows -> {table.num_rows} unique (description, label) pairs")
+    
+    return Dataset(table), le
+
+def split_by_description(descriptions, labels, counts=None):
+    """Stratified train/test row indices that keep every copy of a description on one side
+
+    The test side gets about TEST_SIZE of each label's rows (weighted by `counts` for
+    collapsed rows), made of whole descriptions. Each description is stratified by its
+    first row's label; labels with only one distinct description go to train.
+    """
+    unique, inverse = np.unique(np.asarray(descriptions, dtype=object), return_inverse=True)
+    first = np.empty(len(unique), dtype=np.int64)
+    first[inverse[::-1]] = np.arange(len(inverse))[::-1]
+    strata = np.asarray(labels)[first]
+    rows = np.ones(len(inverse), dtype=np.int64) if counts is None else np.asarray(counts)
+    group_rows = np.bincount(inverse, weights=rows, minlength=len(unique))
+    splittable = np.bincount(strata)[strata] >= 2
+
+    rng = np.random.default_rng(SPLIT_SEED)
+    test_groups = []
+    for stratum in np.unique(strata[splittable]):
+        groups = rng.permutation(np.flatnonzero(splittable & (strata == stratum)))
+        target = TEST_SIZE * group_rows[groups].sum()
+        taken, total = [], 0.0
+        # Greedy: take a description when it moves the test rows closer to the target;
+        # the last one always stays in train
+        for group in groups[:-1]:
+            if abs(total + group_rows[group] - target) < abs(total - target):
+                taken.append(group)
+                total += group_rows[group]
+        test_groups.append(taken or groups[:1])
+    in_test = np.isin(inverse, np.concatenate(test_groups) if test_groups else [])
+    return np.flatnonzero(~in_test), np.flatnonzero(in_test)
+
+def create_dataset(dataset):
+    """Create HuggingFace train/test datasets
+
+    Deduplicated datasets (with a `count` column) are split by unique description
+    and keep `count` on the train side; the test side has each description once.
+    Copies always get the same prediction, so repeating them would not make the
+    test split any more informative.
+    """
+    from sklearn.model_selection import train_test_split
 
-def create_dataset(df):
-    """Create HuggingFace dataset"""
     print("\n🔄 Creating train/test split...")
-    train_df, test_df = train_test_split(df, test_size=0.2, random_state=42, stratify=df['label'])
-    
-    train_dataset = Dataset.from_pandas(train_df[['description', 'label']])
-    test_dataset = Dataset.from_pandas(test_df[['description', 'label']])
+    columns = ["description", "label"]
+    if "count" in dataset.column_names:
+        train_idx, test_idx = split_by_description(
+            dataset["description"], dataset["label"], dataset["count"]
+        )
+        train_dataset = dataset.select(train_idx).select_columns(columns + ["count"])
+    else:
+        # Splitting row indices gives the same split as splitting the rows themselves
+        train_idx, test_idx = train_test_split(
+            np.arange(len(dataset)),
+            test_size=TEST_SIZE,
+            random_state=SPLIT_SEED,
+            stratify=np.asarray(dataset["label"]),
+        )
+        train_dataset = dataset.select(train_idx).select_columns(columns)
+    test_dataset = dataset.select(test_idx).select_columns(columns)
     
     print(f"✅ Train samples: {len(train_dataset)}")
     print(f"✅ Test samples: {len(test_dataset)}")
     
     return train_dataset, test_dataset
 
-def tokenize_dataset(train_dataset, test_dataset, tokenizer):
+def accuracy_resolution(test_rows):
+    """Accuracy change from a single test row flipping
+
+    The deduplicated test split is small (about 60 rows for the 15k set), so
+    regression gates tighter than this would fail on one changed prediction.
+    """
+    return 1.0 / max(1, test_rows)
+
+def trained_dedupe(manifest):
+    """Dedupe mode a model was trained with (models from before deduplication used off)"""
+    return manifest.get("training", {}).get("dedupe", "off")
+
+def load_heldout_split(manifest):
+    """(test_dataset, label_encoder) of the split a model with this manifest was evaluated on
+
+    Rebuilt from the manifest's dataset, label column and dedupe mode, so none of
+    the rows were trained on.
+    """
+    trained_on = manifest.get("dataset", {}).get("path")
+    dataset_path = os.path.join(DATASET_DIR, trained_on) if trained_on else DATASET_PATH
+    dataset, label_encoder = load_and_preprocess_data(
+        dataset_path,
+        manifest.get("label_column", LABEL_COLUMN),
+        dedupe=trained_dedupe(manifest) != "off",
+    )
+    _, test_dataset = create_dataset(dataset)
+    return test_dataset, label_encoder
+
+def apply_counts(train_dataset, dedupe=DEDUPE, resample_cap=RESAMPLE_CAP):
+    """Turn the train split's duplicate counts into capped repeats or loss weights"""
+    if "count" not in train_dataset.column_names:
+        return train_dataset
+    counts = np.asarray(train_dataset["count"])
+    train_dataset = train_dataset.remove_columns("count")
+    if dedupe == "capped":
+        repeats = np.minimum(counts, resample_cap)
+        train_dataset = train_dataset.select(np.repeat(np.arange(len(counts)), repeats))
+        print(f"🔁 Capped resampling: {counts.sum()} rows -> {len(train_dataset)} (cap {resample_cap})")
+    elif dedupe == "weighted":
+        # Mean weight 1 keeps the loss scale, and so the learning rate, comparable
+        train_dataset = train_dataset.add_column("weight", (counts / counts.mean()).astype(np.float32))
+        print(f"⚖️  Count-weighted loss over {len(counts)} unique rows ({counts.sum()} total)")
+    return train_dataset
+
+def tokenize_dataset(train_dataset, test_dataset, tokenizer, padding=PADDING, max_length=MAX_LENGTH):
     """Tokenize datasets"""
-    print("\n🔤 Tokenizing datasets...")
+    print(f"\n🔤 Tokenizing datasets (padding: {padding})...")
     
     def tokenize_function(examples):
-        return tokenizer(
+        encoded = tokenizer(
             examples["description"],
             truncation=True,
-            padding="max_length",
-            max_length=MAX_LENGTH
+            padding="max_length" if padding == "max_length" else False,
+            max_length=max_length
         )
+        # Token counts let group_by_length bucket rows without re-reading input_ids
+        encoded["length"] = [len(ids) for ids in encoded["input_ids"]]
+        return encoded
     
     train_dataset = train_dataset.map(tokenize_function, batched=True)
     test_dataset = test_dataset.map(tokenize_function, batched=True)
@@ -87,17 +252,99 @@ def tokenize_dataset(train_dataset, test_dataset, tokenizer):
     print("✅ Tokenization complete")
     return train_dataset, test_dataset
 
-def train_model(train_dataset, test_dataset, num_labels):
-    """Train the model"""
-    print(f"\n🤖 Loading model: {MODEL_NAME}")
-    
-    model = AutoModelForSequenceClassification.from_pretrained(
-        MODEL_NAME,
-        num_labels=num_labels
+def tokenized_cache_key(dataset_path, tokenizer, label_column=LABEL_COLUMN, padding=PADDING,
+                        dedupe=DEDUPE, resample_cap=RESAMPLE_CAP, max_length=MAX_LENGTH,
+                        validation=False):
+    """Tokenization cache key for these split and tokenizer settings"""
+    # Only validation entries carry the extra setting, so existing keys stay valid
+    extra = {"holdout": "validation"} if validation else {}
+    return cache_key(
+        dataset_path,
+        tokenizer,
+        label_column=label_column,
+        max_length=max_length,
+        padding=padding,
+        split_seed=SPLIT_SEED,
+        test_size=TEST_SIZE,
+        split="description_rows" if dedupe != "off" else "rows",
+        dedupe=dedupe,
+        resample_cap=resample_cap if dedupe == "capped" else None,
+        **extra,
     )
-    
-    print("\n⚙️  Setting up training arguments...")
-    training_args = TrainingArguments(
+
+def prepare_datasets(dataset, tokenizer, dataset_path=DATASET_PATH, label_column=LABEL_COLUMN,
+                     padding=PADDING, use_cache=True, telemetry=None, dedupe=DEDUPE,
+                     resample_cap=RESAMPLE_CAP, max_length=MAX_LENGTH, validation=False):
+    """Split and tokenize, reusing the on-disk tokenization cache when possible
+
+    With `validation`, the train side is split again the same way and (train,
+    validation) is returned instead, so the test split stays unseen.
+    """
+    start = time.perf_counter()
+    key = None
+    if use_cache:
+        key = tokenized_cache_key(
+            dataset_path, tokenizer, label_column, padding, dedupe, resample_cap, max_length,
+            validation,
+        )
+        cached = load_cached(key)
+        if cached is not None:
+            print(f"\n⚡ Loaded tokenized datasets from cache ({key})")
+            if telemetry:
+                telemetry.event("tokenize", seconds=time.perf_counter() - start, cached=True)
+            return cached
+
+    train_dataset, test_dataset = create_dataset(dataset)
+    if validation:
+        train_dataset, test_dataset = create_dataset(train_dataset)
+    train_dataset = apply_counts(train_dataset, dedupe, resample_cap)
+    train_dataset, test_dataset = tokenize_dataset(
+        train_dataset, test_dataset, tokenizer, padding, max_length
+    )
+    if telemetry:
+        seconds = time.perf_counter() - start
+        rows = len(train_dataset) + len(test_dataset)
+        telemetry.set_gauge("tokenize_seconds", seconds)
+        telemetry.event("tokenize", seconds=seconds, cached=False, rows=rows,
+                        rows_per_sec=rows / seconds)
+
+    if use_cache:
+        save_cached(key, train_dataset, test_dataset)
+        print(f"💾 Cached tokenized datasets ({key})")
+    return train_dataset, test_dataset
+
+def make_collator(tokenizer, padding=PADDING):
+    """Per-batch padding collator, or None when rows are already padded"""
+    from transformers import DataCollatorWithPadding
+
+    if padding == "dynamic":
+        return DataCollatorWithPadding(tokenizer)
+    return None
+
+def local_world_size():
+    """Processes on this machine, as set by torchrun (1 when run directly)"""
+    return int(os.environ.get("LOCAL_WORLD_SIZE", "1"))
+
+def configure_threads(num_threads=None):
+    """Pin intra-op threads, defaulting to an equal share of cores per process"""
+    import torch
+
+    if num_threads is None:
+        num_threads = max(1, (os.cpu_count() or 1) // local_world_size())
+    torch.set_num_threads(num_threads)
+    return num_threads
+
+def make_training_args(padding=PADDING, use_cpu=False, dataloader_workers=DATALOADER_WORKERS,
+                       max_steps=-1, **overrides):
+    """Training arguments, set up for gloo DDP when training on CPU
+
+    Keyword overrides (e.g. learning_rate, num_train_epochs) replace the defaults.
+    """
+    import torch
+    from transformers import TrainingArguments
+
+    use_cpu = use_cpu or not torch.cuda.is_available()
+    settings = dict(
         output_dir=OUTPUT_DIR,
         evaluation_strategy="epoch",
         save_strategy="epoch",
@@ -112,64 +359,211 @@ def train_model(train_dataset, test_dataset, num_labels):
         metric_for_best_model="eval_loss",
         save_total_limit=2,
         push_to_hub=False,
+        save_safetensors=True,
+        group_by_length=GROUP_BY_LENGTH and padding == "dynamic",
+        max_steps=max_steps,
+        use_cpu=use_cpu,
+        ddp_backend=DDP_BACKEND if use_cpu else None,
+        ddp_find_unused_parameters=False,
+        dataloader_num_workers=dataloader_workers,
     )
+    settings.update(overrides)
+    return TrainingArguments(**settings)
+
+def compute_metrics(eval_pred):
+    """Held-out accuracy next to the loss, for the manifest and the registry's listing"""
+    return {"accuracy": float((eval_pred.predictions.argmax(axis=1) == eval_pred.label_ids).mean())}
+
+def make_trainer(**kwargs):
+    """A Trainer, scaling each row's loss by its `weight` column when the train set has one"""
+    import torch
+    from transformers import Trainer
+
+    if "weight" not in kwargs["train_dataset"].column_names:
+        return Trainer(**kwargs)
+
+    class WeightedTrainer(Trainer):
+        def _set_signature_columns_if_needed(self):
+            # Otherwise `weight` is dropped as an input the model does not take
+            super()._set_signature_columns_if_needed()
+            if "weight" not in self._signature_columns:
+                self._signature_columns.append("weight")
+
+        def compute_loss(self, model, inputs, return_outputs=False):
+            weights = inputs.pop("weight", None)
+            if weights is None:  # evaluation rows carry no weight
+                return super().compute_loss(model, inputs, return_outputs)
+            outputs = model(**inputs)
+            losses = torch.nn.functional.cross_entropy(
+                outputs.logits, inputs["labels"], reduction="none"
+            )
+            loss = (losses * weights.to(losses.dtype)).mean()
+            return (loss, outputs) if return_outputs else loss
+
+    return WeightedTrainer(**kwargs)
+
+def train_model(train_dataset, test_dataset, num_labels, tokenizer, padding=PADDING,
+                training_args=None, callbacks=None):
+    """Train the model"""
+    from transformers import AutoModelForSequenceClassification
+
+    print(f"\n🤖 Loading model: {MODEL_NAME}")
+    
+    model = AutoModelForSequenceClassification.from_pretrained(
+        MODEL_NAME,
+        num_labels=num_labels
+    )
+    
+    if training_args is None:
+        print("\n⚙️  Setting up training arguments...")
+        training_args = make_training_args(padding)
     
     print("\n🚀 Starting training...")
-    trainer = Trainer(
+    trainer = make_trainer(
         model=model,
         args=training_args,
         train_dataset=train_dataset,
         eval_dataset=test_dataset,
+        data_collator=make_collator(tokenizer, padding),
+        compute_metrics=compute_metrics,
+        callbacks=callbacks,
     )
     
-    trainer.train()
+    metrics = trainer.train().metrics
+    # Throughput across all processes, so runs with different process counts compare directly
+    samples_per_sec = metrics["train_samples_per_second"]
+    world_size = training_args.world_size
+    print(f"\n⏱️  {samples_per_sec:.1f} samples/sec over {world_size} process(es) "
+          f"({samples_per_sec / world_size:.1f} per process)")
     
     print("\n💾 Saving model...")
+    # Only writes from the main process
     trainer.save_model(OUTPUT_DIR)
     
     return model, trainer
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train the expense category model")
+    parser.add_argument("--dataset", default=DATASET_PATH, help="Training CSV, Parquet file or Parquet directory")
+    parser.add_argument("--label-column", default=LABEL_COLUMN,
+                        help="Label column, e.g. category or master_category")
+    parser.add_argument("--padding", choices=PADDING_MODES, default=PADDING)
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Re-tokenize instead of using the on-disk cache")
+    parser.add_argument("--cpu", action="store_true", help="Train on CPU even if a GPU is available")
+    parser.add_argument("--num-threads", type=int,
+                        help="Intra-op threads per process (default: cores / local processes)")
+    parser.add_argument("--dataloader-workers", type=int, default=DATALOADER_WORKERS)
+    parser.add_argument("--max-steps", type=int, default=-1,
+                        help="Stop after this many steps, e.g. for scaling runs")
+    parser.add_argument("--dedupe", choices=DEDUPE_MODES, default=DEDUPE,
+                        help="Collapse duplicate rows and resample (capped) or weight them")
+    parser.add_argument("--resample-cap", type=int, default=RESAMPLE_CAP,
+                        help="Most copies of one unique row per epoch with --dedupe capped")
+    parser.add_argument("--register", metavar="REGISTRY_DIR", nargs="?", const="./models",
+                        help="Also publish the model as a new active version in this registry")
+    parser.add_argument("--telemetry-dir",
+                        help="Write per-step metrics as JSON lines and Prometheus text here")
+    return parser.parse_args()
+
 def main():
     """Main training pipeline"""
+    # Parse first so --help never pays for the heavy imports
+    args = parse_args()
+    from transformers import AutoTokenizer
+
+    num_threads = configure_threads(args.num_threads)
+    training_args = make_training_args(
+        args.padding, args.cpu, args.dataloader_workers, args.max_steps
+    )
+    
     print("=" * 60)
     print("🎯 EXPENSE CATEGORY CLASSIFICATION - MODEL TRAINING")
     print("=" * 60)
+    print(f"🧵 {training_args.world_size} process(es), {num_threads} threads each")
+
+    telemetry = None
+    if args.telemetry_dir:
+        rank = training_args.process_index if training_args.world_size > 1 else None
+        telemetry = open_telemetry(args.telemetry_dir, rank)
+        print(f"📈 Telemetry: {args.telemetry_dir}")
     
     # Load data
-    df, label_encoder = load_and_preprocess_data()
-    
-    # Create datasets
-    train_dataset, test_dataset = create_dataset(df)
+    dataset, label_encoder = load_and_preprocess_data(
+        args.dataset, args.label_column, dedupe=args.dedupe != "off"
+    )
     
     # Load tokenizer
     print(f"\n📝 Loading tokenizer: {MODEL_NAME}")
     tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
     
-    # Tokenize
-    train_dataset, test_dataset = tokenize_dataset(train_dataset, test_dataset, tokenizer)
+    # Create and tokenize datasets; other processes then load the main process's cache entry
+    with training_args.main_process_first(desc="tokenization"):
+        train_dataset, test_dataset = prepare_datasets(
+            dataset, tokenizer, args.dataset, args.label_column, args.padding,
+            use_cache=not args.no_cache, telemetry=telemetry, dedupe=args.dedupe,
+            resample_cap=args.resample_cap
+        )
     
     # Train
-    model, trainer = train_model(train_dataset, test_dataset, len(label_encoder.classes_))
+    model, trainer = train_model(
+        train_dataset, test_dataset, len(label_encoder.classes_), tokenizer, args.padding,
+        training_args, callbacks=[trainer_callback(telemetry)] if telemetry else None
+    )
+    
+    # Evaluate (every process takes part, metrics are gathered across them)
+    print("\n📊 Final evaluation...")
+    eval_results = trainer.evaluate()
+    if telemetry:
+        # Eval metrics already reached the JSON lines through the callback's on_log
+        telemetry.close()
+    
+    if not trainer.is_world_process_zero():
+        return
+    print(f"✅ Evaluation results: {eval_results}")
     
     # Save tokenizer
     print("\n💾 Saving tokenizer...")
     tokenizer.save_pretrained(OUTPUT_DIR)
     
-    # Save label encoder
-    print("💾 Saving label encoder...")
-    with open(LABELS_FILE, "wb") as f:
-        pickle.dump(label_encoder, f)
+    # Labels, settings and metrics travel with the weights; no pickled LabelEncoder
+    print("💾 Writing model manifest...")
+    write_manifest(
+        OUTPUT_DIR,
+        label_encoder.classes_.tolist(),
+        base_model=MODEL_NAME,
+        max_length=MAX_LENGTH,
+        padding=args.padding,
+        label_column=args.label_column,
+        dataset={
+            "path": os.path.basename(args.dataset),
+            "sha256": file_sha256(args.dataset),
+            "rows": sum(dataset["count"]) if "count" in dataset.column_names else len(dataset),
+            "unique_rows": len(dataset),
+        },
+        metrics=eval_results,
+        training={
+            "epochs": EPOCHS,
+            "learning_rate": LEARNING_RATE,
+            "batch_size": BATCH_SIZE,
+            "split_seed": SPLIT_SEED,
+            "test_size": TEST_SIZE,
+            "world_size": training_args.world_size,
+            "dedupe": args.dedupe,
+            "resample_cap": args.resample_cap if args.dedupe == "capped" else None,
+        },
+    )
     
-    # Evaluate
-    print("\n📊 Final evaluation...")
-    eval_results = trainer.evaluate()
-    print(f"✅ Evaluation results: {eval_results}")
+    if args.register:
+        from model_registry import ModelRegistry
+        version = ModelRegistry(args.register).publish(OUTPUT_DIR)
+        print(f"📦 Published as {version} in {args.register}; servers watching it will hot-swap")
     
     print("\n" + "=" * 60)
     print("✅ TRAINING COMPLETE!")
     print("=" * 60)
     print(f"\n📁 Model saved to: {OUTPUT_DIR}")
-    print(f"📁 Labels saved to: {LABELS_FILE}")
+    print(f"📁 Manifest saved to: {OUTPUT_DIR}/manifest.json")
     print("\n🎉 Next steps:")
     print("  1. Test the model locally")
     print("  2. Upload to HuggingFace using upload_to_hf.py")
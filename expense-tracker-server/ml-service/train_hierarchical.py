@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Hierarchical Expense Classification Training Script
+Trains one shared DistilBERT encoder with master and subcategory heads on the 50k dataset
+"""
+
+import argparse
+import os
+
+import pyarrow as pa
+
+from hierarchical import build_hierarchy, hierarchical_classifier_class
+from train import (
+    BATCH_SIZE,
+    DATASET_DIR,
+    EPOCHS,
+    GROUP_BY_LENGTH,
+    LEARNING_RATE,
+    MODEL_NAME,
+    PADDING,
+    PADDING_MODES,
+    RESAMPLE_CAP,
+    apply_counts,
+    collapse_duplicates,
+    encode_labels,
+    make_collator,
+    read_table,
+    split_by_description,
+    tokenize_dataset,
+)
+
+DATASET_PATH = os.path.join(DATASET_DIR, "expense_dataset_50000.csv")
+OUTPUT_DIR = "./model_hierarchical"
+
+
+def load_hierarchical_data(dataset_path):
+    """Load the 50k CSV or Parquet dataset, encode master/subcategory labels and collapse duplicates"""
+    from datasets import Dataset
+
+    print("📊 Loading dataset...")
+    table = read_table(dataset_path)
+    masters = table.column("master_category").cast(pa.string())
+    subcategories = table.column("subcategory").cast(pa.string())
+    pairs = set(zip(masters.to_pylist(), subcategories.to_pylist()))
+    hierarchy = build_hierarchy(pairs)
+
+    table = collapse_duplicates(pa.table({
+        "description": table.column("description"),
+        "master_labels": encode_labels(masters, hierarchy["masters"]),
+        "sub_labels": encode_labels(subcategories, hierarchy["subcategories"]),
+    }), ("master_labels", "sub_labels"))
+    dataset = Dataset(table)
+
+    print(f"✅ Loaded {sum(dataset['count'])} samples, {len(dataset)} unique")
+    print(f"📋 {len(hierarchy['masters'])} master categories, "
+          f"{len(hierarchy['subcategories'])} subcategories")
+    return dataset, hierarchy
+
+
+def create_hierarchical_dataset(dataset):
+    """Train/test split by unique description, stratified on the master category
+
+    Every copy of a description lands on one side, as in train.py; the train side
+    repeats each unique row up to RESAMPLE_CAP times.
+    """
+    print("\n🔄 Creating train/test split...")
+    train_idx, test_idx = split_by_description(
+        dataset["description"], dataset["master_labels"], dataset["count"]
+    )
+    train_dataset = apply_counts(dataset.select(train_idx), "capped", RESAMPLE_CAP)
+    test_dataset = dataset.select(test_idx).remove_columns("count")
+    print(f"✅ Train samples: {len(train_dataset)}")
+    print(f"✅ Test samples: {len(test_dataset)}")
+    return train_dataset, test_dataset
+
+
+def compute_metrics(eval_pred):
+    """Accuracy for each level, plus rows where both levels are right"""
+    master_logits, sub_logits = eval_pred.predictions
+    master_labels, sub_labels = eval_pred.label_ids
+    master_ok = master_logits.argmax(axis=1) == master_labels
+    sub_ok = sub_logits.argmax(axis=1) == sub_labels
+    return {
+        "master_accuracy": float(master_ok.mean()),
+        "sub_accuracy": float(sub_ok.mean()),
+        "joint_accuracy": float((master_ok & sub_ok).mean()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the hierarchical expense classifier")
+    parser.add_argument("--dataset", default=DATASET_PATH)
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--padding", choices=PADDING_MODES, default=PADDING)
+    args = parser.parse_args()
+
+    from transformers import AutoModel, AutoTokenizer, Trainer, TrainingArguments
+
+    print("=" * 60)
+    print("🎯 HIERARCHICAL EXPENSE CLASSIFICATION - MODEL TRAINING")
+    print("=" * 60)
+
+    dataset, hierarchy = load_hierarchical_data(args.dataset)
+    train_dataset, test_dataset = create_hierarchical_dataset(dataset)
+
+    print(f"\n📝 Loading tokenizer: {MODEL_NAME}")
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    train_dataset, test_dataset = tokenize_dataset(train_dataset, test_dataset, tokenizer, args.padding)
+
+    print(f"\n🤖 Loading encoder: {MODEL_NAME}")
+    model = hierarchical_classifier_class()(AutoModel.from_pretrained(MODEL_NAME), hierarchy)
+
+    training_args = TrainingArguments(
+        output_dir=args.output_dir,
+        evaluation_strategy="epoch",
+        save_strategy="no",
+        learning_rate=LEARNING_RATE,
+        per_device_train_batch_size=BATCH_SIZE,
+        per_device_eval_batch_size=BATCH_SIZE,
+        num_train_epochs=EPOCHS,
+        weight_decay=0.01,
+        logging_dir=f"{args.output_dir}/logs",
+        logging_steps=100,
+        label_names=["master_labels", "sub_labels"],
+        group_by_length=GROUP_BY_LENGTH and args.padding == "dynamic",
+        push_to_hub=False,
+    )
+
+    print("\n🚀 Starting training...")
+    trainer = Trainer(
+        model=model,
+        args=training_args,
+        train_dataset=train_dataset,
+        eval_dataset=test_dataset,
+        data_collator=make_collator(tokenizer, args.padding),
+        compute_metrics=compute_metrics,
+    )
+    trainer.train()
+
+    print("\n💾 Saving model...")
+    model.save(args.output_dir)
+    tokenizer.save_pretrained(args.output_dir)
+
+    print("\n📊 Final evaluation...")
+    eval_results = trainer.evaluate()
+    print(f"✅ Evaluation results: {eval_results}")
+
+    print("\n" + "=" * 60)
+    print("✅ TRAINING COMPLETE!")
+    print("=" * 60)
+    print(f"\n📁 Model saved to: {args.output_dir}")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main()
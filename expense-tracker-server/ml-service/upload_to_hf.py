@@ -4,14 +4,46 @@ Upload trained model to HuggingFace Hub
 """
 
 import os
-from huggingface_hub import HfApi, create_repo, upload_folder
+
+from manifest import MANIFEST_FILE, has_manifest, read_manifest
+from publish import HfBackend, publish
 
 # Configuration
 MODEL_DIR = "./model"
-LABELS_FILE = "./labels.pkl"
 REPO_NAME = "expense-category-model"  # Change this to your desired repo name
 USERNAME = None  # Will be auto-detected from login
 
+def model_card_facts(manifest):
+    """Model Details and Training bullet lines from what the manifest recorded
+
+    Fields an older manifest lacks are left out rather than guessed.
+    """
+    dataset = manifest.get("dataset") or {}
+    training = manifest.get("training") or {}
+    finetune = manifest.get("finetune")
+    eval_accuracy = (manifest.get("metrics") or {}).get("eval_accuracy")
+
+    details = [f"- **Base Model**: {manifest.get('base_model', 'distilbert-base-uncased')}"]
+    if dataset.get("rows"):
+        details.append(f"- **Training Data**: {dataset['rows']:,} expense descriptions ({dataset['path']})")
+    if finetune:
+        details.append(f"- **Fine-tuned on**: {finetune['rows']:,} corrected descriptions")
+    if eval_accuracy is not None:
+        details.append(f"- **Eval Accuracy**: {eval_accuracy:.2%}")
+
+    params = []
+    if "learning_rate" in training:
+        params.append(f"- Learning rate: {training['learning_rate']:g}")
+    if "batch_size" in training:
+        params.append(f"- Batch size: {training['batch_size']}")
+    if "epochs" in training:
+        params.append(f"- Epochs: {training['epochs']:g}")
+    params.append(f"- Max sequence length: {manifest['max_length']}")
+    if finetune:
+        params.append(f"- Fine-tuning: {finetune['epochs']:g} epochs at learning rate "
+                      f"{finetune['learning_rate']:g}, replay ratio {finetune['replay_ratio']:g}")
+    return "\n".join(details), "\n".join(params)
+
 def upload_to_huggingface():
     """Upload model to HuggingFace Hub"""
     print("=" * 60)
@@ -23,8 +55,16 @@ def upload_to_huggingface():
         print("❌ Error: Model directory not found!")
         print(f"   Please train the model first using: python train.py")
         return
+    if not has_manifest(MODEL_DIR):
+        print(f"❌ Error: {MANIFEST_FILE} not found in {MODEL_DIR}!")
+        print(f"   Retrain with the current train.py to write it")
+        return
+    manifest = read_manifest(MODEL_DIR)
+    categories = "\n".join(f"- {label}" for label in manifest["labels"])
+    details, params = model_card_facts(manifest)
     
-    # Initialize API
+    # Initialize API (imported here: huggingface_hub is slow to import)
+    from huggingface_hub import HfApi, create_repo
     api = HfApi()
     
     # Get username
@@ -73,25 +113,11 @@ This model classifies expense descriptions into categories for personal finance
 
 ## Categories
 
-- food
-- groceries
-- travel
-- shopping
-- medicine
-- bills
-- entertainment
-- housing
-- education
-- fitness
-- insurance
-- investment
-- pets
-- other
+{categories}
 
 ## Model Details
 
-- **Base Model**: distilbert-base-uncased
-- **Training Data**: 15,000 expense descriptions
+{details}
 - **Framework**: HuggingFace Transformers
 - **Task**: Multi-class text classification
 
@@ -125,10 +151,10 @@ curl https://api-inference.huggingface.co/models/{repo_id} \\
 ## Training
 
 Trained using the HuggingFace Transformers library with the following parameters:
-- Learning rate: 2e-5
-- Batch size: 16
-- Epochs: 3
-- Max sequence length: 64
+{params}
+
+Labels, tokenizer settings, a training data fingerprint and evaluation metrics
+are recorded in `manifest.json`.
 
 ## License
 
@@ -140,31 +166,14 @@ MIT License
         f.write(readme_content)
     print("✅ README.md created")
     
-    # Upload model folder
+    # Upload only files that changed since the last publish, in one commit
     print(f"\n📤 Uploading model files to {repo_id}...")
     try:
-        upload_folder(
-            folder_path=MODEL_DIR,
-            repo_id=repo_id,
-            repo_type="model",
-        )
+        publish(MODEL_DIR, HfBackend(repo_id, api))
         print("✅ Model uploaded successfully!")
     except Exception as e:
         print(f"❌ Error uploading model: {e}")
-        return
-    
-    # Upload labels file separately
-    print("\n📤 Uploading label encoder...")
-    try:
-        api.upload_file(
-            path_or_fileobj=LABELS_FILE,
-            path_in_repo="labels.pkl",
-            repo_id=repo_id,
-            repo_type="model",
-        )
-        print("✅ Labels uploaded successfully!")
-    except Exception as e:
-        print(f"❌ Error uploading labels: {e}")
+        print("   Run again to resume; files already uploaded are skipped")
         return
     
     print("\n" + "=" * 60)